@@ -0,0 +1,117 @@
+"""asv benchmarks of fairness-aware estimators.
+
+Times fit, predict and transform, and measures peak memory of fit, over a
+grid of number of samples, number of features and feature dtype.
+
+Usage:
+
+    asv run
+    asv compare <commit> <commit>
+"""
+
+from sklearn.linear_model import LogisticRegression
+
+from themis_ml.linear_model import LinearACFClassifier
+from themis_ml.meta_estimators import FairnessAwareMetaEstimator
+from themis_ml.postprocessing.reject_option_classification import (
+    SingleROClassifier, MultipleROClassifier)
+from themis_ml.preprocessing.relabelling import Relabeller
+
+from .common import N_SAMPLES, N_FEATURES, DTYPES, load_data
+
+
+class _EstimatorBenchmark(object):
+    """Base class of estimator benchmarks, implemented by `make_estimator`.
+
+    asv ignores module attributes with a leading underscore, so base classes
+    aren't benchmarked themselves.
+    """
+
+    params = [N_SAMPLES, N_FEATURES, DTYPES]
+    param_names = ["n_samples", "n_features", "dtype"]
+    timeout = 1800
+    # benchmarks on large data are slow, so only run them once per process
+    number = 1
+    repeat = (1, 3, 60.0)
+
+    def make_estimator(self):
+        raise NotImplementedError
+
+    def fit(self):
+        estimator = self.make_estimator()
+        if getattr(estimator, "S_ON_FIT", True):
+            return estimator.fit(self.X, self.y, self.s)
+        return estimator.fit(self.X, self.y)
+
+    def setup(self, n_samples, n_features, dtype):
+        self.X, self.y, self.s, _ = load_data(n_samples, n_features, dtype)
+        # fitted in setup so that predict benchmarks only time prediction
+        self.fitted_estimator = self.fit()
+
+    def time_fit(self, n_samples, n_features, dtype):
+        self.fit()
+
+    def peakmem_fit(self, n_samples, n_features, dtype):
+        self.fit()
+
+
+class _ClassifierBenchmark(_EstimatorBenchmark):
+
+    def setup(self, n_samples, n_features, dtype):
+        super(_ClassifierBenchmark, self).setup(n_samples, n_features, dtype)
+        self.predict_args = (self.X, self.s) if getattr(
+            self.fitted_estimator, "S_ON_PREDICT", True) else (self.X, )
+
+    def time_predict(self, n_samples, n_features, dtype):
+        self.fitted_estimator.predict(*self.predict_args)
+
+    def time_predict_proba(self, n_samples, n_features, dtype):
+        self.fitted_estimator.predict_proba(*self.predict_args)
+
+    def peakmem_predict_proba(self, n_samples, n_features, dtype):
+        self.fitted_estimator.predict_proba(*self.predict_args)
+
+
+class RelabellerSuite(_EstimatorBenchmark):
+
+    def make_estimator(self):
+        return Relabeller()
+
+    def time_transform(self, n_samples, n_features, dtype):
+        self.fitted_estimator.transform(self.X)
+
+    def peakmem_fit_transform(self, n_samples, n_features, dtype):
+        self.fit().transform(self.X)
+
+
+class SingleROClassifierSuite(_ClassifierBenchmark):
+
+    def make_estimator(self):
+        return SingleROClassifier()
+
+
+class MultipleROClassifierSuite(_ClassifierBenchmark):
+
+    def make_estimator(self):
+        return MultipleROClassifier()
+
+
+class LinearACFClassifierSuite(_ClassifierBenchmark):
+
+    def make_estimator(self):
+        return LinearACFClassifier()
+
+    def setup(self, n_samples, n_features, dtype):
+        if dtype != "float64":
+            # checks.is_continuous only accepts int and float64 variables
+            raise NotImplementedError(
+                "LinearACFClassifier doesn't support %s features" % dtype)
+        super(LinearACFClassifierSuite, self).setup(
+            n_samples, n_features, dtype)
+
+
+class FairnessAwareMetaEstimatorSuite(_ClassifierBenchmark):
+
+    def make_estimator(self):
+        return FairnessAwareMetaEstimator(
+            LogisticRegression(), relabeller=Relabeller())
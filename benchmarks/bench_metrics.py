@@ -0,0 +1,80 @@
+"""asv benchmarks of fairness metrics and statistics utilities.
+
+Times each function and measures its peak memory over a grid of number of
+samples and dtype.
+
+Usage:
+
+    asv run --bench bench_metrics
+"""
+
+import numpy as np
+
+from themis_ml import metrics, stats_utils
+
+from .common import N_SAMPLES, SEED, load_data
+
+
+class MetricsSuite(object):
+
+    params = [N_SAMPLES, ["uint8", "int64", "float64"]]
+    param_names = ["n_samples", "dtype"]
+    timeout = 600
+
+    def setup(self, n_samples, dtype):
+        _, y, s, y_fair = load_data(n_samples, 5, "float32")
+        self.y = np.asarray(y, dtype=dtype)
+        self.s = np.asarray(s, dtype=dtype)
+        # the fair labels stand in for predictions
+        self.pred = np.asarray(y_fair, dtype=dtype)
+        self.x = self.y.astype("float64")
+
+    def time_mean_difference(self, n_samples, dtype):
+        metrics.mean_difference(self.y, self.s)
+
+    def peakmem_mean_difference(self, n_samples, dtype):
+        metrics.mean_difference(self.y, self.s)
+
+    def time_normalized_mean_difference(self, n_samples, dtype):
+        metrics.normalized_mean_difference(self.y, self.s)
+
+    def peakmem_normalized_mean_difference(self, n_samples, dtype):
+        metrics.normalized_mean_difference(self.y, self.s)
+
+    def time_abs_mean_difference_delta(self, n_samples, dtype):
+        metrics.abs_mean_difference_delta(self.y, self.pred, self.s)
+
+    def time_abs_normalized_mean_difference_delta(self, n_samples, dtype):
+        metrics.abs_normalized_mean_difference_delta(
+            self.y, self.pred, self.s)
+
+    def time_mean_differences_ci(self, n_samples, dtype):
+        metrics.mean_differences_ci(self.y, self.s)
+
+    def time_mean_confidence_interval(self, n_samples, dtype):
+        metrics.mean_confidence_interval(self.x)
+
+
+class StatsUtilsSuite(object):
+
+    params = [N_SAMPLES, ["float32", "float64"]]
+    param_names = ["n_samples", "dtype"]
+    timeout = 600
+
+    def setup(self, n_samples, dtype):
+        _, y, _, _ = load_data(n_samples, 5, "float32")
+        self.y = np.asarray(y)
+        self.pred = np.random.RandomState(SEED).uniform(
+            0.01, 0.99, n_samples).astype(dtype)
+
+    def time_pearson_residuals(self, n_samples, dtype):
+        stats_utils.pearson_residuals(self.y, self.pred)
+
+    def peakmem_pearson_residuals(self, n_samples, dtype):
+        stats_utils.pearson_residuals(self.y, self.pred)
+
+    def time_deviance_residuals(self, n_samples, dtype):
+        stats_utils.deviance_residuals(self.y, self.pred)
+
+    def peakmem_deviance_residuals(self, n_samples, dtype):
+        stats_utils.deviance_residuals(self.y, self.pred)
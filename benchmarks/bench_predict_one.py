@@ -0,0 +1,85 @@
+"""Benchmark single-record prediction latency of reject-option classifiers.
+
+Compares `SingleROClassifier.predict` on a single observation with the
+compiled scorer returned by `compile_scorer`, reporting latency percentiles.
+Exits with a non-zero status if the p99 latency of any compiled scorer
+exceeds the budget.
+
+Usage, from the repository root so that `themis_ml` is importable without
+installing it:
+
+    python -m benchmarks.bench_predict_one --n-features 20 --n-calls 10000
+"""
+
+import argparse
+import sys
+import timeit
+
+import numpy as np
+
+from sklearn.linear_model import LogisticRegression
+
+from themis_ml.postprocessing.reject_option_classification import (
+    SingleROClassifier, MultipleROClassifier)
+
+# p99 latency budget of the compiled scorers in microseconds
+P99_BUDGET_US = 50
+
+
+def _latencies(func, n_calls):
+    timer = timeit.default_timer
+    latencies = np.empty(n_calls)
+    for i in range(n_calls):
+        start = timer()
+        func()
+        latencies[i] = timer() - start
+    return latencies * 1e6
+
+
+def _report(name, latencies, budget=None):
+    """Print latency percentiles, and whether the p99 is within budget.
+
+    :returns: whether the p99 latency is within budget.
+    :rtype: bool
+    """
+    p99 = np.percentile(latencies, 99)
+    status = "" if budget is None else \
+        "  ok" if p99 <= budget else "  OVER BUDGET"
+    print("%-52s p50: %8.1f us  p99: %8.1f us%s" % (
+        name, np.percentile(latencies, 50), p99, status))
+    return budget is None or p99 <= budget
+
+
+def main(n_features, n_calls, p99_budget_us=P99_BUDGET_US, seed=0):
+    random_state = np.random.RandomState(seed)
+    X = random_state.normal(size=(1000, n_features))
+    y = (X[:, 0] + random_state.normal(size=1000) > 0).astype(int)
+    roc_clfs = [
+        ("SingleROClassifier", SingleROClassifier()),
+        ("MultipleROClassifier (3 members)", MultipleROClassifier(
+            estimators=[LogisticRegression(C=c) for c in [0.1, 1, 10]])),
+    ]
+    x, s = X[0], 1
+    x_list = x.tolist()
+    within_budget = True
+    for name, roc_clf in roc_clfs:
+        roc_clf.fit(X, y)
+        scorer = roc_clf.compile_scorer()
+        _report("%s.predict" % name, _latencies(
+            lambda: roc_clf.predict(x.reshape(1, -1), [s]), n_calls))
+        within_budget &= _report(
+            "%s scorer.predict_one" % name,
+            _latencies(lambda: scorer.predict_one(x_list, s), n_calls),
+            p99_budget_us)
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-features", type=int, default=20)
+    parser.add_argument("--n-calls", type=int, default=10000)
+    parser.add_argument(
+        "--p99-budget-us", type=float, default=P99_BUDGET_US,
+        help="p99 latency budget of the compiled scorers in microseconds")
+    args = parser.parse_args()
+    sys.exit(main(args.n_features, args.n_calls, args.p99_budget_us))
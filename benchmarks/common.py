@@ -0,0 +1,62 @@
+"""Shared data for the asv benchmark suite.
+
+Benchmark data is generated once per (n_samples, n_features, dtype) with
+`make_biased_classification` and cached as memory-mapped `.npy` files under
+`$THEMIS_ML_BENCHMARK_DATA`, which defaults to `.asv/data` in the
+repository, so that large datasets aren't regenerated in every benchmark
+process.
+"""
+
+import os
+
+import numpy as np
+
+from themis_ml.datasets import make_biased_classification
+
+N_SAMPLES = [1000, 100000, 10000000]
+N_FEATURES = [5, 20]
+DTYPES = ["float32", "float64"]
+# skip parameter combinations whose design matrix doesn't fit in this budget
+MAX_DATA_BYTES = 1 << 30
+SEED = 0
+
+
+def data_dir(n_samples, n_features, dtype):
+    return os.path.join(
+        os.environ.get(
+            "THEMIS_ML_BENCHMARK_DATA",
+            os.path.join(os.path.dirname(__file__), "..", ".asv", "data")),
+        "%d-%d-%s-%d" % (n_samples, n_features, dtype, SEED))
+
+
+def check_data_size(n_samples, n_features, dtype):
+    """Skip a benchmark if its design matrix exceeds MAX_DATA_BYTES.
+
+    asv skips benchmarks whose setup raises NotImplementedError.
+    """
+    if n_samples * n_features * np.dtype(dtype).itemsize > MAX_DATA_BYTES:
+        raise NotImplementedError(
+            "%d x %d %s data exceeds the benchmark data budget" % (
+                n_samples, n_features, dtype))
+
+
+def load_data(n_samples, n_features, dtype):
+    """Load memory-mapped benchmark data, generating it if needed.
+
+    :returns: tuple of X, y, s and y_fair.
+    :rtype: tuple[np.memmap]
+    """
+    check_data_size(n_samples, n_features, dtype)
+    path = data_dir(n_samples, n_features, dtype)
+    names = ["X", "y", "s", "y_fair"]
+    if not all(os.path.isfile(os.path.join(path, "%s.npy" % name))
+               for name in names):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        make_biased_classification(
+            n_samples=n_samples, n_features=n_features, bias=0.2,
+            base_rates=(0.6, 0.5), dtype=dtype, chunksize=100000,
+            memmap_dir=path, return_fair_labels=True, random_state=SEED)
+    return tuple(
+        np.load(os.path.join(path, "%s.npy" % name), mmap_mode="r")
+        for name in names)
@@ -0,0 +1,59 @@
+"""Benchmark import time of themis_ml modules against a budget.
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+and the median cumulative import time over several runs is compared to the
+module's budget. Exits with a non-zero status if any budget is exceeded.
+
+Usage:
+
+    python benchmarks/import_time.py --n-runs 5
+"""
+
+import argparse
+import subprocess
+import sys
+
+import numpy as np
+
+# import time budgets in milliseconds. Lightweight modules should only
+# import numpy.
+BUDGETS_MS = {
+    "themis_ml": 20,
+    "themis_ml.checks": 20,
+    "themis_ml.stats_utils": 250,
+    "themis_ml.metrics": 250,
+    "themis_ml.scoring": 250,
+    "themis_ml.datasets": 20,
+}
+
+
+def import_time_ms(module):
+    """Get the cumulative import time of a module in a fresh interpreter."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    ).stderr
+    for line in stderr.splitlines():
+        # format: "import time: self [us] | cumulative | imported package"
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000.0
+    raise ValueError("import time of %s not found" % module)
+
+
+def main(n_runs):
+    exceeded = []
+    for module, budget in sorted(BUDGETS_MS.items()):
+        median = np.median([import_time_ms(module) for _ in range(n_runs)])
+        status = "ok" if median <= budget else "OVER BUDGET"
+        print("%-25s %8.1f ms  (budget %5d ms)  %s" % (
+            module, median, budget, status))
+        if median > budget:
+            exceeded.append(module)
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-runs", type=int, default=5)
+    sys.exit(main(parser.parse_args().n_runs))
@@ -26,9 +26,13 @@ setup(
     },
     install_requires=[
         "scikit-learn >= 0.19.1",
+        "joblib >= 0.12",
         "numpy >= 1.9.0",
         "scipy >= 0.19.1",
         "pandas >= 0.22.0",
         "pathlib2",
-        ]
+        ],
+    extras_require={
+        "numba": ["numba"],
+    },
     )
@@ -0,0 +1,60 @@
+"""Unit tests for library-wide configuration."""
+
+import numpy as np
+import pytest
+
+import themis_ml
+
+from themis_ml import config, metrics, stats_utils
+from themis_ml.linear_model import LinearACFClassifier
+from themis_ml.postprocessing.reject_option_classification import (
+    MultipleROClassifier)
+from themis_ml.preprocessing.relabelling import Relabeller
+
+
+def test_config_context():
+    assert themis_ml.get_config() == {"working_memory": 1024}
+    with themis_ml.config_context(working_memory=1):
+        assert themis_ml.get_config()["working_memory"] == 1
+        assert config.get_chunk_n_rows(1024) == 1024
+        assert config.get_chunk_n_rows(1024, max_n_rows=10) == 10
+        assert config.get_chunk_n_rows(2 ** 21) == 1
+    assert themis_ml.get_config() == {"working_memory": 1024}
+    with pytest.raises(ValueError):
+        themis_ml.set_config(working_memory=0)
+
+
+def test_gen_row_chunks():
+    chunks = list(config.gen_row_chunks(10, row_bytes=1, chunk_n_rows=4))
+    assert chunks == [slice(0, 4), slice(4, 8), slice(8, 10)]
+    assert list(config.gen_row_chunks(10, row_bytes=1)) == [slice(0, 10)]
+
+
+def test_chunked_processing():
+    """Processing in small chunks gives the same results as in one chunk."""
+    random_state = np.random.RandomState(0)
+    n = 2000
+    X = np.column_stack([
+        random_state.normal(size=n), random_state.randint(0, 2, n)])
+    s = random_state.randint(0, 2, n)
+    y = ((X[:, 0] + s + random_state.normal(size=n)) > 0.5).astype(int)
+    pred = random_state.uniform(0.01, 0.99, n)
+
+    def compute():
+        relabeller = Relabeller().fit(X, y, s)
+        return [
+            metrics.mean_difference(y, s),
+            metrics.normalized_mean_difference(y, s),
+            stats_utils.pearson_residuals(y, pred),
+            stats_utils.deviance_residuals(y, pred),
+            relabeller.transform(X),
+            LinearACFClassifier().fit(X, y, s).predict_proba(X, s),
+            MultipleROClassifier().fit(X, y).predict_proba(X, s),
+        ]
+
+    expected = compute()
+    # 0.01 MiB gives chunks of a few hundred rows
+    with themis_ml.config_context(working_memory=0.01):
+        results = compute()
+    for result, expected_result in zip(results, expected):
+        assert np.allclose(result, expected_result)
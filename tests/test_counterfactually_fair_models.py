@@ -83,3 +83,18 @@ def test_invalid_binary_residual_type(random_X_data):
     with pytest.raises(ValueError):
         counterfactually_fair_models.LinearACFClassifier(
             binary_residual_type="foobar")
+
+
+def test_fit_sample_weight(random_X_data):
+    """Weighted deduplicated rows give the same fit as the expanded rows."""
+    X = create_random_X(random_X_data)
+    y, s = create_y(), create_s()
+    counts = np.array([1, 3, 2, 1, 2, 2, 1, 3, 1, 2])
+    weighted = counterfactually_fair_models.LinearACFClassifier().fit(
+        X, y, s, sample_weight=counts)
+    expanded = counterfactually_fair_models.LinearACFClassifier().fit(
+        np.repeat(X, counts, axis=0), np.repeat(y, counts),
+        np.repeat(s, counts))
+    assert np.allclose(
+        weighted.predict_proba(X, s), expanded.predict_proba(X, s),
+        atol=1e-4)
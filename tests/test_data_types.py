@@ -1,5 +1,11 @@
 """Unit tests for data types"""
 
+import numpy as np
+import pandas as pd
+import pytest
+
+from collections import OrderedDict
+
 from themis_ml.datasets import data_types
 
 
@@ -24,3 +30,88 @@ def test_variable_map():
     assert list(variable_map.variable_map.items()) == \
         [(v.name, v) for v in variables]
     assert variable_map.targets == ["target"]
+
+
+def test_variable_decode():
+    """Variables decode unique values and store compact dtypes."""
+    raw = pd.Series(["A1", "A2", "A1", "A3", "A2"], name="var")
+    binary = data_types.Variable(
+        "var", data_types.VariableType.BINARY,
+        transformer={"A1": 1, "A2": 0, "A3": 1})
+    ordered = data_types.Variable(
+        "var", data_types.VariableType.ORDERED_CATEGORICAL,
+        transformer={"A1": 2, "A2": 0, "A3": 1})
+    non_ordered = data_types.Variable(
+        "var", data_types.VariableType.NON_ORDERED_CATEGORICAL,
+        transformer={"A1": "b", "A2": "a", "A3": "b"})
+    cleaned = data_types.Variable(
+        "var", data_types.VariableType.NON_ORDERED_CATEGORICAL,
+        transformer=data_types.string_cleaner)
+
+    decoded = binary.decode(raw)
+    assert decoded.dtype == np.dtype("uint8")
+    assert decoded.tolist() == [1, 0, 1, 1, 0]
+    decoded = ordered.decode(raw)
+    assert decoded.dtype == np.dtype("int8")
+    assert decoded.tolist() == [2, 0, 2, 1, 0]
+    decoded = non_ordered.decode(raw)
+    assert list(decoded.cat.categories) == ["a", "b"]
+    assert decoded.tolist() == ["b", "a", "b", "b", "a"]
+    decoded = cleaned.decode(pd.Series([" Foo Bar", "baz ", None]))
+    assert decoded.tolist()[:2] == ["foo_bar", "baz"]
+    assert pd.isnull(decoded.iloc[2])
+
+
+def test_variable_map_decode():
+    variable_map = data_types.VariableMap(create_variables())
+    df = pd.DataFrame({
+        "var1": [0, 1], "var2": ["x", "y"], "var3": [1, 2], "var4": [0.5, 1],
+        "target": [1, 0]})
+    pd.testing.assert_frame_equal(variable_map.decode(df), df)
+
+
+def test_category_domains():
+    variable_map = data_types.VariableMap([
+        data_types.Variable(
+            "dict", data_types.VariableType.NON_ORDERED_CATEGORICAL,
+            transformer={1: "b", 2: "a", 3: "b"}),
+        data_types.Variable(
+            "explicit", data_types.VariableType.NON_ORDERED_CATEGORICAL,
+            transformer=data_types.string_cleaner, categories=["y", "x"]),
+        data_types.Variable(
+            "unknown", data_types.VariableType.NON_ORDERED_CATEGORICAL,
+            transformer=data_types.string_cleaner),
+    ])
+    assert variable_map.category_domains == OrderedDict([
+        ("dict", ["a", "b"]), ("explicit", ["x", "y"]), ("unknown", None)])
+    # decoding with a category domain includes unobserved categories
+    decoded = variable_map.decode(
+        pd.DataFrame({"dict": [1, 1], "explicit": ["X", "X"],
+                      "unknown": ["Z", "Z"]}),
+        variable_map.category_domains)
+    assert list(decoded["dict"].cat.categories) == ["a", "b"]
+    assert list(decoded["explicit"].cat.categories) == ["x", "y"]
+    assert list(decoded["unknown"].cat.categories) == ["z"]
+
+
+def test_variable_map_compile():
+    variable_map = data_types.VariableMap(create_variables())
+    df = pd.DataFrame({
+        "var1": [0, 1, 1], "var2": ["x", None, "z"], "var3": [1, 2, 0],
+        "var4": [0.5, 1, 0], "target": [1, 0, 1]})
+    with pytest.raises(ValueError):
+        # categories of var2 are unknown
+        variable_map.compile()
+    schema = variable_map.compile(category_domains={"var2": ["x", "y", "z"]})
+    assert schema.feature_names == [
+        "var4", "var3", "var1", "var2_x", "var2_y", "var2_z"]
+    X, y, s = schema.transform(df, protected_class="var2", disadvantaged="z")
+    assert (X.toarray() == [
+        [0.5, 1, 0, 1, 0, 0],
+        [1, 2, 1, 0, 0, 0],
+        [0, 0, 1, 0, 0, 1]]).all()
+    assert (y == [1, 0, 1]).all()
+    assert (s == [0, 0, 1]).all()
+    # categories are inferred from data
+    assert variable_map.compile(df).feature_names == [
+        "var4", "var3", "var1", "var2_x", "var2_z"]
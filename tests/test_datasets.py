@@ -1,6 +1,25 @@
 """Unit tests for datasets."""
 
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pathlib2 import Path
+
 from themis_ml import datasets
+from themis_ml.datasets import cache
+from themis_ml.datasets import datasets as datasets_module
+from themis_ml.datasets.census_income_data_map import (
+    census_income_variable_map)
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmpdir, monkeypatch):
+    """Use a temporary dataset cache directory."""
+    monkeypatch.setenv("THEMIS_ML_CACHE", str(tmpdir.join("cache")))
+    return cache.get_cache_home()
 
 
 def test_german_credit():
@@ -12,6 +31,121 @@ def test_german_credit():
     assert (data["credit_risk"].value_counts().loc[[0, 1]] == [300, 700]).all()
 
 
+def test_german_credit_raw_dtypes():
+    """Raw german credit data is decoded into compact dtypes."""
+    data = datasets.german_credit(raw=True)
+    assert data["credit_risk"].dtype == "uint8"
+    assert data["foreign_worker"].dtype == "uint8"
+    assert data["job"].dtype == "int8"
+    assert isinstance(data["purpose"].dtype, pd.api.types.CategoricalDtype)
+    assert "car_(new)" in data["purpose"].cat.categories
+
+
+def test_german_credit_cache(cache_home):
+    """Cached german credit data is identical to freshly loaded data."""
+    for raw in [True, False]:
+        expected = datasets.german_credit(raw=raw, cache=False)
+        # the first call writes to the cache, and the second one reads from it
+        for _ in range(2):
+            pd.testing.assert_frame_equal(
+                datasets.german_credit(raw=raw), expected)
+    cache_dirs = os.listdir(cache_home)
+    assert len(cache_dirs) == 1
+    assert sorted(os.listdir(os.path.join(cache_home, cache_dirs[0]))) == \
+        ["model_ready", "raw"]
+
+    # modifying the loaded data doesn't modify the cache
+    data = datasets.german_credit()
+    data["credit_risk"] = 2
+    assert (datasets.german_credit()["credit_risk"] != 2).all()
+
+    cache.clear_cache()
+    assert not os.path.exists(cache_home)
+
+
+def test_german_credit_unwritable_cache(tmpdir, monkeypatch):
+    """Datasets still load, uncached, if the cache can't be written."""
+    not_a_dir = tmpdir.join("not_a_dir")
+    not_a_dir.write("")
+    monkeypatch.setenv("THEMIS_ML_CACHE", str(not_a_dir))
+    for raw in [True, False]:
+        with pytest.warns(UserWarning, match="dataset cache"):
+            data = datasets.german_credit(raw=raw)
+        pd.testing.assert_frame_equal(
+            data, datasets.german_credit(raw=raw, cache=False))
+
+
+def _fake_census_income_column(variable, n, random_state):
+    if variable.name == "education":
+        values = [" Children", " High school graduate", " 9th grade"]
+    elif isinstance(variable.transformer, dict):
+        values = list(variable.transformer)
+    elif variable.transformer is None:
+        return random_state.randint(0, 100, n)
+    else:
+        values = [" Not in universe", " Yes", " No", " Some Value"]
+    return random_state.choice(values, n)
+
+
+@pytest.fixture
+def fake_census_income(tmpdir, monkeypatch):
+    """Write a small synthetic version of the census income data files."""
+    random_state = np.random.RandomState(10)
+    for split, n in [("train", 70), ("test", 30)]:
+        pd.DataFrame({
+            v.name: _fake_census_income_column(v, n, random_state)
+            for v in census_income_variable_map._variables
+        })[census_income_variable_map.all_variables].to_csv(
+            str(tmpdir.join("census_income_1994_1995_%s.csv" % split)),
+            header=False, index=False)
+    monkeypatch.setattr(datasets_module, "_data_path", lambda: Path(tmpdir))
+
+
+def test_census_income_chunksize(fake_census_income):
+    """Chunked census income data lines up with the full data."""
+    for raw in [True, False]:
+        expected = datasets.census_income(raw=raw, cache=False)
+        for cache_domains in [True, False, True]:
+            chunks = list(datasets.census_income(
+                raw=raw, chunksize=20, cache=cache_domains))
+            assert [c.shape[0] for c in chunks] == [20, 20, 20, 10, 20, 10]
+            for chunk in chunks:
+                assert list(chunk.columns) == list(expected.columns)
+            pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+def test_census_income_chunksize_without_cache(
+        fake_census_income, monkeypatch):
+    """The data files aren't checksummed if the cache isn't used."""
+    def fail(*args, **kwargs):
+        raise AssertionError("data files were checksummed")
+
+    monkeypatch.setattr(cache, "file_checksum", fail)
+    assert len(list(datasets.census_income(chunksize=20, cache=False))) == 6
+    datasets.census_income_schema(cache=False)
+
+
+def test_census_income_chunksize_unobserved_code(
+        fake_census_income, tmpdir):
+    """Codes of dict transformers that aren't in the data get no column."""
+    for split in ["train", "test"]:
+        path = str(tmpdir.join("census_income_1994_1995_%s.csv" % split))
+        df = pd.read_csv(path, names=census_income_variable_map.all_variables)
+        # code 1 ("yes") never appears
+        df["veterans_benefits"] = df["veterans_benefits"].replace(1, 2)
+        df.to_csv(path, header=False, index=False)
+    expected = datasets.census_income(cache=False)
+    assert "veterans_benefits_yes" not in expected.columns
+    for cache_domains in [True, False, True]:
+        chunks = list(datasets.census_income(
+            chunksize=20, cache=cache_domains))
+        for chunk in chunks:
+            assert list(chunk.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+    schema = datasets.census_income_schema()
+    assert "yes" not in schema.category_domains["veterans_benefits"]
+
+
 def test_census_income():
     """Test correct shape and content of census income data."""
     data = datasets.census_income()
@@ -25,3 +159,83 @@ def test_census_income():
     assert (
         data["dataset_partition"].value_counts().loc[
             ["training_set", "test_set"]]).all()
+
+
+def test_german_credit_schema():
+    """Sparse design matrix has the same values as the model-ready data."""
+    schema = datasets.german_credit_schema()
+    raw = datasets.german_credit(raw=True)
+    model_ready = datasets.german_credit()
+    X, y, _ = schema.transform(raw)
+    features = [c for c in model_ready.columns if c != "credit_risk"]
+    assert schema.feature_names == features
+    assert (X.toarray() == model_ready[features].values.astype(float)).all()
+    assert (y == model_ready["credit_risk"].values).all()
+
+    X, y, s = schema.transform(
+        raw, protected_class="personal_status_and_sex",
+        disadvantaged="female_divorced/separated/married")
+    assert X.format == "csr"
+    assert s.dtype == np.dtype("uint8")
+    assert s.sum() == (raw["personal_status_and_sex"] ==
+                       "female_divorced/separated/married").sum()
+    _, _, s = schema.transform(raw, protected_class="foreign_worker")
+    assert (s == raw["foreign_worker"]).all()
+
+
+def test_census_income_schema(fake_census_income):
+    schema = datasets.census_income_schema()
+    for raw, model_ready in zip(
+            datasets.census_income(raw=True, chunksize=40),
+            datasets.census_income(chunksize=40)):
+        X, y, s = schema.transform(
+            raw, protected_class="sex", disadvantaged="yes")
+        features = [c for c in model_ready.columns
+                    if c not in ["income_gt_50k", "dataset_partition"]]
+        assert schema.feature_names == features
+        assert (X.toarray() ==
+                model_ready[features].values.astype(float)).all()
+        assert (s == (raw["sex"] == "yes")).all()
+
+
+def test_make_biased_classification(tmpdir):
+    X, y, s, y_fair = datasets.make_biased_classification(
+        n_samples=200000, n_features=5, bias=0.3, base_rates=(0.6, 0.5),
+        proxy_strength=0.8, return_fair_labels=True, random_state=0)
+    assert X.shape == (200000, 5)
+    assert X.dtype == np.float64
+    assert y.dtype == s.dtype == y_fair.dtype == np.uint8
+    # ground-truth disparity of the fair and observed labels
+    assert np.isclose(
+        y_fair[s == 0].mean() - y_fair[s == 1].mean(), 0.1, atol=0.01)
+    assert np.isclose(
+        y[s == 0].mean() - y[s == 1].mean(), 0.6 - 0.7 * 0.5, atol=0.01)
+    # only positive labels of the disadvantaged group are demoted
+    assert (y[s == 0] == y_fair[s == 0]).all()
+    assert (y <= y_fair).all()
+    assert np.isclose(np.corrcoef(X[:, -1], s)[0, 1], 0.8, atol=0.01)
+
+    # chunked generation into memory-mapped files
+    X, y, s = datasets.make_biased_classification(
+        n_samples=1000, dtype="float32", chunksize=300,
+        memmap_dir=str(tmpdir), random_state=0)
+    assert X.dtype == np.float32
+    assert isinstance(X, np.memmap)
+    for name, array in [("X", X), ("y", y), ("s", s)]:
+        assert (np.load(str(tmpdir.join("%s.npy" % name))) == array).all()
+    X_again, _, _ = datasets.make_biased_classification(
+        n_samples=1000, dtype="float32", chunksize=300, random_state=0)
+    assert (X == X_again).all()
+
+    # the proxy correlation doesn't depend on the protected class balance
+    X, _, s = datasets.make_biased_classification(
+        n_samples=200000, protected_rate=0.1, proxy_strength=0.8,
+        random_state=0)
+    assert np.isclose(np.corrcoef(X[:, -1], s)[0, 1], 0.8, atol=0.01)
+    assert np.isclose(X[:, -1].std(), 1, atol=0.01)
+
+    with pytest.raises(ValueError):
+        datasets.make_biased_classification(n_features=1)
+    for chunksize in [0, -1]:
+        with pytest.raises(ValueError):
+            datasets.make_biased_classification(chunksize=chunksize)
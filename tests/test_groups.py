@@ -0,0 +1,82 @@
+"""Unit tests for the protected groups index."""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+
+from themis_ml import metrics
+from themis_ml.groups import ProtectedGroups, check_protected_groups
+from themis_ml.linear_model import LinearACFClassifier
+from themis_ml.meta_estimators import FairnessAwareMetaEstimator
+from themis_ml.postprocessing.reject_option_classification import (
+    SingleROClassifier)
+from themis_ml.preprocessing.relabelling import Relabeller
+
+from conftest import create_linear_X, create_y, create_s
+
+
+def test_protected_groups():
+    s = [1, 0, 1, 1, 0]
+    groups = ProtectedGroups(s)
+    assert len(groups) == 5
+    assert (np.asarray(groups) == s).all()
+    assert groups.counts.tolist() == [2, 3]
+    assert groups.mask(1).tolist() == [True, False, True, True, False]
+    assert groups.indices(0).tolist() == [1, 4]
+    # masks are computed once
+    assert groups.mask(1) is groups.mask(1)
+    assert check_protected_groups(groups) is groups
+    with pytest.raises(ValueError):
+        groups.mask(2)
+    with pytest.raises(ValueError):
+        ProtectedGroups([0, 1, 2])
+
+
+def test_protected_groups_subset_and_pickle():
+    groups = ProtectedGroups([1, 0, 1, 1, 0])
+    groups.mask(1)
+    subset = groups[[0, 1]]
+    assert isinstance(subset, ProtectedGroups)
+    assert subset.counts.tolist() == [1, 1]
+    assert groups[2] == 1
+    unpickled = pickle.loads(pickle.dumps(groups))
+    assert (unpickled.codes == groups.codes).all()
+    assert unpickled._cache == {}
+
+
+def test_protected_groups_in_metrics():
+    rng = np.random.RandomState(0)
+    y, pred, s = rng.randint(0, 2, (3, 100))
+    groups = ProtectedGroups(s)
+    assert metrics.mean_difference(y, groups) == \
+        metrics.mean_difference(y, s)
+    assert metrics.normalized_mean_difference(pred, groups, norm_y=y) == \
+        metrics.normalized_mean_difference(pred, s, norm_y=y)
+    assert metrics.mean_differences_ci(y, groups) == \
+        metrics.mean_differences_ci(y, s)
+    assert metrics.equalized_odds_difference(y, pred, groups) == \
+        metrics.equalized_odds_difference(y, pred, s)
+    assert metrics.disparate_impact_ratio(pred, groups) == \
+        metrics.disparate_impact_ratio(pred, s)
+
+
+def test_protected_groups_in_estimators():
+    X, y, s = create_linear_X(), create_y(), create_s()
+    groups = ProtectedGroups(s)
+    assert (Relabeller().fit_transform(X, y, s=groups) ==
+            Relabeller().fit_transform(X, y, s=s)).all()
+    for estimator in [
+            LinearACFClassifier(),
+            FairnessAwareMetaEstimator(
+                LogisticRegression(), relabeller=Relabeller())]:
+        kwargs = {"s": groups} if estimator.S_ON_PREDICT else {}
+        pred = estimator.fit(X, y, groups).predict_proba(X, **kwargs)
+        kwargs = {"s": s} if estimator.S_ON_PREDICT else {}
+        expected = estimator.fit(X, y, s).predict_proba(X, **kwargs)
+        assert np.allclose(pred, expected)
+    roc_clf = SingleROClassifier().fit(X, y)
+    assert (roc_clf.predict_proba(X, groups) ==
+            roc_clf.predict_proba(X, s)).all()
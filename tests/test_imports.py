@@ -0,0 +1,48 @@
+"""Unit tests for lazy imports."""
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["sklearn", "scipy", "pandas"]
+
+
+def _imported_heavy_modules(code):
+    code += (
+        "\nimport sys\n"
+        "print(','.join(m for m in %r if m in sys.modules))\n" %
+        HEAVY_MODULES)
+    output = subprocess.check_output(
+        [sys.executable, "-c", code], universal_newlines=True)
+    return [m for m in output.strip().split(",") if m]
+
+
+@pytest.mark.parametrize("module", [
+    "themis_ml",
+    "themis_ml.checks",
+    "themis_ml.stats_utils",
+    "themis_ml.metrics",
+    "themis_ml.scoring",
+    "themis_ml.datasets",
+])
+def test_lightweight_module_imports(module):
+    """Lightweight modules don't import sklearn, scipy, or pandas."""
+    assert _imported_heavy_modules("import %s" % module) == []
+
+
+def test_metrics_confidence_interval_avoids_scipy_stats():
+    code = (
+        "from themis_ml import metrics\n"
+        "metrics.mean_difference([1, 0, 1, 0, 1], [0, 0, 1, 1, 1])\n"
+        "assert 'scipy.stats' not in sys.modules\n")
+    assert _imported_heavy_modules("import sys\n" + code) == ["scipy"]
+
+
+def test_lazy_submodule_access():
+    import themis_ml
+    from themis_ml import datasets
+    assert themis_ml.metrics.mean_difference is not None
+    assert callable(datasets.german_credit)
+    with pytest.raises(AttributeError):
+        themis_ml.foobar
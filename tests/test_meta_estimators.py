@@ -1,10 +1,13 @@
 """Unit tests for themis_ml meta estimators."""
 
+import numpy as np
 import pytest
 
+from sklearn.base import clone
 from sklearn.linear_model import LogisticRegression
 
-from themis_ml.meta_estimators import FairnessAwareMetaEstimator
+from themis_ml.meta_estimators import (
+    FairnessAwareMetaEstimator, PerAttributeFairnessEnsemble)
 from themis_ml.linear_model import counterfactually_fair_models
 from themis_ml.preprocessing import relabelling
 from themis_ml.postprocessing import reject_option_classification
@@ -78,3 +81,101 @@ def test_fairness_aware_meta_estimator():
         multi_reject_option_clf.predict(X, s=None)
     with pytest.raises(ValueError):
         multi_reject_option_clf.predict_proba(X, s=None)
+
+
+class CountingRanker(LogisticRegression):
+    """Ranker that counts how many times it's been fit."""
+
+    n_fits = 0
+
+    def fit(self, X, y, sample_weight=None):
+        CountingRanker.n_fits += 1
+        return super(CountingRanker, self).fit(X, y, sample_weight)
+
+
+def test_fairness_aware_meta_estimator_memory(tmpdir):
+    """Relabelling is cached across fits with different estimators."""
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    CountingRanker.n_fits = 0
+    expected = FairnessAwareMetaEstimator(
+        LogisticRegression(), relabeller=relabelling.Relabeller(
+            CountingRanker())).fit(X, y, s).predict(X)
+    assert CountingRanker.n_fits == 1
+
+    for C in [0.1, 1.0, 10.0]:
+        relabel_clf = FairnessAwareMetaEstimator(
+            LogisticRegression(C=C),
+            relabeller=relabelling.Relabeller(CountingRanker()),
+            memory=str(tmpdir))
+        relabel_clf.fit(X, y, s)
+        assert relabel_clf.relabeller_.n_relabels_ == 3
+    # the ranker is only fit once for identical data and relabeller params
+    assert CountingRanker.n_fits == 2
+    assert (relabel_clf.set_params(estimator=LogisticRegression())
+            .fit(X, y, s).predict(X) == expected).all()
+    assert CountingRanker.n_fits == 2
+
+    # different relabeller params invalidate the cache
+    relabel_clf.set_params(relabeller__ranker__C=0.5).fit(X, y, s)
+    assert CountingRanker.n_fits == 3
+
+
+def test_fairness_aware_meta_estimator_sample_weight():
+    """Weighted deduplicated rows give the same fit as the expanded rows."""
+    X, y, s = create_linear_X(), create_y(), create_s()
+    counts = np.array([1, 3, 2, 1, 2, 2, 1, 3, 1, 2])
+    weighted = FairnessAwareMetaEstimator(
+        LogisticRegression(), relabeller=relabelling.Relabeller()).fit(
+            X, y, s, sample_weight=counts)
+    expanded = FairnessAwareMetaEstimator(
+        LogisticRegression(), relabeller=relabelling.Relabeller()).fit(
+            np.repeat(X, counts, axis=0), np.repeat(y, counts),
+            np.repeat(s, counts))
+    assert np.allclose(
+        weighted.predict_proba(X), expanded.predict_proba(X), atol=1e-4)
+
+
+def test_per_attribute_fairness_ensemble():
+    X, y, s = create_linear_X(), create_y(), create_s()
+    protected = {"sex": s, "foreign_worker": 1 - s,
+                 "age_band": np.array([0, 1] * 5)}
+    for estimator in [
+            counterfactually_fair_models.LinearACFClassifier(),
+            FairnessAwareMetaEstimator(
+                LogisticRegression(), relabeller=relabelling.Relabeller())]:
+        ensemble = PerAttributeFairnessEnsemble(estimator, n_jobs=2).fit(
+            X, y, protected)
+        assert list(ensemble.estimators_) == list(protected)
+        pred_probas = ensemble.predict_proba(X, protected)
+        for attribute, s_attr in protected.items():
+            expected = clone(estimator).fit(X, y, s_attr)
+            kwargs = {"s": s_attr} if estimator.S_ON_PREDICT else {}
+            assert np.allclose(
+                pred_probas[attribute], expected.predict_proba(X, **kwargs))
+        # only a subset of the attributes can be predicted
+        preds = ensemble.predict(X, {"sex": s})
+        assert list(preds) == ["sex"]
+
+
+def test_per_attribute_fairness_ensemble_shares_s_independent_fit():
+    X, y, s = create_linear_X(), create_y(), create_s()
+    protected = {"sex": s, "foreign_worker": 1 - s}
+    counts = np.array([1, 3, 2, 1, 2, 2, 1, 3, 1, 2])
+    ensemble = PerAttributeFairnessEnsemble(
+        reject_option_classification.SingleROClassifier()).fit(
+            X, y, protected, sample_weight=counts)
+    # the base estimator doesn't depend on s, so it's fitted once
+    assert ensemble.estimators_["sex"] is \
+        ensemble.estimators_["foreign_worker"]
+    preds = ensemble.predict(X, protected)
+    for attribute, s_attr in protected.items():
+        assert (preds[attribute] ==
+                ensemble.estimators_[attribute].predict(X, s_attr)).all()
+    with pytest.raises(ValueError):
+        ensemble.predict(X, {"race": s})
+    with pytest.raises(ValueError):
+        ensemble.fit(X, y, {"sex": s[1:]})
+    with pytest.raises(ValueError):
+        ensemble.fit(X, y, {"sex": s + 1})
@@ -1,8 +1,10 @@
 """Unit tests for metrics module."""
 
+import numpy as np
 import pytest
 
 from themis_ml import metrics
+from themis_ml.config import config_context
 
 
 def _get_point_est(md_tuple):
@@ -88,3 +90,150 @@ def test_error_non_numeric_target_and_protected_class():
         metrics.normalized_mean_difference(
             [1, 0, 0, 1],
             ["a", "b", "c", "d"])
+
+
+def test_confusion_table():
+    y = np.array([1, 1, 0, 0, 1, 1, 0, 0])
+    pred = np.array([1, 1, 1, 0, 1, 0, 0, 0])
+    s = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+    table = metrics.confusion_table(y, pred, s)
+    assert table.n_groups == 2
+    assert table.n.tolist() == [4, 4]
+    assert table.tp.tolist() == [2, 1]
+    assert table.fp.tolist() == [1, 0]
+    assert table.tn.tolist() == [1, 2]
+    assert table.fn.tolist() == [0, 1]
+    # TPR: 1 vs 0.5, FPR: 0.5 vs 0, PPV: 2/3 vs 1
+    assert table.equal_opportunity_difference() == 0.5
+    assert table.false_positive_rate_difference() == 0.5
+    assert table.equalized_odds_difference() == 0.5
+    assert np.isclose(table.predictive_parity_difference(), 2 / 3. - 1)
+    assert table.disparate_impact_ratio() == 0.25 / 0.75
+    assert metrics.equal_opportunity_difference(y, pred, s) == 0.5
+    assert metrics.equalized_odds_difference(y, pred, s) == 0.5
+    assert metrics.false_positive_rate_difference(y, pred, s) == 0.5
+    assert np.isclose(
+        metrics.predictive_parity_difference(y, pred, s), 2 / 3. - 1)
+    assert metrics.disparate_impact_ratio(pred, s) == 0.25 / 0.75
+    with pytest.raises(ValueError):
+        table.calibration_error()
+    with pytest.raises(ValueError):
+        metrics.confusion_table(y, [0, 1, 2, 0, 1, 0, 0, 0], s)
+
+
+def test_group_calibration_error():
+    y = np.array([1, 0, 1, 0, 1, 1, 0, 0])
+    pred_proba = np.array([0.9, 0.1, 0.8, 0.2, 0.5, 0.5, 0.5, 0.5])
+    s = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+    calibration_error = metrics.group_calibration_error(y, pred_proba, s)
+    assert np.allclose(calibration_error, [0.15, 0.0])
+    # predictions default to pred_proba > 0.5
+    table = metrics.confusion_table(y, s=s, pred_proba=pred_proba)
+    assert table.tp.tolist() == [2, 0]
+    with pytest.raises(ValueError):
+        metrics.confusion_table(y, s=s, pred_proba=pred_proba + 1)
+
+
+def test_group_means():
+    rng = np.random.RandomState(0)
+    y = rng.randint(0, 2, 200)
+    s = rng.randint(0, 4, 200)
+    means = metrics.group_means(y, s)
+    assert means.n_groups == 4
+    assert means.n.tolist() == np.bincount(s).tolist()
+    md = means.mean_differences(reference=1)
+    nmd = metrics.group_normalized_mean_differences(y, s, reference=1)
+    for group in [0, 2, 3]:
+        # same as binarizing s over the reference group and each group
+        pair = (s == 1) | (s == group)
+        assert np.allclose(md[group], metrics.mean_difference(
+            y[pair], (s[pair] == group).astype(int)))
+        assert np.allclose(nmd[group], metrics.normalized_mean_difference(
+            y[pair], (s[pair] == group).astype(int)))
+    group_rates = [y[s == g].mean() for g in range(4)]
+    assert np.isclose(
+        metrics.max_pairwise_mean_difference(y, s),
+        max(group_rates) - min(group_rates))
+    assert np.isclose(
+        metrics.min_max_mean_ratio(y, s), min(group_rates) / max(group_rates))
+    # empty groups are NaN and don't count in the summaries
+    means = metrics.group_means(y, s, n_groups=5)
+    assert np.isnan(means.mean_differences()[4]).all()
+    assert np.isclose(
+        means.max_pairwise_difference(), max(group_rates) - min(group_rates))
+    # binary protected class
+    assert np.allclose(
+        metrics.group_mean_differences(y, s % 2)[1],
+        metrics.mean_difference(y, s % 2))
+    with pytest.raises(ValueError):
+        metrics.group_means(y, s, n_groups=3)
+    with pytest.raises(ValueError):
+        means.mean_differences(reference=5)
+
+
+def test_mean_difference_continuous():
+    rng = np.random.RandomState(0)
+    s = rng.randint(0, 2, 1000)
+    # large offset, where sums of squares lose precision
+    y = 1e8 + rng.normal(size=1000) - 0.5 * s
+    y0, y1 = y[s == 0], y[s == 1]
+    n0, n1 = len(y0), len(y1)
+    pooled_std = np.sqrt(
+        ((n0 - 1) * y0.var() + (n1 - 1) * y1.var()) / (n0 + n1 - 2))
+    margin_error = metrics._t_ppf(metrics.DEFAULT_CI, n0 + n1 - 2) * \
+        pooled_std * np.sqrt(1. / n0 + 1. / n1)
+    md = y0.mean() - y1.mean()
+    expected = (md, md - margin_error, md + margin_error)
+    assert np.allclose(metrics.mean_difference(y, s), expected)
+    # chunks are merged with the same result
+    with config_context(working_memory=0.001):
+        assert np.allclose(metrics.mean_difference(y, s), expected)
+    # float32 targets
+    y = (rng.normal(size=1000) - 0.5 * s).astype(np.float32)
+    md = y[s == 0].mean(dtype=float) - y[s == 1].mean(dtype=float)
+    assert np.isclose(metrics.mean_difference(y, s)[0], md, atol=1e-6)
+    # confidence intervals of continuous targets aren't bounded to [-1, 1]
+    assert metrics.mean_difference(10 * y, s)[2] > 1
+    assert np.isclose(
+        metrics.group_mean_differences(10 * y, s)[1, 0], 10 * md, atol=1e-5)
+    with pytest.raises(ValueError):
+        metrics.normalized_mean_difference(y, s)
+
+
+def test_sample_weight_matches_expanded_rows():
+    rng = np.random.RandomState(0)
+    y, pred, s = rng.randint(0, 2, (3, 50))
+    pred_proba = rng.uniform(size=50)
+    y_continuous = rng.normal(size=50)
+    s_multi = rng.randint(0, 3, 50)
+    counts = rng.randint(0, 5, 50)
+
+    def expand(x):
+        return np.repeat(x, counts)
+
+    def check(func, *args, **kwargs):
+        assert np.allclose(
+            func(*args, sample_weight=counts, **kwargs),
+            func(*[expand(x) for x in args], **kwargs))
+
+    check(metrics.mean_difference, y, s)
+    check(metrics.mean_difference, y_continuous, s)
+    check(metrics.mean_differences_ci, y_continuous, s)
+    check(metrics.normalized_mean_difference, pred, s, y)
+    check(metrics.abs_mean_difference_delta, y, pred, s)
+    check(metrics.abs_normalized_mean_difference_delta, y, pred, s)
+    check(metrics.group_mean_differences, y_continuous, s_multi)
+    check(metrics.group_normalized_mean_differences, y, s_multi)
+    check(metrics.max_pairwise_mean_difference, y, s_multi)
+    check(metrics.min_max_mean_ratio, y, s_multi)
+    check(metrics.equal_opportunity_difference, y, pred, s)
+    check(metrics.equalized_odds_difference, y, pred, s)
+    check(metrics.false_positive_rate_difference, y, pred, s)
+    check(metrics.predictive_parity_difference, y, pred, s)
+    check(metrics.disparate_impact_ratio, pred, s)
+    check(metrics.group_calibration_error, y, pred_proba, s)
+    check(metrics.mean_confidence_interval, y_continuous)
+    with pytest.raises(ValueError):
+        metrics.mean_difference(y, s, sample_weight=-counts)
+    with pytest.raises(ValueError):
+        metrics.mean_difference(y, s, sample_weight=counts[1:])
@@ -0,0 +1,84 @@
+"""Unit tests for fairness-aware model selection."""
+
+import numpy as np
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+
+from themis_ml import model_selection
+from themis_ml.meta_estimators import FairnessAwareMetaEstimator
+from themis_ml.linear_model import LinearACFClassifier
+from themis_ml.preprocessing.relabelling import Relabeller
+from themis_ml.postprocessing.reject_option_classification import (
+    SingleROClassifier)
+
+from conftest import create_linear_X, create_y, create_s
+
+
+def create_estimators():
+    return [
+        LogisticRegression(),
+        LinearACFClassifier(binary_residual_type="absolute"),
+        SingleROClassifier(),
+        FairnessAwareMetaEstimator(
+            LogisticRegression(), relabeller=Relabeller()),
+        FairnessAwareMetaEstimator(SingleROClassifier()),
+    ]
+
+
+def test_fair_cross_validate():
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    for estimator in create_estimators():
+        results = model_selection.fair_cross_validate(
+            estimator, X, y, s, cv=2)
+        for key in ["fit_time", "score_time"] + [
+                "test_%s" % score for score in model_selection.SCORES]:
+            assert results[key].shape == (2, )
+        assert ((results["test_accuracy"] >= 0) &
+                (results["test_accuracy"] <= 1)).all()
+
+
+def test_fair_cross_validate_parallel():
+    """Parallel cross-validation gives the same scores as serial."""
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    serial = model_selection.fair_cross_validate(
+        SingleROClassifier(), X, y, s, cv=2)
+    parallel = model_selection.fair_cross_validate(
+        SingleROClassifier(), X, y, s, cv=2, n_jobs=2)
+    for score in model_selection.SCORES:
+        key = "test_%s" % score
+        assert np.allclose(serial[key], parallel[key])
+
+
+def test_fair_grid_search_cv():
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    search = model_selection.FairGridSearchCV(
+        SingleROClassifier(), {"theta": [0.0, 0.1, 0.2, 0.3]},
+        scoring="mean_difference", cv=2, n_jobs=2)
+    search.fit(X, y, s)
+    mean_difference = search.cv_results_["mean_test_mean_difference"]
+    assert mean_difference.shape == (4, )
+    assert search.best_score_ == mean_difference[
+        np.abs(mean_difference).argmin()]
+    assert search.best_estimator_.theta == search.best_params_["theta"]
+    assert list(search.cv_results_["param_theta"]) == [0.0, 0.1, 0.2, 0.3]
+    assert search.predict(X, s).shape == y.shape
+    assert search.predict_proba(X, s).shape == (y.shape[0], 2)
+
+    search = model_selection.FairGridSearchCV(
+        FairnessAwareMetaEstimator(
+            LogisticRegression(), relabeller=Relabeller()),
+        {"estimator__C": [0.1, 1.0]}, cv=2)
+    search.fit(X, y, s)
+    assert search.predict(X).shape == y.shape
+
+    with pytest.raises(ValueError):
+        model_selection.FairGridSearchCV(
+            LogisticRegression(), {"C": [1.0]}, scoring="foobar",
+        ).fit(X, y, s)
@@ -0,0 +1,103 @@
+"""Unit tests for profiling hooks."""
+
+import numpy as np
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+
+from themis_ml import profiling
+from themis_ml.linear_model import LinearACFClassifier
+from themis_ml.meta_estimators import FairnessAwareMetaEstimator
+from themis_ml.postprocessing.reject_option_classification import (
+    MultipleROClassifier)
+from themis_ml.preprocessing.relabelling import Relabeller
+
+from conftest import create_linear_X, create_y, create_s
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def _span_names(spans):
+    return [span.name for span in spans]
+
+
+def test_profiling_disabled():
+    assert profiling.get_profiler() is None
+    assert profiling.span("foo", np.ones(3)) is profiling.span("bar")
+
+
+def test_profile_spans():
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+
+    with profiling.profile() as spans:
+        Relabeller().fit(X, y, s).transform(X)
+    names = _span_names(spans)
+    for name in ["checks.check_binary", "Relabeller.ranker_fit",
+                 "Relabeller.check_input", "Relabeller.relabel_targets"]:
+        assert name in names
+    ranker_fit = spans[names.index("Relabeller.ranker_fit")]
+    assert ranker_fit.n_rows == 10
+    assert ranker_fit.n_bytes == X.nbytes
+    assert ranker_fit.duration > 0
+    assert ranker_fit.allocated_bytes is None
+    assert profiling.get_profiler() is None
+
+    with profiling.profile() as spans:
+        LinearACFClassifier(binary_residual_type="absolute").fit(X, y, s)
+    residual_fits = [
+        span for span in spans
+        if span.name == "LinearACFClassifier.residual_fit"]
+    assert [span.attributes["column"] for span in residual_fits] == [0, 1]
+    assert "LinearACFClassifier.target_fit" in _span_names(spans)
+
+    with profiling.profile() as spans:
+        MultipleROClassifier().fit(X, y)
+    assert _span_names(spans).count("MultipleROClassifier.member_fit") == 2
+    assert _span_names(spans).count("MultipleROClassifier.member_weight") == 2
+
+    with profiling.profile() as spans:
+        FairnessAwareMetaEstimator(
+            LogisticRegression(), relabeller=Relabeller()).fit(X, y, s)
+    names = _span_names(spans)
+    relabel = spans[names.index("FairnessAwareMetaEstimator.relabel")]
+    ranker_fit = spans[names.index("Relabeller.ranker_fit")]
+    assert ranker_fit.parent is relabel
+    assert relabel.parent is None
+    assert "FairnessAwareMetaEstimator.estimator_fit" in names
+
+
+@pytest.mark.skipif(tracemalloc is None, reason="requires tracemalloc")
+def test_profile_callback_and_memory():
+    calls = []
+    previous = profiling.set_profiler(calls.append)
+    try:
+        tracemalloc.start()
+        try:
+            with profiling.span("outer") as outer:
+                with profiling.span("inner", n_rows=1):
+                    data = np.ones(100000)
+                del data
+        finally:
+            tracemalloc.stop()
+    finally:
+        profiling.set_profiler(previous)
+    inner, outer = calls
+    assert inner.parent is outer
+    assert inner.attributes == {"n_rows": 1}
+    assert inner.allocated_bytes >= 800000
+    assert outer.allocated_bytes >= inner.allocated_bytes
+
+
+def test_profile_without_tracemalloc(monkeypatch):
+    """Spans don't record memory if tracemalloc isn't available."""
+    monkeypatch.setattr(profiling, "_tracemalloc_module", None)
+    with profiling.profile() as spans:
+        with profiling.span("outer"):
+            pass
+    assert spans[0].duration is not None
+    assert spans[0].allocated_bytes is None
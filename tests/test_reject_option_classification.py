@@ -4,10 +4,14 @@ import math
 import numpy as np
 import pytest
 
+from sklearn.base import clone
 from sklearn.exceptions import NotFittedError
+from sklearn.linear_model import LogisticRegression
 
+from themis_ml.checks import is_binary
 from themis_ml.postprocessing.reject_option_classification import (
-    SingleROClassifier, MultipleROClassifier, DECISION_THRESHOLD)
+    SingleROClassifier, MultipleROClassifier, ROCThetaSearch,
+    DECISION_THRESHOLD, DEFAULT_THETAS, _theta_sweep)
 from conftest import create_linear_X, create_y, create_s
 
 
@@ -117,3 +121,134 @@ def test_not_fitted_error():
     """Test raises not fitted error if predict before fit."""
     with pytest.raises(NotFittedError):
         SingleROClassifier().predict(create_linear_X(), create_y())
+
+
+def test_theta_sweep_matches_predict():
+    """Vectorized theta sweep scores should match flipped predictions."""
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    thetas = np.linspace(0, 0.5, 11)
+    roc_clf = SingleROClassifier().fit(X, y)
+    pred_prob = roc_clf._raw_predict_proba(X, s)[:, 1]
+    for demote in [True, False]:
+        accuracy, mean_diff = _theta_sweep(pred_prob, y, s, thetas, demote)
+        for i, theta in enumerate(thetas):
+            pred = roc_clf.set_params(theta=theta, demote=demote).predict(
+                X, s)
+            assert accuracy[i] == (pred == y).mean()
+            assert mean_diff[i] == pred[s == 0].mean() - pred[s == 1].mean()
+
+
+def test_roc_theta_search():
+    """ROCThetaSearch fits once per fold and refits the best candidate."""
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    thetas = [0.0, 0.1, 0.2, 0.3]
+    for estimator in [SingleROClassifier(), MultipleROClassifier()]:
+        search = ROCThetaSearch(estimator, thetas=thetas, cv=2).fit(X, y, s)
+        n_candidates = len(thetas) * 2
+        for key in ["param_theta", "param_demote", "mean_accuracy",
+                    "mean_mean_difference"]:
+            assert search.cv_results_[key].shape == (n_candidates, )
+        assert search.best_estimator_.theta == search.best_params_["theta"]
+        assert search.best_estimator_.demote == search.best_params_["demote"]
+        assert len(search.frontier_) > 0
+        assert is_binary(search.predict(X, s))
+
+    # the most accurate candidate is selected when fairness is unbounded
+    search = ROCThetaSearch(
+        thetas=thetas, cv=2, max_abs_mean_difference=1).fit(X, y, s)
+    assert search.cv_results_["mean_accuracy"][search.best_index_] == \
+        search.cv_results_["mean_accuracy"].max()
+
+    # candidates whose difference equals the threshold are within the bound
+    abs_md = np.abs(search.cv_results_["mean_mean_difference"])
+    mean_accuracy = search.cv_results_["mean_accuracy"]
+    most_accurate = mean_accuracy.argmax()
+    search.set_params(
+        max_abs_mean_difference=abs_md[most_accurate]).fit(X, y, s)
+    assert mean_accuracy[search.best_index_] == mean_accuracy.max()
+    assert abs_md[search.best_index_] <= abs_md[most_accurate]
+    search.set_params(max_abs_mean_difference=abs_md.min()).fit(X, y, s)
+    assert abs_md[search.best_index_] == abs_md.min()
+    with pytest.raises(ValueError):
+        search.set_params(
+            max_abs_mean_difference=np.nextafter(abs_md.min(), -1)).fit(
+                X, y, s)
+
+
+def test_multiple_ro_clf_parallel_fit():
+    """Fitting ensemble members in parallel gives the same model."""
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    serial_clf = MultipleROClassifier().fit(X, y)
+    parallel_clf = MultipleROClassifier(n_jobs=2).fit(X, y)
+    assert (serial_clf.pred_weights_ == parallel_clf.pred_weights_).all()
+    assert (serial_clf.predict_proba(X, s) ==
+            parallel_clf.predict_proba(X, s)).all()
+
+
+def test_multiple_ro_clf_batch_predict():
+    """Batched and threaded prediction gives the same probabilities."""
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    roc_clf = MultipleROClassifier(theta=0.2).fit(X, y)
+    expected = roc_clf.predict_proba(X, s)
+    for batch_size, n_jobs in [(1, None), (3, None), (4, 2), (100, 2)]:
+        roc_clf.set_params(batch_size=batch_size, n_jobs=n_jobs)
+        assert np.allclose(roc_clf.predict_proba(X, s), expected)
+        assert (roc_clf.predict(X, s) ==
+                (expected[:, 1] > DECISION_THRESHOLD)).all()
+    assert np.allclose(expected.sum(axis=1), 1)
+
+
+def test_compile_scorer():
+    """Compiled scorer gives the same predictions as predict_proba."""
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    roc_clfs = [
+        SingleROClassifier(theta=0.2),
+        SingleROClassifier(theta=0.2, demote=False),
+        MultipleROClassifier(
+            estimators=[LogisticRegression(), LogisticRegression(C=0.1)],
+            theta=0.2),
+    ]
+    for roc_clf in roc_clfs:
+        roc_clf.fit(X, y)
+        scorer = roc_clf.compile_scorer()
+        pred_proba = roc_clf.predict_proba(X, s)[:, 1]
+        pred = roc_clf.predict(X, s)
+        for x_i, s_i, pred_proba_i, pred_i in zip(X, s, pred_proba, pred):
+            assert np.isclose(scorer.predict_proba_one(x_i, s_i), pred_proba_i)
+            assert scorer.predict_one(list(x_i), s_i) == pred_i
+
+    # non-linear base estimators are not supported
+    with pytest.raises(ValueError):
+        MultipleROClassifier().fit(X, y).compile_scorer()
+
+
+def test_sample_weight():
+    """Weighted deduplicated rows give the same fit as the expanded rows."""
+    X, y, s = create_linear_X(), create_y(), create_s()
+    counts = np.array([1, 3, 2, 1, 2, 2, 1, 3, 1, 2])
+    X_expanded = np.repeat(X, counts, axis=0)
+    y_expanded, s_expanded = np.repeat(y, counts), np.repeat(s, counts)
+    for clf in [SingleROClassifier(), MultipleROClassifier()]:
+        weighted = clone(clf).fit(X, y, sample_weight=counts)
+        expanded = clone(clf).fit(X_expanded, y_expanded)
+        assert np.allclose(
+            weighted.predict_proba(X, s), expanded.predict_proba(X, s),
+            atol=1e-4)
+    assert np.allclose(weighted.pred_weights_, expanded.pred_weights_)
+    pred_prob = weighted._raw_predict_proba(X, s)[:, 1]
+    for demote in [True, False]:
+        assert np.allclose(
+            _theta_sweep(pred_prob, y, s, DEFAULT_THETAS, demote, counts),
+            _theta_sweep(
+                np.repeat(pred_prob, counts), y_expanded, s_expanded,
+                DEFAULT_THETAS, demote))
@@ -62,3 +62,16 @@ def test_fit_transform_error():
     X_input = create_linear_X()
     with pytest.raises(ValueError):
         Relabeller().fit(X_input, create_y(), create_s()).transform(X_input.T)
+
+
+def test_relabeller_sample_weight():
+    """Weighted deduplicated rows are relabelled like the expanded rows."""
+    X, y, s = create_linear_X(), create_y(), create_s()
+    counts = np.array([1, 3, 2, 1, 2, 2, 1, 3, 1, 2])
+    X_expanded = np.repeat(X, counts, axis=0)
+    weighted = Relabeller().fit(X, y, s, sample_weight=counts)
+    expanded = Relabeller().fit(
+        X_expanded, np.repeat(y, counts), np.repeat(s, counts))
+    assert weighted.n_relabels_ == expanded.n_relabels_
+    assert (np.repeat(weighted.transform(X), counts) ==
+            expanded.transform(X_expanded)).all()
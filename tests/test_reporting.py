@@ -0,0 +1,89 @@
+"""Unit tests for fairness reports."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from themis_ml import metrics, reporting
+
+
+def create_report_data():
+    random_state = np.random.RandomState(0)
+    n = 1000
+    y = random_state.randint(0, 2, n)
+    preds = {
+        "model_a": random_state.randint(0, 2, n),
+        "model_b": (y + (random_state.uniform(size=n) < 0.2)) % 2,
+    }
+    protected = pd.DataFrame({
+        "sex": random_state.randint(0, 2, n),
+        "age_below_25": (random_state.uniform(size=n) < 0.3).astype(int),
+    })
+    return y, preds, protected
+
+
+def test_fairness_report():
+    y, preds, protected = create_report_data()
+    report = reporting.FairnessReport(y, preds, protected)
+    frame = report.to_frame()
+    assert list(frame.columns) == reporting.COLUMNS
+    assert frame.shape[0] == 2 * 2 * len(reporting.METRICS)
+
+    for (model, attribute), group in frame.groupby(["model", "attribute"]):
+        pred, s = preds[model], protected[attribute].values
+        scores = group.set_index("metric")
+        assert np.allclose(
+            scores.loc["mean_difference", ["value", "lower_ci", "upper_ci"]]
+            .values.astype(float), metrics.mean_difference(pred, s))
+        assert np.allclose(
+            scores.loc[
+                "normalized_mean_difference",
+                ["value", "lower_ci", "upper_ci"]].values.astype(float),
+            metrics.normalized_mean_difference(pred, s))
+        expected = {
+            "abs_mean_difference_delta":
+                metrics.abs_mean_difference_delta(y, pred, s),
+            "abs_normalized_mean_difference_delta":
+                metrics.abs_normalized_mean_difference_delta(y, pred, s),
+            "equal_opportunity_difference":
+                metrics.equal_opportunity_difference(y, pred, s),
+            "equalized_odds_difference":
+                metrics.equalized_odds_difference(y, pred, s),
+            "disparate_impact_ratio":
+                metrics.disparate_impact_ratio(pred, s),
+        }
+        for metric, value in expected.items():
+            assert np.isclose(scores.loc[metric, "value"], value)
+        assert (scores["n_disadvantaged"] == s.sum()).all()
+        assert np.isnan(scores.loc["disparate_impact_ratio", "lower_ci"])
+
+
+def test_fairness_report_parallel():
+    y, preds, protected = create_report_data()
+    serial = reporting.FairnessReport(y, preds, protected).to_frame()
+    parallel = reporting.FairnessReport(
+        y, preds, protected, n_jobs=2).to_frame()
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_fairness_report_invalid_input():
+    y, preds, protected = create_report_data()
+    with pytest.raises(ValueError):
+        reporting.FairnessReport(y, {"model": y[:-1]}, protected)
+    with pytest.raises(ValueError):
+        reporting.FairnessReport(y, preds, {"race": np.arange(len(y))})
+
+
+def test_fairness_report_sample_weight():
+    rng = np.random.RandomState(0)
+    y, pred, s = rng.randint(0, 2, (3, 50))
+    counts = rng.randint(0, 5, 50)
+    report = reporting.FairnessReport(
+        y, {"model": pred}, {"s": s}, sample_weight=counts).to_frame()
+    expanded = reporting.FairnessReport(
+        np.repeat(y, counts), {"model": np.repeat(pred, counts)},
+        {"s": np.repeat(s, counts)}).to_frame()
+    numeric = ["value", "lower_ci", "upper_ci", "n_disadvantaged"]
+    assert np.allclose(
+        report[numeric].values.astype(float),
+        expanded[numeric].values.astype(float), equal_nan=True)
@@ -0,0 +1,100 @@
+"""Unit tests for scoring artifacts."""
+
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from themis_ml import scoring
+from themis_ml.meta_estimators import FairnessAwareMetaEstimator
+from themis_ml.linear_model import LinearACFClassifier
+from themis_ml.preprocessing.relabelling import Relabeller
+from themis_ml.postprocessing.reject_option_classification import (
+    SingleROClassifier, MultipleROClassifier)
+
+from conftest import create_random_X, create_linear_X, create_y, create_s
+
+# random_X_data fixture is in conftest.py
+
+
+def _assert_same_predictions(estimator, scorer, X, s):
+    kwargs = {} if s is None else {"s": s}
+    assert np.allclose(
+        estimator.predict_proba(X, **kwargs), scorer.predict_proba(X, s))
+    assert (estimator.predict(X, **kwargs) == scorer.predict(X, s)).all()
+
+
+def test_export_reject_option_classifiers(tmpdir):
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    for roc_clf in [
+            SingleROClassifier(theta=0.2),
+            SingleROClassifier(theta=0.2, demote=False),
+            MultipleROClassifier(
+                estimators=[LogisticRegression(), LogisticRegression(C=0.1)],
+                theta=0.2)]:
+        roc_clf.fit(X, y)
+        path = scoring.export_scorer(roc_clf, str(tmpdir.join("roc")))
+        _assert_same_predictions(roc_clf, scoring.load_scorer(path), X, s)
+    with pytest.raises(ValueError):
+        # reject option scoring needs s
+        scoring.load_scorer(path).predict(X)
+    with pytest.raises(ValueError):
+        # s must be binary, as in the estimator's predict
+        scoring.load_scorer(path).predict(X, s + 1)
+
+
+def test_export_linear_acf_classifier(tmpdir, random_X_data):
+    X = np.concatenate([
+        create_random_X(random_X_data), np.ones((10, 1))], axis=1)
+    y = create_y()
+    s = create_s()
+    for residual_type in ["pearson", "deviance", "absolute"]:
+        linear_acf = LinearACFClassifier(
+            binary_residual_type=residual_type).fit(X, y, s)
+        path = scoring.export_scorer(
+            linear_acf, str(tmpdir.join(residual_type)))
+        _assert_same_predictions(
+            linear_acf, scoring.load_scorer(path, mmap_mode=None), X, s)
+    with pytest.raises(ValueError):
+        # -1 would otherwise index the last group's parameters
+        scoring.load_scorer(path).predict_proba(X, s - 1)
+
+
+def test_export_meta_estimator(tmpdir):
+    X = create_linear_X()
+    y = create_y()
+    s = create_s()
+    relabel_clf = FairnessAwareMetaEstimator(
+        LogisticRegression(), relabeller=Relabeller()).fit(X, y, s)
+    path = scoring.export_scorer(relabel_clf, str(tmpdir.join("relabel")))
+    _assert_same_predictions(relabel_clf, scoring.load_scorer(path), X, None)
+
+    roc_clf = FairnessAwareMetaEstimator(SingleROClassifier()).fit(X, y)
+    path = scoring.export_scorer(roc_clf, str(tmpdir.join("roc")))
+    _assert_same_predictions(roc_clf, scoring.load_scorer(path), X, s)
+
+
+def test_export_unsupported_estimator(tmpdir):
+    clf = DecisionTreeClassifier().fit(create_linear_X(), create_y())
+    with pytest.raises(ValueError):
+        scoring.export_scorer(clf, str(tmpdir.join("tree")))
+
+
+def test_load_scorer_is_dependency_light(tmpdir):
+    """Loading and scoring an artifact doesn't import sklearn or pandas."""
+    path = scoring.export_scorer(
+        SingleROClassifier().fit(create_linear_X(), create_y()),
+        str(tmpdir.join("roc")))
+    code = (
+        "import sys\n"
+        "from themis_ml.scoring import load_scorer\n"
+        "load_scorer(%r).predict([[1, 2]], [1])\n"
+        "heavy = {'sklearn', 'scipy', 'pandas'}.intersection(sys.modules)\n"
+        "assert not heavy, heavy\n" % path)
+    subprocess.check_call([sys.executable, "-c", code])
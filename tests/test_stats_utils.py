@@ -4,6 +4,7 @@ import numpy as np
 import pytest
 
 from themis_ml import stats_utils
+from themis_ml.config import config_context
 
 
 @pytest.fixture
@@ -47,3 +48,71 @@ def test_deviance_residuals(label_pred_data):
     assert (d[y == 1] > 0).all()
     assert (d[y == 0] < 0).all()
 
+
+@pytest.mark.parametrize("residual_func", [
+    stats_utils.pearson_residuals, stats_utils.deviance_residuals])
+def test_residuals_clipping_and_dtypes(residual_func):
+    y = np.array([1, 0, 1, 0])
+    pred = np.array([1.0, 0.0, 0.0, 1.0])
+    r = residual_func(y, pred)
+    assert np.isfinite(r).all()
+    assert (r[[0, 2]] > 0).all()
+    assert (r[[1, 3]] < 0).all()
+
+    # float32 predictions give float32 residuals
+    r32 = residual_func(y, pred.astype(np.float32))
+    assert r32.dtype == np.dtype("float32")
+    assert np.isfinite(r32).all()
+
+    # out buffer
+    out = np.empty(4)
+    assert residual_func(y, pred, out=out) is out
+    assert np.allclose(out, r)
+
+    with pytest.raises(ValueError):
+        residual_func(y, pred[:3])
+    with pytest.raises(ValueError):
+        residual_func(y, pred, backend="foobar")
+
+
+def test_residuals_match_formula():
+    random_state = np.random.RandomState(0)
+    y = random_state.randint(0, 2, 1000)
+    pred = random_state.uniform(0.01, 0.99, 1000)
+    pearson = (y - pred) / np.sqrt(pred * (1 - pred))
+    deviance = np.where(y == 1, 1, -1) * np.sqrt(
+        -2 * (y * np.log(pred) + (1 - y) * np.log(1 - pred)))
+    for backend in ["auto", "numpy"]:
+        assert np.allclose(
+            stats_utils.pearson_residuals(y, pred, backend=backend), pearson)
+        assert np.allclose(
+            stats_utils.deviance_residuals(y, pred, backend=backend),
+            deviance)
+
+
+def test_residuals_2d_blocks():
+    """2-D inputs give the same residuals as column by column."""
+    random_state = np.random.RandomState(0)
+    y = random_state.randint(0, 2, (500, 4))
+    pred = random_state.uniform(0.01, 0.99, (500, 4))
+    for residual_func in [
+            stats_utils.pearson_residuals, stats_utils.deviance_residuals]:
+        expected = np.column_stack([
+            residual_func(y[:, j], pred[:, j]) for j in range(4)])
+        with config_context(working_memory=0.001):
+            for order in ["C", "F"]:
+                r = residual_func(
+                    np.asarray(y, order=order), np.asarray(pred, order=order))
+                assert np.allclose(r, expected)
+
+
+def test_residuals_numba_backend():
+    pytest.importorskip("numba")
+    random_state = np.random.RandomState(0)
+    y = random_state.randint(0, 2, 100)
+    pred = random_state.uniform(0, 1, 100)
+    for residual_func in [
+            stats_utils.pearson_residuals, stats_utils.deviance_residuals]:
+        assert np.allclose(
+            residual_func(y, pred, backend="numba"),
+            residual_func(y, pred, backend="numpy"))
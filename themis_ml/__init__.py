@@ -0,0 +1,42 @@
+"""Fairness-aware Machine Learning.
+
+Submodules are imported lazily on first attribute access, e.g.
+`themis_ml.metrics`, so that importing the package doesn't import sklearn,
+scipy, or pandas.
+"""
+
+import importlib
+import sys
+
+from .config import get_config, set_config, config_context  # noqa: F401
+from .profiling import set_profiler, get_profiler, profile  # noqa: F401
+
+__version__ = "0.0.4"
+
+SUBMODULES = [
+    "checks",
+    "config",
+    "datasets",
+    "groups",
+    "linear_model",
+    "meta_estimators",
+    "metrics",
+    "model_selection",
+    "postprocessing",
+    "preprocessing",
+    "profiling",
+    "reporting",
+    "scoring",
+    "stats_utils",
+]
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in SUBMODULES:
+            return importlib.import_module("." + name, __name__)
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+
+    def __dir__():
+        return sorted(list(globals()) + SUBMODULES)
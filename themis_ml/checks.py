@@ -1,20 +1,57 @@
 """Utility functions for doing checks."""
 
+from .profiling import span
+
 CONTINUOUS_DTYPES = [int, float]
 
 
 def check_binary(x):
-    if not is_binary(x):
-        raise ValueError("%s must be a binary variable" % x)
+    with span("checks.check_binary", x):
+        if not is_binary(x):
+            raise ValueError("%s must be a binary variable" % x)
     return x
 
 
 def check_continuous(x):
-    if not is_continuous(x):
-        raise ValueError("%s must be a continuous variable" % x)
+    with span("checks.check_continuous", x):
+        if not is_continuous(x):
+            raise ValueError("%s must be a continuous variable" % x)
     return x
 
 
+def check_sample_weight(sample_weight, y):
+    """Check that sample weights are non-negative, with one per row of y.
+
+    :param array-like|None sample_weight: shape (n, ) sample weights.
+    :param array-like y: shape (n, ) target variable.
+    :returns: sample weights as an array, or None if not specified.
+    :rtype: np.array|None
+    """
+    if sample_weight is None:
+        return None
+    # imported here so that importing `checks` stays lightweight
+    import numpy as np
+    sample_weight = np.asarray(sample_weight)
+    if sample_weight.dtype.kind not in "biuf":
+        raise ValueError("sample_weight must be numeric")
+    if sample_weight.shape != (len(y), ):
+        raise ValueError(
+            "sample_weight must have shape (%d, ), found %s" %
+            (len(y), sample_weight.shape))
+    if sample_weight.size and sample_weight.min() < 0:
+        raise ValueError("sample_weight must be non-negative")
+    return sample_weight
+
+
+def sample_weight_kwargs(sample_weight):
+    """Get the keyword arguments that pass sample weights to a `fit`.
+
+    Sample weights are only passed if specified, so that estimators whose
+    `fit` doesn't accept them can still be used without weights.
+    """
+    return {} if sample_weight is None else {"sample_weight": sample_weight}
+
+
 def is_binary(x):
     return set(x.ravel()).issubset({0, 1})
 
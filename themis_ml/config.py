@@ -0,0 +1,90 @@
+"""Library-wide configuration.
+
+`working_memory` bounds the size, in MiB, of the temporary arrays allocated
+by memory-heavy operations, which then process their input in row chunks.
+This includes `LinearACFClassifier` and `MultipleROClassifier` prediction,
+the `Relabeller.transform` input check, the mean difference metrics, and the
+residuals in `stats_utils`.
+
+    >>> import themis_ml
+    >>> with themis_ml.config_context(working_memory=128):
+    ...     pred = estimator.predict(X, s)
+"""
+
+from contextlib import contextmanager
+
+_global_config = {
+    "working_memory": 1024,
+}
+
+
+def get_config():
+    """Get the current configuration.
+
+    :returns: configuration keys mapped to their values.
+    :rtype: dict
+    """
+    return _global_config.copy()
+
+
+def set_config(working_memory=None):
+    """Set the global configuration.
+
+    :param int|float|None working_memory: if specified, the maximum size of
+        temporary arrays in MiB. Default: 1024.
+    """
+    if working_memory is not None:
+        if working_memory <= 0:
+            raise ValueError(
+                "working_memory must be positive, got %s" % working_memory)
+        _global_config["working_memory"] = working_memory
+
+
+@contextmanager
+def config_context(**new_config):
+    """Set the global configuration within a context.
+
+    :param new_config: keyword arguments of `set_config`.
+    """
+    old_config = get_config()
+    set_config(**new_config)
+    try:
+        yield
+    finally:
+        set_config(**old_config)
+
+
+def get_chunk_n_rows(row_bytes, max_n_rows=None, working_memory=None):
+    """Compute the number of rows of a chunk that fits in working memory.
+
+    :param int row_bytes: size in bytes of the temporary arrays allocated per
+        row.
+    :param int|None max_n_rows: maximum number of rows.
+    :param int|float|None working_memory: working memory in MiB. By default,
+        use the `working_memory` configuration.
+    :returns: number of rows per chunk, at least 1.
+    :rtype: int
+    """
+    if working_memory is None:
+        working_memory = _global_config["working_memory"]
+    chunk_n_rows = int(working_memory * (2 ** 20) // max(row_bytes, 1))
+    if max_n_rows is not None:
+        chunk_n_rows = min(chunk_n_rows, max_n_rows)
+    return max(chunk_n_rows, 1)
+
+
+def gen_row_chunks(n_rows, row_bytes, chunk_n_rows=None):
+    """Generate slices of row chunks that fit in working memory.
+
+    :param int n_rows: total number of rows.
+    :param int row_bytes: size in bytes of the temporary arrays allocated per
+        row.
+    :param int|None chunk_n_rows: if specified, the number of rows per chunk
+        instead of the number computed from the working memory.
+    :yields: slice of each chunk.
+    """
+    if chunk_n_rows is None:
+        chunk_n_rows = get_chunk_n_rows(row_bytes, max_n_rows=n_rows)
+    chunk_n_rows = max(chunk_n_rows, 1)
+    for start in range(0, n_rows, chunk_n_rows):
+        yield slice(start, min(start + chunk_n_rows, n_rows))
@@ -1,7 +1,32 @@
-from .datasets import german_credit, census_income
+import importlib
+import sys
 
 
-__all__ = [
-    "german_credit",
-    "census_income",
-    ]
+# public functions mapped to the submodule that defines them
+_SUBMODULES = {
+    "german_credit": ".datasets",
+    "census_income": ".datasets",
+    "german_credit_schema": ".datasets",
+    "census_income_schema": ".datasets",
+    "make_biased_classification": ".synthetic",
+}
+
+__all__ = list(_SUBMODULES)
+
+# the dataset loaders import pandas and the dataset variable maps, so they're
+# only imported on first access where module-level __getattr__ is supported.
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _SUBMODULES:
+            submodule = importlib.import_module(_SUBMODULES[name], __name__)
+            return getattr(submodule, name)
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+
+    def __dir__():
+        return sorted(list(globals()) + __all__)
+else:
+    from .datasets import (  # noqa: F401
+        german_credit, census_income, german_credit_schema,
+        census_income_schema)
+    from .synthetic import make_biased_classification  # noqa: F401
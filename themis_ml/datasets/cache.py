@@ -0,0 +1,165 @@
+"""On-disk columnar cache for datasets.
+
+Loaded datasets are stored under the cache home directory, one directory per
+DataFrame with a `meta.json` header and one `.npy` file per column.
+Subsequent loads memory-map the column files, so they're near-instant.
+
+The cache home is `$THEMIS_ML_CACHE` if it's set, otherwise
+`$XDG_CACHE_HOME/themis_ml` or `~/.cache/themis_ml`.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .. import __version__
+
+META_FILENAME = "meta.json"
+# bump this whenever the cached DataFrames change format
+CACHE_VERSION = 2
+
+
+def get_cache_home(cache_home=None):
+    """Get the path to the themis-ml dataset cache directory.
+
+    :param str|None cache_home: cache directory. If None, use the
+        `THEMIS_ML_CACHE` environment variable or the user cache directory.
+    :returns: path to the cache directory.
+    :rtype: str
+    """
+    if cache_home is None:
+        cache_home = os.environ.get(
+            "THEMIS_ML_CACHE",
+            os.path.join(
+                os.environ.get(
+                    "XDG_CACHE_HOME", os.path.join("~", ".cache")),
+                "themis_ml"))
+    return os.path.expanduser(cache_home)
+
+
+def clear_cache(cache_home=None):
+    """Delete all cached datasets."""
+    cache_home = get_cache_home(cache_home)
+    if os.path.isdir(cache_home):
+        shutil.rmtree(cache_home)
+
+
+def file_checksum(paths):
+    """Compute the md5 checksum of the contents of one or more files."""
+    md5 = hashlib.md5()
+    for path in paths:
+        with open(str(path), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                md5.update(block)
+    return md5.hexdigest()
+
+
+def cache_path(name, data_paths, cache_home=None):
+    """Get the cache directory of a dataset.
+
+    The directory is keyed on the package version, cache format version, and
+    the checksum of the raw data files, so that it's invalidated whenever
+    any one of them changes.
+    """
+    return os.path.join(
+        get_cache_home(cache_home),
+        "%s-%s-%s-%s" % (
+            name, __version__, CACHE_VERSION,
+            file_checksum(data_paths)[:16]))
+
+
+def _to_json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def write_frame(df, path):
+    """Write a DataFrame to a columnar cache directory.
+
+    Object columns are stored as integer codes and a list of unique values.
+    The directory is written atomically.
+
+    :param pd.DataFrame df: DataFrame to cache.
+    :param str path: cache directory.
+    """
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    tmp_path = tempfile.mkdtemp(dir=parent)
+    try:
+        columns = []
+        for i, (name, series) in enumerate(df.items()):
+            column = {"name": _to_json_value(name), "file": "%d.npy" % i}
+            if isinstance(series.dtype, pd.api.types.CategoricalDtype):
+                column["kind"] = "category"
+                column["categories"] = [
+                    _to_json_value(c) for c in series.cat.categories]
+                column["ordered"] = bool(series.cat.ordered)
+                values = series.cat.codes.values
+            elif pd.api.types.is_object_dtype(series) or \
+                    pd.api.types.is_string_dtype(series):
+                # missing values are stored with the code -1
+                codes, uniques = pd.factorize(series)
+                column["kind"] = "object"
+                column["dtype"] = str(series.dtype)
+                column["categories"] = [_to_json_value(u) for u in uniques]
+                values = codes.astype("int32")
+            else:
+                column["kind"] = "array"
+                values = series.values
+            np.save(os.path.join(tmp_path, column["file"]), values)
+            columns.append(column)
+        np.save(os.path.join(tmp_path, "index.npy"), np.asarray(df.index))
+        with open(os.path.join(tmp_path, META_FILENAME), "w") as f:
+            json.dump({"columns": columns}, f)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another process wrote the cache first
+        shutil.rmtree(tmp_path)
+
+
+def _load_array(path, mmap_mode):
+    # view memory-mapped arrays as plain ndarrays, which still share the
+    # memory-mapped buffer.
+    return np.load(path, mmap_mode=mmap_mode).view(np.ndarray)
+
+
+def read_frame(path, mmap_mode="c"):
+    """Read a DataFrame from a columnar cache directory.
+
+    :param str path: cache directory.
+    :param str|None mmap_mode: memory-map mode passed to `numpy.load`. By
+        default, columns are memory-mapped copy-on-write, so modifying the
+        DataFrame doesn't modify the cache.
+    :returns: cached DataFrame.
+    :rtype: pd.DataFrame
+    """
+    with open(os.path.join(path, META_FILENAME)) as f:
+        meta = json.load(f)
+    data = {}
+    for column in meta["columns"]:
+        values = _load_array(
+            os.path.join(path, column["file"]), mmap_mode)
+        if column["kind"] == "category":
+            values = pd.Categorical.from_codes(
+                values, column["categories"], ordered=column["ordered"])
+        elif column["kind"] == "object":
+            values = pd.Series(pd.Categorical.from_codes(
+                values, column["categories"])).astype(column["dtype"]).values
+        data[column["name"]] = values
+    index = _load_array(os.path.join(path, "index.npy"), mmap_mode)
+    return pd.DataFrame(
+        data, index=index, columns=[c["name"] for c in meta["columns"]],
+        copy=False)
+
+
+def is_cached(path):
+    return os.path.isfile(os.path.join(path, META_FILENAME))
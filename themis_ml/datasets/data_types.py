@@ -2,6 +2,9 @@
 
 import enum
 
+import numpy as np
+import pandas as pd
+
 from collections import OrderedDict
 
 
@@ -16,12 +19,70 @@ class Variable(object):
 
     def __init__(
             self, name, variable_type, transformer=None, is_target=False,
-            ignore=False):
+            ignore=False, categories=None):
         self.name = name
         self.variable_type = variable_type
         self.transformer = transformer
         self.is_target = is_target
         self.ignore = ignore
+        self.categories = categories
+
+    @property
+    def category_domain(self):
+        """Get the sorted human-readable categories of the variable.
+
+        The domain is either specified explicitly with `categories` or
+        derived from a dictionary transformer. It's None if it can't be
+        known without reading the data.
+        """
+        if self.categories is not None:
+            return sorted(self.categories)
+        if isinstance(self.transformer, dict):
+            return sorted(set(self.transformer.values()))
+        return None
+
+    def _transform_value(self, x):
+        try:
+            return self.transformer[x]
+        except TypeError:
+            return self.transformer(x)
+
+    def decode(self, series, categories=None):
+        """Convert raw codes to human-readable values with compact dtypes.
+
+        The transformer is only applied to the unique values of the series,
+        which are then broadcast back to all rows with their category codes.
+        Binary variables are stored as uint8, ordered categorical variables
+        as int8, and non-ordered categorical variables as pandas categoricals
+        with sorted categories.
+
+        :param pd.Series series: raw values of the variable.
+        :param list|None categories: categories of non-ordered categorical
+            variables. If None, the categories are the sorted decoded values
+            found in the series. Specifying categories makes the dtype of
+            the decoded values independent of the rows in the series.
+        :returns: decoded values.
+        :rtype: pd.Series
+        """
+        if self.transformer is None:
+            return series
+        codes, uniques = pd.factorize(series)
+        decoded_uniques = [self._transform_value(x) for x in uniques]
+        if self.variable_type == VariableType.NON_ORDERED_CATEGORICAL:
+            # different raw values may be decoded to the same category
+            categories = pd.Categorical(
+                decoded_uniques, categories=categories)
+            codes = np.where(
+                codes == -1, -1, categories.codes.take(codes))
+            return pd.Series(
+                pd.Categorical.from_codes(codes, categories.categories),
+                index=series.index, name=series.name)
+        dtype = "uint8" if self.variable_type == VariableType.BINARY else \
+            "int8" if self.variable_type == VariableType.ORDERED_CATEGORICAL \
+            else None
+        return pd.Series(
+            np.asarray(decoded_uniques, dtype=dtype).take(codes),
+            index=series.index, name=series.name)
 
 
 class VariableMap(object):
@@ -30,6 +91,13 @@ class VariableMap(object):
         self._variables = variables
         targets = [v.name for v in variables if v.is_target]
         self._targets = targets if len(targets) > 0 else None
+        self._variable_map = OrderedDict([(v.name, v) for v in variables])
+        self._variables_by_type = {
+            variable_type: [
+                k for k, v in self._variable_map.items()
+                if v.variable_type == variable_type
+                and not v.is_target and not v.ignore]
+            for variable_type in VariableType}
 
     @property
     def all_variables(self):
@@ -37,13 +105,10 @@ class VariableMap(object):
 
     @property
     def variable_map(self):
-        return OrderedDict([(v.name, v) for v in self._variables])
+        return self._variable_map
 
     def _get_variables(self, variable_type):
-        return [
-            k for k, v in self.variable_map.items()
-            if v.variable_type == variable_type
-            and not v.is_target and not v.ignore]
+        return list(self._variables_by_type[variable_type])
 
     @property
     def binary_variables(self):
@@ -65,6 +130,164 @@ class VariableMap(object):
     def targets(self):
         return self._targets
 
+    @property
+    def category_domains(self):
+        """Get the category domain of each non-ordered categorical variable.
+
+        :returns: variable names mapped to their sorted categories, or None
+            if the categories can't be known without reading the data.
+        :rtype: OrderedDict[str, list|None]
+        """
+        variable_map = self.variable_map
+        return OrderedDict(
+            (name, variable_map[name].category_domain)
+            for name in self.non_ordered_categorical_variables)
+
+    def compile(self, data=None, category_domains=None):
+        """Compile the variable map into a model-ready design matrix schema.
+
+        The categories of non-ordered categorical variables are taken from
+        `category_domains` if specified, otherwise from the categories
+        observed in `data`, which gives the same column layout as the
+        model-ready data of the dataset loaders, otherwise from the domains
+        of the variable map.
+
+        :param pd.DataFrame|None data: decoded data used to infer categories.
+        :param dict[str, list]|None category_domains: categories of
+            non-ordered categorical variables.
+        :returns: compiled schema.
+        :rtype: CompiledSchema
+        """
+        domains = self.category_domains
+        category_domains = category_domains or {}
+        for name in domains:
+            if name in category_domains:
+                domains[name] = list(category_domains[name])
+            elif data is not None:
+                domains[name] = sorted(data[name].dropna().unique())
+            elif domains[name] is None:
+                raise ValueError(
+                    "categories of variable %s are unknown. Provide `data` "
+                    "or `category_domains`." % name)
+        return CompiledSchema(
+            dense_variables=(
+                self.numeric_variables + self.ordered_categorical_variables +
+                self.binary_variables),
+            category_domains=domains,
+            targets=self.targets or [])
+
+    def decode(self, df, category_domains=None):
+        """Convert raw codes to human-readable values in all variables.
+
+        :param pd.DataFrame df: raw data with a column for each variable.
+        :param dict[str, list]|None category_domains: categories of
+            non-ordered categorical variables, see `Variable.decode`.
+        :returns: decoded data.
+        :rtype: pd.DataFrame
+        """
+        variable_map = self.variable_map
+        category_domains = category_domains or {}
+        return pd.DataFrame(
+            OrderedDict(
+                (name, variable_map[name].decode(
+                    df[name], category_domains.get(name)))
+                for name in df.columns),
+            index=df.index)
+
+
+class CompiledSchema(object):
+
+    def __init__(self, dense_variables, category_domains, targets):
+        """Schema that maps decoded data to a sparse design matrix.
+
+        The column plan is computed once: dense variables first, followed by
+        one indicator column per category of each non-ordered categorical
+        variable. This is the same column layout as the model-ready data of
+        the dataset loaders, but no dense dummy DataFrame is created.
+
+        :param list[str] dense_variables: numeric, ordered categorical and
+            binary variables, in column order.
+        :param OrderedDict[str, list] category_domains: non-ordered
+            categorical variables mapped to their categories.
+        :param list[str] targets: target variables.
+        """
+        self.dense_variables = dense_variables
+        self.category_domains = category_domains
+        self.targets = targets
+        self.feature_names = list(dense_variables) + [
+            "%s_%s" % (name, category)
+            for name, domain in category_domains.items()
+            for category in domain]
+        offsets = np.cumsum(
+            [len(dense_variables)] +
+            [len(d) for d in category_domains.values()])
+        self._category_offsets = OrderedDict(
+            zip(category_domains, offsets[:-1]))
+        self._category_indexes = OrderedDict(
+            (name, pd.Index(domain))
+            for name, domain in category_domains.items())
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def _category_codes(self, series, name):
+        """Get positions of values in a variable's domain, -1 if missing."""
+        index = self._category_indexes[name]
+        if isinstance(series.dtype, pd.api.types.CategoricalDtype):
+            # only map the categories instead of every value
+            positions = index.get_indexer(series.cat.categories)
+            codes = series.cat.codes.values
+            return np.where(codes == -1, -1, positions.take(codes))
+        return index.get_indexer(series.values)
+
+    def transform(self, df, protected_class=None, disadvantaged=None,
+                  dtype="float64"):
+        """Create a sparse design matrix, targets, and protected class.
+
+        :param pd.DataFrame df: decoded data, e.g. the raw data returned by
+            the dataset loaders.
+        :param str|None protected_class: name of the protected class
+            variable.
+        :param object|None disadvantaged: value of `protected_class` that
+            denotes the disadvantaged group. If None, `protected_class` must
+            be a binary variable where 1 is the disadvantaged group.
+        :param str dtype: dtype of the design matrix.
+        :returns: tuple of CSR matrix of shape (n, n_features), target array
+            of shape (n, ) or None if there is no target, and protected class
+            array of shape (n, ) or None if `protected_class` is None.
+        :rtype: tuple
+        """
+        from scipy import sparse
+        n = df.shape[0]
+        n_dense = len(self.dense_variables)
+        n_columns = n_dense + len(self.category_domains)
+        # every row has one entry per dense variable and one per categorical
+        # variable, so the matrix is built directly in CSR format.
+        data = np.empty((n, n_columns), dtype=dtype)
+        indices = np.empty((n, n_columns), dtype="int32")
+        for i, name in enumerate(self.dense_variables):
+            data[:, i] = df[name].values
+            indices[:, i] = i
+        for i, (name, offset) in enumerate(
+                self._category_offsets.items(), n_dense):
+            codes = self._category_codes(df[name], name)
+            data[:, i] = codes != -1
+            indices[:, i] = offset + np.maximum(codes, 0)
+        X = sparse.csr_matrix(
+            (data.ravel(), indices.ravel(),
+             np.arange(0, n * n_columns + 1, n_columns)),
+            shape=(n, self.n_features))
+        X.eliminate_zeros()
+
+        y = df[self.targets[0]].values if self.targets else None
+        s = None
+        if protected_class is not None:
+            s = df[protected_class].values
+            s = (s == disadvantaged) if disadvantaged is not None else s
+            s = np.asarray(s, dtype="uint8")
+        return X, y, s
+
 
 def string_cleaner(s):
     """Function for cleaning raw string values.
@@ -1,7 +1,13 @@
 """Datasets for Fairness-aware Analysis or Modeling."""
 
+import json
+import os
+import warnings
+
 import pandas as pd
 
+from collections import OrderedDict
+
 from pathlib2 import Path
 from os.path import dirname
 
@@ -9,33 +15,104 @@ from .german_credit_data_map import (
     german_credit_variable_map, preprocess_german_credit_data)
 from .census_income_data_map import (
     preprocess_census_income_data, census_income_variable_map)
-from .data_types import VariableType
+from . import cache as _cache
+
+
+CENSUS_INCOME_PARTITION_DTYPE = pd.api.types.CategoricalDtype(
+    ["test_set", "training_set"])
 
 
 def _data_path():
     return Path(dirname(__file__)) / "data"
 
 
-def _map_transformer(series, variable_map):
-    """Private function for making categorical variables human-readable.
+def _load(name, data_paths, load_raw, preprocess, raw, cache):
+    """Load a dataset, reading from and writing to the on-disk cache.
 
-    For raw datasets that use non-human-readable codes in categorical
-    variables, this function is used to convert them to human-readable values.
+    :param str name: name of the dataset.
+    :param list[Path] data_paths: raw data files of the dataset.
+    :param callable load_raw: function that loads the raw DataFrame.
+    :param callable preprocess: function that prepares the raw DataFrame
+        for modeling.
+    :param bool raw: whether to load the raw or model-ready data.
+    :param bool cache: whether to use the cache.
+    """
+    if not cache:
+        out = load_raw()
+        return out if raw else preprocess(out)
+    cache_path = _cache.cache_path(name, data_paths)
+    raw_path = str(Path(cache_path) / "raw")
+    model_ready_path = str(Path(cache_path) / "model_ready")
+    path = raw_path if raw else model_ready_path
+    if _cache.is_cached(path):
+        return _cache.read_frame(path)
+
+    if _cache.is_cached(raw_path):
+        out = _cache.read_frame(raw_path)
+    else:
+        out = load_raw()
+        if not _write_cache(out, raw_path):
+            return out if raw else preprocess(out)
+    if not raw:
+        out = preprocess(out)
+        if not _write_cache(out, model_ready_path):
+            return out
+    return _cache.read_frame(path)
+
+
+def _write_cache(df, path):
+    """Write a DataFrame to the cache, warning if the cache isn't writable.
+
+    :returns: whether the DataFrame was written to the cache.
+    :rtype: bool
     """
-    variable = variable_map[series.name]
-    if variable.transformer is None:
-        return series
     try:
-        return series.map(lambda x: variable.transformer[x])
-    except TypeError:
-        return series.map(variable.transformer)
+        _cache.write_frame(df, path)
+    except (IOError, OSError) as e:
+        warnings.warn(
+            "could not write to the dataset cache, loading without it: %s. "
+            "Set THEMIS_ML_CACHE to a writable directory or pass "
+            "cache=False." % e)
+        return False
+    return True
 
 
 def _apply_data_map(df, variable_map):
-    return df.apply(_map_transformer, variable_map=variable_map)
+    """Make categorical variables human-readable.
+
+    For raw datasets that use non-human-readable codes in categorical
+    variables, this function is used to convert them to human-readable values.
+
+    :param pd.DataFrame df: raw data.
+    :param VariableMap variable_map: variable map of the dataset.
+    """
+    return variable_map.decode(df)
+
+
+def _concat_categorical_frames(frames):
+    """Concatenate DataFrames, keeping categorical columns as categoricals.
+
+    pandas converts categoricals with different categories to object columns
+    when concatenating them, so categories are first unioned.
+    """
+    for column in frames[0].columns:
+        if not isinstance(
+                frames[0][column].dtype, pd.api.types.CategoricalDtype):
+            continue
+        categories = sorted(set().union(
+            *[f[column].cat.categories for f in frames]))
+        for f in frames:
+            f[column] = f[column].cat.set_categories(categories)
+    return pd.concat(frames)
+
+
+def _load_german_credit_raw():
+    return _apply_data_map(
+        pd.read_csv(str(_data_path() / "german_credit.csv")),
+        german_credit_variable_map)
 
 
-def german_credit(raw=False):
+def german_credit(raw=False, cache=True):
     """Load German Credit Dataset.
 
     The target variable is "credit_risk", where 0 = bad and 1 = good
@@ -51,17 +128,148 @@ def german_credit(raw=False):
 
         Note: Raw data does not have this ordering, nor does it have dummified
         categorical variables.
+    :param bool cache: if True, the raw and model-ready data are cached on
+        disk after the first load (see `themis_ml.datasets.cache`), and
+        subsequent loads are memory-mapped from the cache.
     :returns: DataFrame of raw or model-ready data.
     """
-    out = _apply_data_map(
-        pd.read_csv(str(_data_path() / "german_credit.csv")),
-        german_credit_variable_map.variable_map)
-    if raw:
-        return out
-    return preprocess_german_credit_data(out)
+    return _load(
+        "german_credit", [_data_path() / "german_credit.csv"],
+        _load_german_credit_raw, preprocess_german_credit_data, raw, cache)
+
+
+def german_credit_schema(cache=True):
+    """Compile the German Credit schema for building sparse design matrices.
+
+    The schema's `transform` method takes the raw data, i.e.
+    `german_credit(raw=True)`, and returns a CSR design matrix with the same
+    columns as the model-ready data, the target, and optionally a protected
+    class array.
+
+    :param bool cache: passed to `german_credit` to load the categories.
+    :returns: compiled schema.
+    :rtype: CompiledSchema
+    """
+    return german_credit_variable_map.compile(
+        german_credit(raw=True, cache=cache))
+
 
+def _census_income_data_paths():
+    return [
+        _data_path() / "census_income_1994_1995_train.csv",
+        _data_path() / "census_income_1994_1995_test.csv"]
 
-def census_income(raw=False):
+
+def _load_census_income_raw():
+    train_path, test_path = _census_income_data_paths()
+    train = pd.read_csv(
+        str(train_path),
+        names=census_income_variable_map.all_variables) \
+        .pipe(_apply_data_map, census_income_variable_map)
+    test = pd.read_csv(
+        str(test_path),
+        names=census_income_variable_map.all_variables) \
+        .pipe(_apply_data_map, census_income_variable_map)
+    return _concat_categorical_frames([
+        _assign_census_income_partition(train, "training_set"),
+        _assign_census_income_partition(test, "test_set")])
+
+
+def _assign_census_income_partition(df, partition):
+    return df.assign(dataset_partition=pd.Series(
+        partition, index=df.index, dtype=CENSUS_INCOME_PARTITION_DTYPE))
+
+
+def _scan_category_domains(data_paths, variable_map, names, chunksize):
+    """Find the categories of variables by scanning raw data files.
+
+    Only the columns of the variables are read, in chunks, so memory usage is
+    bounded by the chunk size and the number of categories.
+    """
+    uniques = {name: set() for name in names}
+    for path in data_paths:
+        for chunk in pd.read_csv(
+                str(path), names=variable_map.all_variables, usecols=names,
+                chunksize=chunksize):
+            for name in names:
+                uniques[name].update(chunk[name].dropna().unique())
+    return {
+        name: sorted(set(
+            variable_map.variable_map[name]._transform_value(x)
+            for x in uniques[name]))
+        for name in names}
+
+
+def _census_income_category_domains(cache, chunksize):
+    """Get the categories of census income non-ordered categorical variables.
+
+    The categories are the decoded values observed in the raw data files,
+    found by scanning them once, which are the same categories that the
+    full model-ready data has dummy columns for. This holds for variables
+    with a dictionary transformer too, whose codes may not all be observed.
+    If `cache` is True, the result is stored in the dataset cache.
+    """
+    names = census_income_variable_map.non_ordered_categorical_variables
+    data_paths = _census_income_data_paths()
+    if cache:
+        # the cache path checksums the data files, so it's only computed
+        # when the cache is used
+        path = os.path.join(
+            _cache.cache_path("census_income", data_paths),
+            "category_domains.json")
+        if os.path.isfile(path):
+            with open(path) as f:
+                domains = json.load(f)
+            if set(domains) == set(names):
+                return OrderedDict((name, domains[name]) for name in names)
+    domains = _scan_category_domains(
+        data_paths, census_income_variable_map, names, chunksize)
+    if cache:
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, "w") as f:
+                json.dump(domains, f)
+        except (IOError, OSError) as e:
+            warnings.warn(
+                "could not write the category domains to the dataset "
+                "cache: %s" % e)
+    return OrderedDict((name, domains[name]) for name in names)
+
+
+def _iter_census_income(raw, cache, chunksize):
+    category_domains = _census_income_category_domains(cache, chunksize)
+    for path, partition in zip(
+            _census_income_data_paths(), ["training_set", "test_set"]):
+        for chunk in pd.read_csv(
+                str(path), names=census_income_variable_map.all_variables,
+                chunksize=chunksize):
+            chunk = _assign_census_income_partition(
+                census_income_variable_map.decode(chunk, category_domains),
+                partition)
+            yield chunk if raw else preprocess_census_income_data(chunk)
+
+
+def census_income_schema(cache=True, chunksize=100000):
+    """Compile the Census Income schema for building sparse design matrices.
+
+    The schema's `transform` method takes raw data, i.e.
+    `census_income(raw=True)` or one of its chunks, and returns a CSR design
+    matrix with the same columns as the model-ready data, the target, and
+    optionally a protected class array. This avoids creating the dense dummy
+    DataFrame, which dominates the memory usage of the model-ready data.
+
+    :param bool cache: whether to cache the category domains, which are
+        found by scanning the raw data files.
+    :param int chunksize: number of rows to read at a time when scanning.
+    :returns: compiled schema.
+    :rtype: CompiledSchema
+    """
+    return census_income_variable_map.compile(
+        category_domains=_census_income_category_domains(cache, chunksize))
+
+
+def census_income(raw=False, cache=True, chunksize=None):
     """Load Census Income Data from 1994 - 1995.
 
     The target variable is "income_gt_50k" (income above $50,000), where 0 is
@@ -76,20 +284,20 @@ def census_income(raw=False):
         - non-ordered categorical features.
         - target.
 
-    :returns: DataFrame of raw or model-ready data.
+    :param bool cache: if True, the raw and model-ready data are cached on
+        disk after the first load (see `themis_ml.datasets.cache`), and
+        subsequent loads are memory-mapped from the cache.
+    :param int|None chunksize: if specified, return an iterator of
+        DataFrames with at most `chunksize` rows each, training set first.
+        Non-ordered categorical variables have the same categories in every
+        chunk, so model-ready chunks have the same dummy columns as the full
+        model-ready data. When `cache` is True, only the category domains are
+        cached.
+    :returns: DataFrame of raw or model-ready data, or an iterator of
+        DataFrames if `chunksize` is specified.
     """
-    train = pd.read_csv(
-        str(_data_path() / "census_income_1994_1995_train.csv"),
-        names=census_income_variable_map.all_variables) \
-        .pipe(_apply_data_map, census_income_variable_map.variable_map)
-    test = pd.read_csv(
-        str(_data_path() / "census_income_1994_1995_test.csv"),
-        names=census_income_variable_map.all_variables) \
-        .pipe(_apply_data_map, census_income_variable_map.variable_map)
-    out = (
-        pd.concat([
-            train.assign(dataset_partition="training_set"),
-            test.assign(dataset_partition="test_set")]))
-    if raw:
-        return out
-    return preprocess_census_income_data(out)
+    if chunksize is not None:
+        return _iter_census_income(raw, cache, chunksize)
+    return _load(
+        "census_income", _census_income_data_paths(),
+        _load_census_income_raw, preprocess_census_income_data, raw, cache)
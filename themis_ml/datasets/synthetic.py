@@ -0,0 +1,118 @@
+"""Generate synthetic datasets with known discrimination."""
+
+import os
+
+import numpy as np
+
+from math import sqrt
+
+
+def _check_random_state(random_state):
+    if isinstance(random_state, np.random.RandomState):
+        return random_state
+    return np.random.RandomState(random_state)
+
+
+def _allocate(shape, dtype, memmap_dir, name):
+    if memmap_dir is None:
+        return np.empty(shape, dtype=dtype)
+    return np.lib.format.open_memmap(
+        os.path.join(memmap_dir, "%s.npy" % name), mode="w+", dtype=dtype,
+        shape=shape)
+
+
+def make_biased_classification(
+        n_samples=1000, n_features=10, bias=0.2, base_rates=(0.5, 0.5),
+        protected_rate=0.5, proxy_strength=0.5, class_sep=1.0,
+        dtype="float64", chunksize=None, memmap_dir=None,
+        return_fair_labels=False, random_state=None):
+    """Generate a binary classification dataset with biased labels.
+
+    Each observation is generated as follows:
+
+    - the protected class s ~ Bernoulli(protected_rate), where 1 is the
+      disadvantaged group.
+    - the fair label y_fair ~ Bernoulli(base_rates[s]).
+    - the first n_features - 1 features are informative: they're normally
+      distributed around +/- class_sep / sqrt(n_features - 1) depending on
+      y_fair.
+    - the last feature is a proxy of s: it has unit variance and a
+      correlation of about proxy_strength with s. It's the standardized s,
+      (s - protected_rate) / sqrt(protected_rate * (1 - protected_rate)),
+      scaled by proxy_strength plus independent normal noise.
+    - the observed label y is y_fair, except that positive labels in the
+      disadvantaged group are flipped to negative with probability `bias`.
+
+    Therefore the ground-truth mean difference in y_fair is
+    base_rates[0] - base_rates[1], and in y it's
+    base_rates[0] - (1 - bias) * base_rates[1].
+
+    :param int n_samples: number of observations.
+    :param int n_features: number of features, including the proxy feature.
+        Must be at least 2.
+    :param float bias: probability of demoting a positive label in the
+        disadvantaged group.
+    :param tuple[float] base_rates: probability of a positive fair label in
+        the advantaged and disadvantaged group, respectively.
+    :param float protected_rate: proportion of the disadvantaged group.
+    :param float proxy_strength: correlation of the proxy feature with the
+        protected class, in [0, 1].
+    :param float class_sep: separation between the classes in feature space.
+    :param str dtype: dtype of the features.
+    :param int|None chunksize: if specified, generate the data in chunks of
+        `chunksize` >= 1 rows to bound the memory used by temporary arrays.
+    :param str|None memmap_dir: if specified, write X.npy, y.npy, s.npy (and
+        y_fair.npy) to this directory and return memory-mapped arrays.
+    :param bool return_fair_labels: if True, also return the fair labels.
+    :param int|np.random.RandomState|None random_state: random seed. The
+        generated data depends on both the seed and `chunksize`.
+    :returns: tuple of X of shape (n_samples, n_features), and y, s (and
+        y_fair) of shape (n_samples, ) with dtype uint8.
+    :rtype: tuple[np.array]
+    """
+    if n_features < 2:
+        raise ValueError("n_features must be at least 2, got %s" % n_features)
+    if not 0 <= proxy_strength <= 1:
+        raise ValueError(
+            "proxy_strength must be in [0, 1], got %s" % proxy_strength)
+    if chunksize is not None and chunksize < 1:
+        raise ValueError("chunksize must be at least 1, got %s" % chunksize)
+    random_state = _check_random_state(random_state)
+    chunksize = n_samples if chunksize is None else chunksize
+    base_rates = np.asarray(base_rates, dtype="float64")
+    n_informative = n_features - 1
+    feature_shift = class_sep / sqrt(n_informative)
+    proxy_noise = sqrt(1 - proxy_strength ** 2)
+    # the standard deviation of s, which is 0 if everyone is in one group
+    s_std = sqrt(protected_rate * (1 - protected_rate)) or 1.0
+
+    X = _allocate((n_samples, n_features), dtype, memmap_dir, "X")
+    y = _allocate((n_samples, ), "uint8", memmap_dir, "y")
+    s = _allocate((n_samples, ), "uint8", memmap_dir, "s")
+    y_fair = _allocate(
+        (n_samples, ), "uint8", memmap_dir if return_fair_labels else None,
+        "y_fair")
+    for start in range(0, n_samples, chunksize):
+        stop = min(start + chunksize, n_samples)
+        n = stop - start
+        s_chunk = random_state.random_sample(n) < protected_rate
+        y_fair_chunk = random_state.random_sample(n) < base_rates.take(
+            s_chunk.astype(int))
+        demoted = s_chunk & (random_state.random_sample(n) < bias)
+
+        informative = random_state.standard_normal((n, n_informative))
+        informative += np.where(
+            y_fair_chunk, feature_shift, -feature_shift)[:, np.newaxis]
+        X[start:stop, :n_informative] = informative
+        X[start:stop, n_informative] = \
+            proxy_strength * (s_chunk - protected_rate) / s_std + \
+            proxy_noise * random_state.standard_normal(n)
+        s[start:stop] = s_chunk
+        y_fair[start:stop] = y_fair_chunk
+        y[start:stop] = y_fair_chunk & ~demoted
+
+    out = (X, y, s, y_fair) if return_fair_labels else (X, y, s)
+    if memmap_dir is not None:
+        for array in out:
+            array.flush()
+    return out
@@ -0,0 +1,135 @@
+"""Reusable index of protected class groups.
+
+Metrics and estimators that take a protected class `s` validate it and build
+group masks on every call. When many of them are called with the same `s`,
+wrap it once in a `ProtectedGroups`, which is accepted wherever `s` is:
+
+    >>> groups = ProtectedGroups(s)
+    >>> mean_difference(y, groups)
+    >>> clf.fit(X, y, groups).predict(X, groups)
+"""
+
+import numpy as np
+
+from .profiling import span
+
+
+def _check_codes(s):
+    """Cast s to int group codes and check that it's binary.
+
+    Same check as `check_binary(np.array(s).astype(int))`, with a min/max
+    reduction instead of building a set of the values.
+    """
+    codes = np.asarray(s).astype(int).ravel()
+    with span("ProtectedGroups.check_binary", codes):
+        if codes.size and (codes.min() < 0 or codes.max() > 1):
+            raise ValueError("%s must be a binary variable" % codes)
+    return codes
+
+
+class ProtectedGroups(object):
+
+    n_groups = 2
+
+    def __init__(self, s):
+        """Create an index of the groups of a binary protected class.
+
+        `s` is validated once. Group counts, boolean masks and sorted index
+        arrays are computed lazily on first use and cached. Indexing, e.g.
+        with the train or test indices of a cross-validation split, returns
+        a `ProtectedGroups` of the subset without validating it again.
+
+        :param array-like|ProtectedGroups s: shape (n, ) binary protected
+            class variable, where 0 is the advantaged group and 1 is the
+            disadvantaged group.
+        """
+        self.codes = s.codes if isinstance(s, ProtectedGroups) else \
+            _check_codes(s)
+        self._cache = {}
+
+    @classmethod
+    def _from_codes(cls, codes):
+        """Create an index from codes that are already validated."""
+        groups = cls.__new__(cls)
+        groups.codes = codes
+        groups._cache = {}
+        return groups
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        codes = self.codes[index]
+        if np.ndim(codes) == 0:
+            return codes
+        return ProtectedGroups._from_codes(codes)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.codes if dtype is None else self.codes.astype(dtype)
+
+    def __reduce__(self):
+        # pickle only the codes, so that joblib hashes and memory-maps them
+        # regardless of what's cached
+        return (ProtectedGroups._from_codes, (self.codes, ))
+
+    def __repr__(self):
+        return "ProtectedGroups(n=%d, counts=%s)" % (
+            len(self), self.counts.tolist())
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    def _cached(self, key, func):
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    @property
+    def counts(self):
+        """Number of observations in each group.
+
+        :rtype: np.array[int]
+        """
+        return self._cached(
+            "counts",
+            lambda: np.bincount(self.codes, minlength=self.n_groups))
+
+    def mask(self, group):
+        """Get the boolean mask of a group.
+
+        :param int group: 0 for the advantaged group, 1 for the
+            disadvantaged group.
+        :rtype: np.array[bool]
+        """
+        self._check_group(group)
+        return self._cached(("mask", group), lambda: self.codes == group)
+
+    def indices(self, group):
+        """Get the sorted indices of the observations in a group.
+
+        :param int group: 0 for the advantaged group, 1 for the
+            disadvantaged group.
+        :rtype: np.array[int]
+        """
+        self._check_group(group)
+        return self._cached(
+            ("indices", group), lambda: np.flatnonzero(self.mask(group)))
+
+    def _check_group(self, group):
+        if group not in range(self.n_groups):
+            raise ValueError(
+                "group must be in [0, %d), got %s" % (self.n_groups, group))
+
+
+def check_protected_groups(s):
+    """Validate a protected class variable.
+
+    :param array-like|ProtectedGroups s: shape (n, ) binary protected class
+        variable.
+    :returns: `s` if it's already a `ProtectedGroups`, otherwise a new one.
+    :rtype: ProtectedGroups
+    """
+    if isinstance(s, ProtectedGroups):
+        return s
+    return ProtectedGroups(s)
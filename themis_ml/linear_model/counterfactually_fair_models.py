@@ -19,7 +19,12 @@ from sklearn.base import (
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.utils.validation import check_array, check_X_y, check_is_fitted
 
-from ..checks import check_binary, is_binary, is_continuous
+from ..checks import (
+    check_binary, check_sample_weight, is_binary, is_continuous,
+    sample_weight_kwargs)
+from ..config import gen_row_chunks
+from ..groups import check_protected_groups
+from ..profiling import span
 from ..stats_utils import pearson_residuals, deviance_residuals
 
 
@@ -31,23 +36,24 @@ def _get_continuous_X_index(X):
     return np.where(np.apply_along_axis(is_continuous, 0, X))[0]
 
 
-def _compute_binary_residuals(estimator, s, true, residual_type):
+def _compute_binary_residuals(estimator, s, true, residual_type, out=None):
     if residual_type == _BinaryResidualTypes.absolute:
         return _compute_absolute_residuals(
-            estimator, s, true, predict_proba=True)
+            estimator, s, true, predict_proba=True, out=out)
     elif residual_type == _BinaryResidualTypes.pearson:
         residual_func = pearson_residuals
     elif residual_type == _BinaryResidualTypes.deviance:
         residual_func = deviance_residuals
     else:
         raise ValueError("unsupported residual type: %s" % residual_type)
-    return residual_func(true, estimator.predict_proba(s)[:, 1])
+    return residual_func(true, estimator.predict_proba(s)[:, 1], out=out)
 
 
-def _compute_absolute_residuals(estimator, s, true, predict_proba=False):
+def _compute_absolute_residuals(
+        estimator, s, true, predict_proba=False, out=None):
     if predict_proba:
-        return true - estimator.predict_proba(s)[:, 1]
-    return true - estimator.predict(s)
+        return np.subtract(true, estimator.predict_proba(s)[:, 1], out=out)
+    return np.subtract(true, estimator.predict(s), out=out)
 
 
 class _BinaryResidualTypes(Enum):
@@ -87,11 +93,22 @@ class LinearACFClassifier(BaseEstimator, ClassifierMixin, MetaEstimatorMixin):
         self.binary_estimator = binary_estimator
         self.binary_residual_type = binary_residual_type
 
-    def fit(self, X, y, s):
-        """Fit model."""
+    def fit(self, X, y, s, sample_weight=None):
+        """Fit model.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like y: shape (n, ) binary target variable.
+        :param array-like|ProtectedGroups s: shape (n, ) binary protected
+            class variable.
+        :param array-like|None sample_weight: shape (n, ) sample weights
+            passed to the `fit` of the residual estimators and the target
+            estimator.
+        """
         X, y = check_X_y(X, y)
         y = check_binary(y)
-        s = check_binary(np.array(s).astype(int))
+        s = check_protected_groups(s).codes
+        sample_weight = check_sample_weight(sample_weight, y)
+        fit_kwargs = sample_weight_kwargs(sample_weight)
 
         # save the indices on the X adxis
         self.binary_index_ = _get_binary_X_index(X)
@@ -129,16 +146,20 @@ class LinearACFClassifier(BaseEstimator, ClassifierMixin, MetaEstimatorMixin):
                     "index %s is not in continuous_index_ or binary_index_")
             # fit residual estimator and compute residuals
             if estimator and compute_residual_func:
-                estimator.fit(residual_input, X[:, i])
-                self.fit_residuals_[:, i] = compute_residual_func(
-                    estimator, residual_input, X[:, i])
+                with span("LinearACFClassifier.residual_fit", X[:, i],
+                          column=i):
+                    estimator.fit(residual_input, X[:, i], **fit_kwargs)
+                    compute_residual_func(
+                        estimator, residual_input, X[:, i],
+                        out=self.fit_residuals_[:, i])
             else:
                 self.fit_residuals_[:, i] = 0
             self.compute_residual_funcs_.append(compute_residual_func)
             self.residual_estimators_.append(estimator)
 
         # fit target_estimator_
-        self.target_estimator_.fit(self.fit_residuals_, y)
+        with span("LinearACFClassifier.target_fit", self.fit_residuals_):
+            self.target_estimator_.fit(self.fit_residuals_, y, **fit_kwargs)
         return self
 
     def _compute_residuals_on_predict(self, X, s):
@@ -146,13 +167,28 @@ class LinearACFClassifier(BaseEstimator, ClassifierMixin, MetaEstimatorMixin):
         residual_input = s.reshape(-1, 1)
         for i, (estimator, compute_residual_func) in enumerate(
                 zip(self.residual_estimators_, self.compute_residual_funcs_)):
+            # the residuals of variables without a residual estimator are 0,
+            # as in `fit`.
             if estimator and compute_residual_func:
-                predict_residuals[:, i] = compute_residual_func(
-                    estimator, residual_input, X[:, i])
-            else:
-                predict_residuals[:, i] = self.fit_residuals_[:, i]
+                compute_residual_func(
+                    estimator, residual_input, X[:, i],
+                    out=predict_residuals[:, i])
         return predict_residuals
 
+    def _predict_chunks(self, predict_func, X, s):
+        """Apply a target estimator method to the residuals in row chunks.
+
+        The residuals and their temporaries take several n x p float64
+        arrays, so rows are processed in chunks bounded by the
+        `working_memory` configuration.
+        """
+        s = check_protected_groups(s).codes
+        return np.concatenate([
+            predict_func(self._compute_residuals_on_predict(
+                X[chunk], s[chunk]))
+            for chunk in gen_row_chunks(
+                X.shape[0], row_bytes=32 * X.shape[1])])
+
     def _check_fitted(self, X):
         X = check_array(X)
         if X.shape[1] != self.n_input_variables_:
@@ -178,14 +214,13 @@ class LinearACFClassifier(BaseEstimator, ClassifierMixin, MetaEstimatorMixin):
     def predict(self, X, s):
         """Generate predicted labels."""
         X = self._check_fitted(X)
-        return self.target_estimator_.predict(
-            self._compute_residuals_on_predict(X, s))
+        return self._predict_chunks(self.target_estimator_.predict, X, s)
 
     def predict_proba(self, X, s):
         """Generate predicted probabilities."""
-        self._check_fitted(X)
-        predict_residuals = self._compute_residuals_on_predict(X, s)
-        return self.target_estimator_.predict_proba(predict_residuals)
+        X = self._check_fitted(X)
+        return self._predict_chunks(
+            self.target_estimator_.predict_proba, X, s)
 
     @property
     def _binary_residual_type(self):
@@ -1,39 +1,87 @@
 """Module for Fairness-aware base estimators."""
 
-import numpy as np
-
+from collections import OrderedDict
+from joblib import Parallel, delayed
 from sklearn.base import (
     BaseEstimator, ClassifierMixin, MetaEstimatorMixin, clone)
-from sklearn.utils.validation import check_array, check_X_y, check_is_fitted
+from sklearn.utils.validation import (
+    check_array, check_X_y, check_is_fitted, check_memory)
+
+from .checks import (
+    check_binary, check_sample_weight, s_is_needed_on_fit,
+    s_is_needed_on_predict, sample_weight_kwargs)
+from .groups import check_protected_groups
+from .profiling import span
+
 
-from .checks import check_binary, s_is_needed_on_fit, s_is_needed_on_predict
+def _fit_transform_relabeller(relabeller, X, y, s, sample_weight=None):
+    """Fit a clone of the relabeller and relabel the targets.
+
+    This function is cached with `joblib.Memory` when the meta estimator's
+    `memory` parameter is specified, in which case the cache key is a hash
+    of the relabeller parameters and the X, y, s, and sample_weight arrays.
+    """
+    relabeller = clone(relabeller)
+    return relabeller, relabeller.fit_transform(
+        X, y, s=s, **sample_weight_kwargs(sample_weight))
 
 
 class FairnessAwareMetaEstimator(
         BaseEstimator, ClassifierMixin, MetaEstimatorMixin):
 
-    def __init__(self, estimator, relabeller=None):
+    def __init__(self, estimator, relabeller=None, memory=None):
         """Initialize metaestimator for composing fairness-aware methods.
 
         :param Estimator estimator:
         :param Transformer|None relabeller:
+        :param str|joblib.Memory|None memory: used to cache the fitted
+            relabeller and relabelled targets. If a string is given, it's the
+            path to a local caching directory. Useful during hyperparameter
+            search over `estimator`, since the relabelling then only happens
+            once per fold. By default, no caching is done.
         """
         self.relabeller = relabeller
         self.estimator = estimator
+        self.memory = memory
+
+    @property
+    def S_ON_FIT(self):
+        return self.relabeller is not None or \
+            getattr(self.estimator, "S_ON_FIT", False)
 
-    def fit(self, X, y, s=None):
+    @property
+    def S_ON_PREDICT(self):
+        return getattr(self.estimator, "S_ON_PREDICT", False)
+
+    def fit(self, X, y, s=None, sample_weight=None):
+        """Fit the relabeller, if any, and the estimator.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like y: shape (n, ) binary target variable.
+        :param array-like|ProtectedGroups|None s: shape (n, ) binary
+            protected class variable.
+        :param array-like|None sample_weight: shape (n, ) sample weights
+            passed to the `fit` of the relabeller and the estimator.
+        """
         X, y = check_X_y(X, y)
         y = check_binary(y)
+        if s is not None:
+            s = check_protected_groups(s)
+        sample_weight = check_sample_weight(sample_weight, y)
+        fit_kwargs = sample_weight_kwargs(sample_weight)
         self.relabeller_ = None
         self.estimator_ = clone(self.estimator)
         # fit_transform y labels using estimator
         if self.relabeller is not None:
-            self.relabeller_ = clone(self.relabeller)
-            y = self.relabeller_.fit_transform(X, y, s=s)
+            fit_transform_relabeller = check_memory(self.memory).cache(
+                _fit_transform_relabeller)
+            with span("FairnessAwareMetaEstimator.relabel", X):
+                self.relabeller_, y = fit_transform_relabeller(
+                    self.relabeller, X, y, s, sample_weight)
         # fit estimator
         if s_is_needed_on_fit(self.estimator_, s):
-            s = check_binary(np.array(s).astype(int))
-            self.estimator_.fit(X, y, s)
+            with span("FairnessAwareMetaEstimator.estimator_fit", X):
+                self.estimator_.fit(X, y, s, **fit_kwargs)
         else:
             # since relabeller by definition needs s, this checks whether
             # relabeller is None and the `s` array is provided.
@@ -41,13 +89,15 @@ class FairnessAwareMetaEstimator(
                 raise ValueError(
                     "`s` arg provided but %s fit doesn't accept `s`" %
                     self.estimator_)
-            self.estimator_.fit(X, y)
+            with span("FairnessAwareMetaEstimator.estimator_fit", X):
+                self.estimator_.fit(X, y, **fit_kwargs)
+        return self
 
     def predict(self, X, s=None):
         check_is_fitted(self, ["estimator_", "relabeller_"])
         X = check_array(X)
         if s_is_needed_on_predict(self.estimator_, s):
-            s = check_binary(np.array(s).astype(int))
+            s = check_protected_groups(s)
             return self.estimator_.predict(X, s)
         else:
             if s is not None:
@@ -63,7 +113,7 @@ class FairnessAwareMetaEstimator(
         check_is_fitted(self, ["estimator_", "relabeller_"])
         X = check_array(X)
         if s_is_needed_on_predict(self.estimator_, s):
-            s = check_binary(np.array(s).astype(int))
+            s = check_protected_groups(s)
             return self.estimator_.predict_proba(X, s)
         else:
             if s is not None:
@@ -71,3 +121,128 @@ class FairnessAwareMetaEstimator(
                     "`s` arg provided but %s predict doesn't accept `s`" %
                     self.estimator_)
             return self.estimator_.predict_proba(X)
+
+
+def _fit_attribute_estimator(estimator, X, y, s, sample_weight=None):
+    """Fit a clone of the estimator on one protected attribute.
+
+    :param ProtectedGroups|None s: protected class variable, or None if the
+        estimator's fit doesn't use it.
+    """
+    estimator = clone(estimator)
+    fit_kwargs = sample_weight_kwargs(sample_weight)
+    with span("PerAttributeFairnessEnsemble.estimator_fit", X):
+        if s is None:
+            return estimator.fit(X, y, **fit_kwargs)
+        return estimator.fit(X, y, s, **fit_kwargs)
+
+
+class PerAttributeFairnessEnsemble(BaseEstimator, MetaEstimatorMixin):
+
+    def __init__(self, estimator, n_jobs=None):
+        """Fit one fairness-aware estimator per protected attribute.
+
+        All attributes share the same X and y, e.g. one model each that is
+        fair with respect to sex, foreign worker status and age band. The
+        attributes are fitted in parallel worker processes, where X is
+        memory-mapped once and shared by all jobs instead of being pickled
+        for each of them.
+
+        If the estimator doesn't use `s` during fit (`S_ON_FIT` is False),
+        e.g. a `SingleROClassifier`, whose base estimator is the same for
+        every attribute, it's fitted only once and shared by all attributes,
+        which then only differ in the `s` passed on predict.
+
+        :param Estimator estimator: fairness-aware estimator that's cloned
+            for each protected attribute.
+        :param int|None n_jobs: number of jobs to fit the attributes in
+            parallel. None means 1, -1 means using all processors.
+        """
+        self.estimator = estimator
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y, protected, sample_weight=None):
+        """Fit an estimator for each protected attribute.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like y: shape (n, ) binary target variable.
+        :param pd.DataFrame|dict[str, array-like|ProtectedGroups] protected:
+            protected attribute names mapped to shape (n, ) binary protected
+            class variables.
+        :param array-like|None sample_weight: shape (n, ) sample weights
+            passed to the `fit` of every estimator.
+        :returns: self, with `estimators_` mapping each protected attribute
+            to its fitted estimator.
+        """
+        X, y = check_X_y(X, y)
+        y = check_binary(y)
+        sample_weight = check_sample_weight(sample_weight, y)
+        protected = self._check_protected(protected, X.shape[0])
+        if getattr(self.estimator, "S_ON_FIT", False):
+            fitted = Parallel(n_jobs=self.n_jobs, mmap_mode="r")(
+                delayed(_fit_attribute_estimator)(
+                    self.estimator, X, y, s, sample_weight)
+                for s in protected.values())
+        else:
+            fitted = [_fit_attribute_estimator(
+                self.estimator, X, y, None, sample_weight)] * len(protected)
+        self.estimators_ = OrderedDict(zip(protected, fitted))
+        return self
+
+    def predict(self, X, protected):
+        """Generate predictions of each protected attribute's estimator.
+
+        :param array-like X: shape (n, p) input data.
+        :param pd.DataFrame|dict[str, array-like|ProtectedGroups] protected:
+            protected attribute names mapped to shape (n, ) binary protected
+            class variables. Only these attributes are predicted.
+        :returns: protected attribute names mapped to shape (n, )
+            predictions.
+        :rtype: OrderedDict[str, np.array]
+        """
+        return self._predict("predict", X, protected)
+
+    def predict_proba(self, X, protected):
+        """Generate predicted probabilities of each attribute's estimator.
+
+        :returns: protected attribute names mapped to shape (n, 2)
+            predicted probabilities.
+        :rtype: OrderedDict[str, np.array]
+        """
+        return self._predict("predict_proba", X, protected)
+
+    def _predict(self, method, X, protected):
+        check_is_fitted(self, "estimators_")
+        X = check_array(X)
+        protected = self._check_protected(protected, X.shape[0])
+        preds = OrderedDict()
+        # predictions of a shared estimator that doesn't use `s` on predict
+        shared_preds = {}
+        for attribute, s in protected.items():
+            if attribute not in self.estimators_:
+                raise ValueError(
+                    "no estimator was fitted for protected attribute %s" %
+                    attribute)
+            estimator = self.estimators_[attribute]
+            if getattr(estimator, "S_ON_PREDICT", False):
+                preds[attribute] = getattr(estimator, method)(X, s)
+            else:
+                if id(estimator) not in shared_preds:
+                    shared_preds[id(estimator)] = getattr(
+                        estimator, method)(X)
+                preds[attribute] = shared_preds[id(estimator)]
+        return preds
+
+    @staticmethod
+    def _check_protected(protected, n):
+        protected = OrderedDict(
+            (attribute, check_protected_groups(s))
+            for attribute, s in protected.items())
+        if not protected:
+            raise ValueError("protected must have at least one attribute")
+        for attribute, s in protected.items():
+            if len(s) != n:
+                raise ValueError(
+                    "protected attribute %s must have %d observations, "
+                    "found %d" % (attribute, n, len(s)))
+        return protected
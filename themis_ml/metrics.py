@@ -1,46 +1,210 @@
-"""Module for Fairness-aware scoring metrics."""
+"""Module for Fairness-aware scoring metrics.
+
+The protected class `s` of every metric can also be a
+`themis_ml.groups.ProtectedGroups`, which skips its validation when many
+metrics are computed with the same `s`.
+
+Every metric accepts a `sample_weight`, interpreted as frequency weights:
+a row with weight w counts as w identical observations, so metrics of
+pre-aggregated (y, s, count) rows, weighted by count, are the same as those
+of the expanded data. The sum of weights of a group is its effective sample
+size in confidence intervals.
+"""
 
 import numpy as np
-import scipy
 
-from .checks import check_binary
+from .checks import check_binary, check_sample_weight
+from .config import gen_row_chunks
+from .groups import ProtectedGroups
+from functools import partial
 from math import sqrt
-from scipy.stats import t
 
 DEFAULT_CI = 0.975
 
 
-def mean_confidence_interval(x, confidence=0.95):
+def _t_ppf(q, df):
+    """Compute the quantile function of Student's t distribution.
+
+    `scipy.special` is imported on first use instead of `scipy.stats`, which
+    is much slower to import.
+    """
+    from scipy.special import stdtrit
+    return stdtrit(df, q)
+
+
+def mean_confidence_interval(x, confidence=0.95, sample_weight=None):
     a = np.array(x) * 1.0
-    mu, se = np.mean(a), scipy.stats.sem(a)
-    me = se * t._ppf((1 + confidence) / 2., len(a) - 1)
+    if sample_weight is None:
+        mu, se = np.mean(a), np.std(a, ddof=1) / sqrt(len(a))
+        me = se * _t_ppf((1 + confidence) / 2., len(a) - 1)
+        return mu, mu - me, mu + me
+    sample_weight = check_sample_weight(sample_weight, a)
+    n = sample_weight.sum()
+    mu = np.average(a, weights=sample_weight)
+    se = sqrt(np.dot(sample_weight, (a - mu) ** 2) / (n - 1) / n)
+    me = se * _t_ppf((1 + confidence) / 2., n - 1)
     return mu, mu - me, mu + me
 
 
-def mean_differences_ci(y, s, ci=DEFAULT_CI):
+def _group_moments(y, s, check_input=False, n_groups=2, return_binary=False,
+                   sample_weight=None):
+    """Compute the count, mean and sum of squared deviations of y per group.
+
+    The statistics of each row chunk, bounded by the `working_memory`
+    configuration, are computed with `np.bincount` in two passes over the
+    chunk and merged into the running statistics with `_merge_moments`.
+    Unlike sums of squares, this is numerically stable for continuous
+    targets with large values. Float32 targets are processed in float32,
+    and only the per-group sums are accumulated in float64.
+
+    :param array-like y: shape (n, ) numeric target variable.
+    :param array-like s: shape (n, ) protected class variable of integer
+        group codes in [0, n_groups).
+    :param bool check_input: if True, check that y is numeric, cast chunks
+        of s to int and check that they only contain valid group codes.
+    :param int n_groups: number of groups. Default: 2, i.e. a binary
+        protected class.
+    :param bool return_binary: if True, also return whether all values of y
+        are 0 or 1.
+    :param array-like|None sample_weight: shape (n, ) non-negative frequency
+        weights. Counts are then sums of weights, and means and squared
+        deviations are weighted.
+    :returns: array of shape (3, n_groups) with the count, mean, and sum of
+        squared deviations from the mean of y in each group, e.g. the
+        advantaged (column 0) and disadvantaged (column 1) group of a binary
+        protected class. The mean of empty groups is 0.
+    :rtype: np.array[float]|tuple[np.array[float], bool]
+    """
+    groups = s if isinstance(s, ProtectedGroups) else None
+    y, s = np.asarray(y), np.asarray(s)
+    if check_input and y.dtype.kind not in "biuf":
+        raise ValueError("%s must be a numeric variable" % y)
+    sample_weight = check_sample_weight(sample_weight, y)
+    dtype = np.dtype(np.float32 if y.dtype == np.float32 else np.float64)
+    moments = np.zeros((3, n_groups))
+    is_binary = True
+    # temporaries per row: casts of y, s and weights, group index, masks,
+    # and the gathered group means, squared deviations and weighted values
+    for chunk in gen_row_chunks(len(y), row_bytes=40 + 4 * dtype.itemsize):
+        y_chunk = y[chunk].astype(dtype, copy=False)
+        s_chunk = s[chunk]
+        weight = None if sample_weight is None else \
+            sample_weight[chunk].astype(float)
+        if return_binary and is_binary:
+            is_binary = bool(((y_chunk == 0) | (y_chunk == 1)).all())
+        if groups is not None:
+            # validated group codes
+            group, in_group = s_chunk, None
+        else:
+            if check_input:
+                s_chunk = _check_group_codes(s_chunk.astype(int), n_groups)
+            # rows with s not in {0, ..., n_groups - 1} don't belong to any
+            # group
+            in_group = (s_chunk >= 0) & (s_chunk < n_groups)
+            group = np.where(in_group, s_chunk, 0).astype(np.intp)
+            in_group &= group == s_chunk
+            y_chunk = np.where(in_group, y_chunk, dtype.type(0))
+            weight = in_group if weight is None else weight * in_group
+        count = np.bincount(group, weights=weight, minlength=n_groups)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.bincount(
+                group, weights=y_chunk if weight is None else
+                y_chunk * weight, minlength=n_groups) / count
+        mean[count == 0] = 0
+        deviation = y_chunk - mean.astype(dtype)[group]
+        if in_group is not None:
+            deviation[~in_group] = 0
+        deviation *= deviation
+        if weight is not None:
+            deviation = deviation * weight
+        _merge_moments(moments, np.array([
+            count, mean,
+            np.bincount(group, weights=deviation, minlength=n_groups)]))
+    if return_binary:
+        return moments, is_binary
+    return moments
+
+
+def _merge_moments(moments, other):
+    """Merge the group moments of disjoint data into `moments`, in place.
+
+    Reference:
+    Chan, T. F., Golub, G. H., & LeVeque, R. J. (1979). Updating formulae
+    and a pairwise algorithm for computing sample variances. Technical
+    Report STAN-CS-79-773, Stanford University.
+
+    :param np.array[float] moments: shape (3, n_groups) count, mean and sum
+        of squared deviations per group, as computed by `_group_moments`.
+    :param np.array[float] other: group moments of other data.
+    :returns: the merged moments, i.e. `moments`.
+    :rtype: np.array[float]
+    """
+    count_a, mean_a, _ = moments
+    count_b, mean_b, m2_b = other
+    count = count_a + count_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight_b = np.where(count > 0, count_b / count, 0)
+    delta = mean_b - mean_a
+    moments[2] += m2_b + delta * delta * count_a * weight_b
+    moments[1] += delta * weight_b
+    moments[0] = count
+    return moments
+
+
+def _binary_moments(count, positives):
+    """Compute the group moments of a binary variable from its group sums."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(count > 0, positives / count, 0)
+    # the sum of squared deviations of a binary variable is n * p * (1 - p)
+    return np.array([count, mean, positives * (1 - mean)])
+
+
+def _check_group_codes(s, n_groups):
+    if n_groups == 2:
+        return check_binary(s)
+    if s.size and (s.min() < 0 or s.max() >= n_groups):
+        raise ValueError(
+            "%s must contain group codes in [0, %d)" % (s, n_groups))
+    return s
+
+
+def _mean_difference_ci(moments, ci=DEFAULT_CI):
+    """Calculate the mean difference and error margin from group moments."""
+    n0, n1 = moments[0]
+    df = n0 + n1 - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(moments[0] > 0, moments[1], np.nan)
+        # population variance of each group, as in np.std
+        variances = moments[2] / moments[0]
+    mean0, mean1 = means
+    std0, std1 = np.sqrt(variances)
+    std_n0n1 = sqrt(((n1 - 1) * (std1) ** 2 + (n0 - 1) * (std0) ** 2) / df)
+    mean_diff = mean0 - mean1
+    margin_error = _t_ppf(ci, df) * std_n0n1 * \
+        sqrt(1 / float(n0) + 1 / float(n1))
+    return mean_diff, margin_error
+
+
+def mean_differences_ci(y, s, ci=DEFAULT_CI, sample_weight=None):
     """Calculate the mean difference and confidence interval.
 
     :param array-like y: shape (n, ) containing binary target variable, where
-        1 is the desireable outcome and 0 is the undesireable outcome.
+        1 is the desireable outcome and 0 is the undesireable outcome, or
+        continuous target variable.
     :param array-like s: shape (n, ) containing binary protected class
         variable where 0 is the advantaged group and 1 is the disadvantaged
         group.
     :param float ci: % confidence interval to compute. Default: 97.5% to
         compute 95% two-sided t-statistic associated with degrees of freedom.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
     :returns: mean difference between advantaged group and disadvantaged group
         with error margin.
     :rtype: tuple[float]
     """
-    n0 = (s == 0).sum().astype(float)
-    n1 = (s == 1).sum().astype(float)
-    df = n0 + n1 - 2
-    std0 = y[s == 0].std()
-    std1 = y[s == 1].std()
-    std_n0n1 = sqrt(((n1 - 1) * (std1) ** 2 + (n0 - 1) * (std0) ** 2) / df)
-    mean_diff = y[s == 0].mean() - y[s == 1].mean()
-    margin_error = t.ppf(ci, df) * std_n0n1 * \
-        sqrt(1 / float(n0) + 1 / float(n1))
-    return mean_diff, margin_error
+    return _mean_difference_ci(
+        _group_moments(y, s, sample_weight=sample_weight), ci)
 
 
 def _bound_mean_difference_ci(lower_ci, upper_ci):
@@ -54,7 +218,7 @@ def _bound_mean_difference_ci(lower_ci, upper_ci):
     return lower_ci, upper_ci
 
 
-def mean_difference(y, s):
+def mean_difference(y, s, sample_weight=None):
     """Compute the mean difference in y with respect to protected class s.
 
     In the binary target case, the mean difference metric measures the
@@ -74,23 +238,40 @@ def mean_difference(y, s):
     Zliobaite, I. (2015). A survey on measuring indirect discrimination in
     machine learning. arXiv preprint arXiv:1511.00148.
 
+    The confidence interval uses the pooled variance of both groups, computed
+    in a single pass over row chunks, so continuous targets, including
+    float32 ones, are scored in bounded memory. In the binary case, it's
+    bounded to [-1, 1].
+
     :param numpy.array y: shape (n, ) containing binary target variable, where
-        1 is the desireable outcome and 0 is the undesireable outcome.
+        1 is the desireable outcome and 0 is the undesireable outcome, or
+        continuous target variable, where higher values are more desireable.
     :param numpy.array s: shape (n, ) containing binary protected class
         variable where 0 is the advantaged groupd and 1 is the disadvantaged
         group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
     :returns: mean difference between advantaged group and disadvantaged group
         with lower and uppoer confidence interval bounds.
     :rtype: tuple[float]
     """
-    y = check_binary(np.array(y).astype(int))
-    s = check_binary(np.array(s).astype(int))
-    md, em = mean_differences_ci(y, s)
+    moments, is_binary = _group_moments(
+        y, s, check_input=True, return_binary=True,
+        sample_weight=sample_weight)
+    return _mean_difference_from_moments(moments, bound=is_binary)
+
+
+def _mean_difference_from_moments(moments, bound=True):
+    md, em = _mean_difference_ci(moments)
+    if not bound:
+        return md, md - em, md + em
     lower_ci, upper_ci = _bound_mean_difference_ci(md - em, md + em)
     return md, lower_ci, upper_ci
 
 
-def normalized_mean_difference(y, s, norm_y=None, ci=DEFAULT_CI):
+def normalized_mean_difference(
+        y, s, norm_y=None, ci=DEFAULT_CI, sample_weight=None):
     """Compute normalized mean difference in y with respect to s.
 
     Same the mean difference score, except the score takes into account the
@@ -123,17 +304,39 @@ def normalized_mean_difference(y, s, norm_y=None, ci=DEFAULT_CI):
         group.
     :param numpy.array|None norm_y: shape (n, ) or None. If provided, this
         array is used to compute the normalization factor d_max.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
     :returns: mean difference between advantaged group and disadvantaged group
         with lower and upper confidence interval bounds
     :rtype: tuple(float)
     """
-    y = check_binary(np.array(y).astype(int))
-    s = check_binary(np.array(s).astype(int))
-    norm_y = y if norm_y is None else norm_y
+    moments, is_binary = _group_moments(
+        y, s, check_input=True, return_binary=True,
+        sample_weight=sample_weight)
+    if not is_binary:
+        raise ValueError(
+            "y must be a binary variable to compute the normalized mean "
+            "difference")
+    return _normalized_mean_difference_from_moments(
+        moments, None if norm_y is None else
+        np.average(norm_y, weights=sample_weight))
+
+
+def _normalized_mean_difference_from_moments(moments, mean_norm_y=None):
+    """Compute normalized mean difference from group moments of y.
+
+    :param np.array moments: group moments computed by `_group_moments`.
+    :param float|None mean_norm_y: mean of the array used to compute the
+        normalization factor. By default, the mean of y.
+    """
+    n = moments[0].sum()
+    if mean_norm_y is None:
+        mean_norm_y = (moments[0] * moments[1]).sum() / n
+    mean_s = moments[0, 1] / n
     d_max = float(
-        min(np.mean(norm_y) / (1 - np.mean(s)),
-            (1 - np.mean(norm_y)) / np.mean(s)))
-    md, em = mean_differences_ci(y, s)
+        min(mean_norm_y / (1 - mean_s), (1 - mean_norm_y) / mean_s))
+    md, em = _mean_difference_ci(moments)
     # TODO: Figure out if scaling the CI bounds by d_max makes sense here.
     if d_max == 0:
         return md, md - em, md + em
@@ -142,7 +345,7 @@ def normalized_mean_difference(y, s, norm_y=None, ci=DEFAULT_CI):
     return md, lower_ci, upper_ci
 
 
-def abs_mean_difference_delta(y, pred, s):
+def abs_mean_difference_delta(y, pred, s, sample_weight=None):
     """Compute lift in mean difference between y and pred.
 
     This measure represents the delta between absolute mean difference score
@@ -157,14 +360,18 @@ def abs_mean_difference_delta(y, pred, s):
     :param numpy.array s: shape (n, ) containing binary protected class
         variable where 0 is the advantaged groupd and 1 is the disadvantaged
         group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
     :returns: absolute difference in mean difference score between true y and
         predicted y
     :rtype: float
     """
-    return abs(mean_difference(y, s)[0]) - abs(mean_difference(pred, s)[0])
+    return (abs(mean_difference(y, s, sample_weight=sample_weight)[0]) -
+            abs(mean_difference(pred, s, sample_weight=sample_weight)[0]))
 
 
-def abs_normalized_mean_difference_delta(y, pred, s):
+def abs_normalized_mean_difference_delta(y, pred, s, sample_weight=None):
     """Compute lift in normalized mean difference between y and pred.
 
     This measure represents the delta between absolute normalized mean
@@ -181,9 +388,557 @@ def abs_normalized_mean_difference_delta(y, pred, s):
     :param numpy.array s: shape (n, ) containing binary protected class
         variable where 0 is the advantaged groupd and 1 is the disadvantaged
         group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
     :returns: absolute difference in mean difference score between true y and
         predicted y
     :rtype: float
     """
-    return (abs(normalized_mean_difference(y, s)[0]) -
-            abs(normalized_mean_difference(pred, s)[0]))
+    return (
+        abs(normalized_mean_difference(
+            y, s, sample_weight=sample_weight)[0]) -
+        abs(normalized_mean_difference(
+            pred, s, sample_weight=sample_weight)[0]))
+
+
+class GroupMeans(object):
+
+    def __init__(self, moments, is_binary=True):
+        """Per-group target statistics that multi-group metrics read.
+
+        Mean differences compare a reference group with each group, i.e.
+        E(y | s_ref) - E(y | s_g), so that with the advantaged group as the
+        reference, positive values denote discrimination against group g, as
+        in `mean_difference`.
+
+        :param np.array[float] moments: shape (3, n_groups) count, mean and
+            sum of squared deviations of the target per group, as computed
+            by `_group_moments`.
+        :param bool is_binary: whether the target is binary, in which case
+            confidence intervals are bounded to [-1, 1].
+        """
+        self.moments = moments
+        self.is_binary = is_binary
+
+    @property
+    def n_groups(self):
+        return self.moments.shape[1]
+
+    @property
+    def n(self):
+        """Number of observations, or sum of weights, per group."""
+        return self.moments[0]
+
+    @property
+    def means(self):
+        """E(y | s_g) per group."""
+        return np.where(self.n > 0, self.moments[1], np.nan)
+
+    def _pairwise(self, score_func, reference):
+        if reference not in range(self.n_groups):
+            raise ValueError(
+                "reference must be in [0, %d), got %s" %
+                (self.n_groups, reference))
+        scores = np.full((self.n_groups, 3), np.nan)
+        for group in range(self.n_groups):
+            pair_moments = self.moments[:, [reference, group]]
+            if pair_moments[0].min() > 0:
+                scores[group] = score_func(pair_moments)
+        return scores
+
+    def mean_differences(self, reference=0):
+        """Mean difference between the reference group and each group.
+
+        :param int reference: code of the reference group.
+        :returns: shape (n_groups, 3) mean difference with lower and upper
+            confidence interval bounds, computed over the reference group and
+            each group as in `mean_difference`. Rows of empty groups are NaN.
+        :rtype: np.array[float]
+        """
+        return self._pairwise(
+            partial(_mean_difference_from_moments, bound=self.is_binary),
+            reference)
+
+    def normalized_mean_differences(self, reference=0):
+        """Normalized mean difference between the reference and each group.
+
+        :param int reference: code of the reference group.
+        :returns: shape (n_groups, 3) normalized mean difference with lower
+            and upper confidence interval bounds, computed over the reference
+            group and each group as in `normalized_mean_difference`. Rows of
+            empty groups are NaN.
+        :rtype: np.array[float]
+        """
+        if not self.is_binary:
+            raise ValueError(
+                "the normalized mean difference is only defined for a "
+                "binary target")
+        return self._pairwise(
+            _normalized_mean_difference_from_moments, reference)
+
+    def max_pairwise_difference(self):
+        """Largest mean difference between any two non-empty groups.
+
+        max_pairwise_difference = max_g E(y | s_g) - min_g E(y | s_g)
+        """
+        means = self.means[self.n > 0]
+        return float(means.max() - means.min()) if means.size else np.nan
+
+    def min_max_ratio(self):
+        """Ratio of the smallest to the largest mean of non-empty groups.
+
+        min_max_ratio = min_g E(y | s_g) / max_g E(y | s_g)
+
+        For a binary target, this is the multi-group disparate impact ratio.
+        """
+        means = self.means[self.n > 0]
+        if not means.size:
+            return np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return float(means.min() / means.max())
+
+
+def group_means(y, s, n_groups=None, sample_weight=None):
+    """Compute the per-group target statistics in a single pass.
+
+    All groups are summarized with `np.bincount` over the integer group
+    codes, in O(n + n_groups) time and in row chunks bounded by the
+    `working_memory` configuration. Compute the statistics once to score
+    several multi-group metrics on the same target.
+
+    :param array-like y: shape (n, ) binary target variable, where 1 is the
+        desireable outcome and 0 is the undesireable outcome, or continuous
+        target variable.
+    :param array-like s: shape (n, ) multi-valued protected class variable
+        of integer group codes in [0, n_groups), e.g. the codes of a
+        `pd.Categorical`.
+    :param int|None n_groups: number of groups. By default, the largest
+        group code + 1.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: per-group target statistics.
+    :rtype: GroupMeans
+    """
+    if isinstance(s, ProtectedGroups):
+        n_groups = s.n_groups
+    elif n_groups is None:
+        s_codes = np.asarray(s)
+        n_groups = int(s_codes.max()) + 1 if s_codes.size else 0
+    return GroupMeans(*_group_moments(
+        y, s, check_input=True, n_groups=n_groups, return_binary=True,
+        sample_weight=sample_weight))
+
+
+def group_mean_differences(
+        y, s, reference=0, n_groups=None, sample_weight=None):
+    """Compute the mean difference between a reference group and each group.
+
+    group_mean_differences[g] = E(y | s_ref) - E(y | s_g)
+
+    :param array-like y: shape (n, ) binary or continuous target variable.
+    :param array-like s: shape (n, ) multi-valued protected class variable
+        of integer group codes.
+    :param int reference: code of the reference group, e.g. the advantaged
+        group.
+    :param int|None n_groups: number of groups. By default, the largest
+        group code + 1.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: shape (n_groups, 3) mean differences with lower and upper
+        confidence interval bounds.
+    :rtype: np.array[float]
+    """
+    return group_means(
+        y, s, n_groups, sample_weight).mean_differences(reference)
+
+
+def group_normalized_mean_differences(
+        y, s, reference=0, n_groups=None, sample_weight=None):
+    """Compute normalized mean difference between a reference and each group.
+
+    :param array-like y: shape (n, ) binary target variable.
+    :param array-like s: shape (n, ) multi-valued protected class variable
+        of integer group codes.
+    :param int reference: code of the reference group, e.g. the advantaged
+        group.
+    :param int|None n_groups: number of groups. By default, the largest
+        group code + 1.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: shape (n_groups, 3) normalized mean differences with lower and
+        upper confidence interval bounds.
+    :rtype: np.array[float]
+    """
+    return group_means(y, s, n_groups, sample_weight) \
+        .normalized_mean_differences(reference)
+
+
+def max_pairwise_mean_difference(y, s, n_groups=None, sample_weight=None):
+    """Compute the largest mean difference between any two groups.
+
+    max_pairwise_mean_difference = max_g E(y | s_g) - min_g E(y | s_g)
+
+    :param array-like y: shape (n, ) binary or continuous target variable.
+    :param array-like s: shape (n, ) multi-valued protected class variable
+        of integer group codes.
+    :param int|None n_groups: number of groups. By default, the largest
+        group code + 1.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: max pairwise mean difference, in [0, 1] for a binary target.
+    :rtype: float
+    """
+    return group_means(
+        y, s, n_groups, sample_weight).max_pairwise_difference()
+
+
+def min_max_mean_ratio(y, s, n_groups=None, sample_weight=None):
+    """Compute the ratio of the smallest to the largest group mean.
+
+    min_max_mean_ratio = min_g E(y | s_g) / max_g E(y | s_g)
+
+    :param array-like y: shape (n, ) binary or non-negative continuous
+        target variable.
+    :param array-like s: shape (n, ) multi-valued protected class variable
+        of integer group codes.
+    :param int|None n_groups: number of groups. By default, the largest
+        group code + 1.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: min/max mean ratio, in [0, 1] for a non-negative target.
+    :rtype: float
+    """
+    return group_means(
+        y, s, n_groups, sample_weight).min_max_ratio()
+
+
+class ConfusionTable(object):
+
+    def __init__(self, counts, calibration=None):
+        """Per-group confusion counts that group-conditional metrics read.
+
+        Group metrics compare the advantaged group (0) with the disadvantaged
+        group (1), e.g. a true positive rate difference is
+        TPR(s0) - TPR(s1), so that positive values denote discrimination
+        against the disadvantaged group, as in `mean_difference`.
+
+        :param np.array[float] counts: shape (n_groups, 2, 2) number of
+            observations per group, true label and predicted label.
+        :param np.array[float]|None calibration: shape (n_groups, n_bins, 3)
+            number of observations, sum of predicted probabilities and sum of
+            true labels per group and predicted probability bin.
+        """
+        self.counts = counts
+        self.calibration = calibration
+
+    @property
+    def n_groups(self):
+        return self.counts.shape[0]
+
+    @property
+    def n(self):
+        """Number of observations, or sum of weights, per group."""
+        return self.counts.sum(axis=(1, 2))
+
+    @property
+    def tn(self):
+        return self.counts[:, 0, 0]
+
+    @property
+    def fp(self):
+        return self.counts[:, 0, 1]
+
+    @property
+    def fn(self):
+        return self.counts[:, 1, 0]
+
+    @property
+    def tp(self):
+        return self.counts[:, 1, 1]
+
+    @staticmethod
+    def _ratio(numerator, denominator):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return numerator / denominator
+
+    def moments(self, target="pred"):
+        """Group moments of the predicted or true labels.
+
+        :param str target: "pred" or "y".
+        :returns: shape (3, n_groups) count, mean and sum of squared
+            deviations of the binary target per group, as computed by
+            `_group_moments`.
+        :rtype: np.array[float]
+        """
+        if target not in ["pred", "y"]:
+            raise ValueError("target must be 'pred' or 'y', got %s" % target)
+        positives = self.tp + (self.fp if target == "pred" else self.fn)
+        return _binary_moments(self.n, positives)
+
+    def true_positive_rate(self):
+        """p(pred+ | y+) per group."""
+        return self._ratio(self.tp, self.tp + self.fn)
+
+    def false_positive_rate(self):
+        """p(pred+ | y-) per group."""
+        return self._ratio(self.fp, self.fp + self.tn)
+
+    def positive_predictive_value(self):
+        """p(y+ | pred+) per group."""
+        return self._ratio(self.tp, self.tp + self.fp)
+
+    def positive_rate(self):
+        """p(pred+) per group."""
+        return self._ratio(self.tp + self.fp, self.n)
+
+    @staticmethod
+    def _difference(group_rates):
+        return float(group_rates[0] - group_rates[1])
+
+    def equal_opportunity_difference(self):
+        return self._difference(self.true_positive_rate())
+
+    def false_positive_rate_difference(self):
+        return self._difference(self.false_positive_rate())
+
+    def equalized_odds_difference(self):
+        return max(abs(self.equal_opportunity_difference()),
+                   abs(self.false_positive_rate_difference()))
+
+    def predictive_parity_difference(self):
+        return self._difference(self.positive_predictive_value())
+
+    def disparate_impact_ratio(self):
+        positive_rate = self.positive_rate()
+        return float(self._ratio(positive_rate[1], positive_rate[0]))
+
+    def calibration_error(self):
+        """Expected calibration error per group.
+
+        The weighted mean over probability bins of the absolute difference
+        between the mean predicted probability and the positive label rate.
+        """
+        if self.calibration is None:
+            raise ValueError(
+                "calibration error requires a table computed with "
+                "`pred_proba`")
+        n_bin, sum_proba, sum_y = np.moveaxis(self.calibration, 2, 0)
+        return self._ratio(
+            np.abs(sum_proba - sum_y).sum(axis=1), n_bin.sum(axis=1))
+
+
+def confusion_table(y, pred=None, s=None, pred_proba=None, n_bins=10,
+                    sample_weight=None):
+    """Compute the per-group confusion table in a single pass.
+
+    All counts are computed with one `np.bincount` over combined group, true
+    label and predicted label codes, in row chunks bounded by the
+    `working_memory` configuration. Compute the table once to score several
+    group metrics on the same predictions.
+
+    :param array-like y: shape (n, ) binary target variable, where 1 is the
+        desireable outcome and 0 is the undesireable outcome.
+    :param array-like|None pred: shape (n, ) binary predicted target. If
+        None, predictions are `pred_proba > 0.5`.
+    :param array-like s: shape (n, ) binary protected class variable where 0
+        is the advantaged group and 1 is the disadvantaged group.
+    :param array-like|None pred_proba: shape (n, ) predicted probabilities of
+        the desireable outcome, used to compute the calibration error.
+    :param int n_bins: number of equal-width predicted probability bins used
+        to compute the calibration error.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: per-group confusion table.
+    :rtype: ConfusionTable
+    """
+    if pred is None and pred_proba is None:
+        raise ValueError("Provide `pred` or `pred_proba`")
+    if s is None:
+        raise ValueError("Provide `s`")
+    groups = s if isinstance(s, ProtectedGroups) else None
+    y, s = np.asarray(y), np.asarray(s)
+    pred = None if pred is None else np.asarray(pred)
+    pred_proba = None if pred_proba is None else np.asarray(pred_proba)
+    sample_weight = check_sample_weight(sample_weight, y)
+    n_groups = 2
+    counts = np.zeros(n_groups * 4)
+    calibration = None if pred_proba is None else \
+        np.zeros((3, n_groups * n_bins))
+    # temporaries per row: int casts of y, pred and s, codes, bins and
+    # weights
+    for chunk in gen_row_chunks(len(y), row_bytes=96):
+        weight = None if sample_weight is None else \
+            sample_weight[chunk].astype(float)
+        y_chunk = check_binary(y[chunk].astype(int))
+        s_chunk = s[chunk] if groups is not None else \
+            check_binary(s[chunk].astype(int))
+        if pred is not None:
+            pred_chunk = check_binary(pred[chunk].astype(int))
+        if pred_proba is not None:
+            proba_chunk = pred_proba[chunk].astype(float)
+            if ((proba_chunk < 0) | (proba_chunk > 1)).any():
+                raise ValueError("`pred_proba` must be in [0, 1]")
+            if pred is None:
+                pred_chunk = (proba_chunk > 0.5).astype(int)
+            bins = np.minimum(
+                (proba_chunk * n_bins).astype(np.intp), n_bins - 1)
+            bin_codes = s_chunk * n_bins + bins
+            for i, weights in enumerate([None, proba_chunk, y_chunk]):
+                if weight is not None:
+                    weights = weight if weights is None else \
+                        weights * weight
+                calibration[i] += np.bincount(
+                    bin_codes, weights=weights, minlength=n_groups * n_bins)
+        counts += np.bincount(
+            (s_chunk * 2 + y_chunk) * 2 + pred_chunk, weights=weight,
+            minlength=n_groups * 4)
+    return ConfusionTable(
+        counts.reshape(n_groups, 2, 2),
+        None if calibration is None else
+        calibration.reshape(3, n_groups, n_bins).transpose(1, 2, 0))
+
+
+def equal_opportunity_difference(y, pred, s, sample_weight=None):
+    """Compute the difference in true positive rates between groups.
+
+    equal_opportunity_difference = p(pred+ | y+, s0) - p(pred+ | y+, s1)
+
+    Reference:
+    Hardt, M., Price, E., & Srebro, N. (2016). Equality of opportunity in
+    supervised learning. In Advances in Neural Information Processing
+    Systems (pp. 3315-3323).
+
+    :param numpy.array y: shape (n, ) containing binary target variable.
+    :param numpy.array pred: shape (n, ) containing binary predicted target.
+    :param numpy.array s: shape (n, ) containing binary protected class
+        variable where 0 is the advantaged group and 1 is the disadvantaged
+        group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: true positive rate difference.
+    :rtype: float
+    """
+    return confusion_table(
+        y, pred, s, sample_weight=sample_weight).equal_opportunity_difference()
+
+
+def equalized_odds_difference(y, pred, s, sample_weight=None):
+    """Compute the largest absolute difference in TPR or FPR between groups.
+
+    equalized_odds_difference = max(|TPR(s0) - TPR(s1)|, |FPR(s0) - FPR(s1)|)
+
+    Reference:
+    Hardt, M., Price, E., & Srebro, N. (2016). Equality of opportunity in
+    supervised learning. In Advances in Neural Information Processing
+    Systems (pp. 3315-3323).
+
+    :param numpy.array y: shape (n, ) containing binary target variable.
+    :param numpy.array pred: shape (n, ) containing binary predicted target.
+    :param numpy.array s: shape (n, ) containing binary protected class
+        variable where 0 is the advantaged group and 1 is the disadvantaged
+        group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: equalized odds difference in [0, 1].
+    :rtype: float
+    """
+    return confusion_table(
+        y, pred, s, sample_weight=sample_weight).equalized_odds_difference()
+
+
+def false_positive_rate_difference(y, pred, s, sample_weight=None):
+    """Compute the difference in false positive rates between groups.
+
+    false_positive_rate_difference = p(pred+ | y-, s0) - p(pred+ | y-, s1)
+
+    :param numpy.array y: shape (n, ) containing binary target variable.
+    :param numpy.array pred: shape (n, ) containing binary predicted target.
+    :param numpy.array s: shape (n, ) containing binary protected class
+        variable where 0 is the advantaged group and 1 is the disadvantaged
+        group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: false positive rate difference.
+    :rtype: float
+    """
+    return confusion_table(y, pred, s, sample_weight=sample_weight) \
+        .false_positive_rate_difference()
+
+
+def predictive_parity_difference(y, pred, s, sample_weight=None):
+    """Compute the difference in positive predictive values between groups.
+
+    predictive_parity_difference = p(y+ | pred+, s0) - p(y+ | pred+, s1)
+
+    :param numpy.array y: shape (n, ) containing binary target variable.
+    :param numpy.array pred: shape (n, ) containing binary predicted target.
+    :param numpy.array s: shape (n, ) containing binary protected class
+        variable where 0 is the advantaged group and 1 is the disadvantaged
+        group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: positive predictive value difference.
+    :rtype: float
+    """
+    return confusion_table(
+        y, pred, s, sample_weight=sample_weight).predictive_parity_difference()
+
+
+def disparate_impact_ratio(pred, s, sample_weight=None):
+    """Compute the ratio of positive prediction rates between groups.
+
+    disparate_impact_ratio = p(pred+ | s1) / p(pred+ | s0)
+
+    A ratio below 0.8 is commonly considered adverse impact (four-fifths
+    rule).
+
+    :param numpy.array pred: shape (n, ) containing binary predicted target.
+    :param numpy.array s: shape (n, ) containing binary protected class
+        variable where 0 is the advantaged group and 1 is the disadvantaged
+        group.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: disparate impact ratio.
+    :rtype: float
+    """
+    return confusion_table(
+        pred, pred, s, sample_weight=sample_weight).disparate_impact_ratio()
+
+
+def group_calibration_error(
+        y, pred_proba, s, n_bins=10, sample_weight=None):
+    """Compute the expected calibration error of each group.
+
+    The calibration error of a group is the weighted mean, over `n_bins`
+    equal-width predicted probability bins, of the absolute difference
+    between the mean predicted probability and the positive label rate.
+
+    :param numpy.array y: shape (n, ) containing binary target variable.
+    :param numpy.array pred_proba: shape (n, ) containing predicted
+        probabilities of the desireable outcome.
+    :param numpy.array s: shape (n, ) containing binary protected class
+        variable where 0 is the advantaged group and 1 is the disadvantaged
+        group.
+    :param int n_bins: number of probability bins.
+    :param array-like|None sample_weight: shape (n, ) non-negative weights,
+        e.g. the counts of pre-aggregated rows. By default, all observations
+        have weight 1.
+    :returns: shape (2, ) calibration error of the advantaged and
+        disadvantaged group.
+    :rtype: numpy.array[float]
+    """
+    return confusion_table(
+        y, s=s, pred_proba=pred_proba, n_bins=n_bins,
+        sample_weight=sample_weight).calibration_error()
@@ -0,0 +1,218 @@
+"""Model selection utilities for fairness-aware estimators.
+
+sklearn's `cross_validate` and `GridSearchCV` don't route the protected class
+`s` to `fit` and `predict`, so estimators with `S_ON_FIT` or `S_ON_PREDICT`
+can't be evaluated with them. The functions in this module split `s`
+alongside X and y and score each fold with both accuracy and the
+`themis_ml.metrics` fairness scores.
+"""
+
+import time
+
+import numpy as np
+
+from joblib import Parallel, delayed
+from sklearn.base import (
+    BaseEstimator, ClassifierMixin, MetaEstimatorMixin, clone)
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.utils.validation import check_X_y, check_is_fitted
+
+from .checks import check_binary
+from .groups import check_protected_groups
+from .metrics import (
+    mean_difference, normalized_mean_difference, abs_mean_difference_delta,
+    abs_normalized_mean_difference_delta)
+
+# scores computed on each test fold. Scores are either better when greater,
+# or better when their absolute value is smaller.
+GREATER_IS_BETTER_SCORES = [
+    "accuracy",
+    "abs_mean_difference_delta",
+    "abs_normalized_mean_difference_delta",
+]
+SMALLER_ABS_IS_BETTER_SCORES = [
+    "mean_difference",
+    "normalized_mean_difference",
+]
+SCORES = GREATER_IS_BETTER_SCORES + SMALLER_ABS_IS_BETTER_SCORES
+
+
+def _s_kwargs(estimator, s, attribute):
+    return {"s": s} if getattr(estimator, attribute, False) else {}
+
+
+def _score(y, pred, s):
+    """Compute accuracy and fairness scores of predictions on one fold."""
+    return {
+        "accuracy": (y == pred).mean(),
+        "mean_difference": mean_difference(pred, s)[0],
+        "normalized_mean_difference": normalized_mean_difference(
+            pred, s, norm_y=y)[0],
+        "abs_mean_difference_delta": abs_mean_difference_delta(y, pred, s),
+        "abs_normalized_mean_difference_delta":
+            abs_normalized_mean_difference_delta(y, pred, s),
+    }
+
+
+def _fit_and_score(estimator, X, y, s, train, test, parameters=None):
+    estimator = clone(estimator)
+    if parameters is not None:
+        estimator.set_params(**parameters)
+    start = time.time()
+    estimator.fit(
+        X[train], y[train], **_s_kwargs(estimator, s[train], "S_ON_FIT"))
+    fit_time = time.time() - start
+    pred = estimator.predict(
+        X[test], **_s_kwargs(estimator, s[test], "S_ON_PREDICT"))
+    scores = _score(y[test], pred, s[test])
+    scores["fit_time"] = fit_time
+    scores["score_time"] = time.time() - start - fit_time
+    return scores
+
+
+def _check_fair_X_y_s(X, y, s):
+    X, y = check_X_y(X, y)
+    y = check_binary(y)
+    s = check_protected_groups(s)
+    if len(s) != y.shape[0]:
+        raise ValueError("`s` must be the same shape as `y`")
+    return X, y, s
+
+
+def _parallel(n_jobs, pre_dispatch):
+    # arrays larger than 1MB are memory-mapped and shared with workers
+    return Parallel(
+        n_jobs=n_jobs, pre_dispatch=pre_dispatch, max_nbytes="1M",
+        mmap_mode="r")
+
+
+def fair_cross_validate(
+        estimator, X, y, s, cv=3, n_jobs=None, pre_dispatch="2*n_jobs"):
+    """Evaluate accuracy and fairness scores by cross-validation.
+
+    :param BaseEstimator estimator: estimator to evaluate. `s` is passed to
+        `fit` and `predict` if the estimator's `S_ON_FIT` and `S_ON_PREDICT`
+        attributes are True, respectively.
+    :param array-like X: shape (n, p) input data.
+    :param array-like y: shape (n, ) binary target variable.
+    :param array-like s: shape (n, ) binary protected class variable.
+    :param int|cross-validation generator cv: determines the
+        cross-validation splitting strategy, same as in sklearn.
+    :param int|None n_jobs: number of folds to fit and score in parallel
+        worker processes. None means 1, -1 means using all processors.
+    :param str pre_dispatch: number of jobs dispatched during parallel
+        execution.
+    :returns: dictionary with arrays of shape (n_splits, ) for keys
+        "fit_time", "score_time", and "test_<score>" for each score in
+        `SCORES`.
+    :rtype: dict[str, np.array]
+    """
+    X, y, s = _check_fair_X_y_s(X, y, s)
+    cv = check_cv(cv, y, classifier=True)
+    fold_scores = _parallel(n_jobs, pre_dispatch)(
+        delayed(_fit_and_score)(clone(estimator), X, y, s, train, test)
+        for train, test in cv.split(X, y))
+    results = {
+        "fit_time": np.array([f["fit_time"] for f in fold_scores]),
+        "score_time": np.array([f["score_time"] for f in fold_scores]),
+    }
+    for score in SCORES:
+        results["test_%s" % score] = np.array(
+            [f[score] for f in fold_scores])
+    return results
+
+
+class FairGridSearchCV(BaseEstimator, ClassifierMixin, MetaEstimatorMixin):
+
+    S_ON_FIT = True
+
+    def __init__(self, estimator, param_grid, scoring="accuracy", cv=3,
+                 n_jobs=None, pre_dispatch="2*n_jobs", refit=True):
+        """Initialize exhaustive search over fairness-aware estimator params.
+
+        :param BaseEstimator estimator: estimator to tune. `s` is passed to
+            `fit` and `predict` if the estimator's `S_ON_FIT` and
+            `S_ON_PREDICT` attributes are True, respectively.
+        :param dict|list[dict] param_grid: parameter names mapped to lists of
+            values to try, same as in sklearn.
+        :param str scoring: score used to select the best candidate. One of
+            `SCORES`. For mean difference scores, the candidate with the
+            smallest absolute mean score is selected, otherwise the candidate
+            with the greatest mean score is selected.
+        :param int|cross-validation generator cv: determines the
+            cross-validation splitting strategy, same as in sklearn.
+        :param int|None n_jobs: number of (candidate, fold) pairs to fit and
+            score in parallel worker processes.
+        :param str pre_dispatch: number of jobs dispatched during parallel
+            execution.
+        :param bool refit: if True, refit the best candidate on the whole
+            dataset.
+        """
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.pre_dispatch = pre_dispatch
+        self.refit = refit
+
+    @property
+    def S_ON_PREDICT(self):
+        return getattr(self.estimator, "S_ON_PREDICT", False)
+
+    def fit(self, X, y, s):
+        """Fit and score every candidate on every fold."""
+        if self.scoring not in SCORES:
+            raise ValueError(
+                "invalid scoring: %s. Must be one of %s" %
+                (self.scoring, SCORES))
+        X, y, s = _check_fair_X_y_s(X, y, s)
+        cv = check_cv(self.cv, y, classifier=True)
+        candidates = list(ParameterGrid(self.param_grid))
+        splits = list(cv.split(X, y))
+        # all (candidate, fold) pairs are run in a single parallel call so
+        # that the data is only memory-mapped once.
+        fold_scores = _parallel(self.n_jobs, self.pre_dispatch)(
+            delayed(_fit_and_score)(
+                clone(self.estimator), X, y, s, train, test, parameters)
+            for parameters in candidates for train, test in splits)
+
+        n_splits = len(splits)
+        self.cv_results_ = {"params": candidates}
+        for name in ["fit_time", "score_time"] + SCORES:
+            scores = np.array([f[name] for f in fold_scores]) \
+                .reshape(len(candidates), n_splits)
+            prefix = "" if name in ["fit_time", "score_time"] else "test_"
+            self.cv_results_["mean_%s%s" % (prefix, name)] = \
+                scores.mean(axis=1)
+            self.cv_results_["std_%s%s" % (prefix, name)] = scores.std(axis=1)
+        for parameter in set(p for c in candidates for p in c):
+            self.cv_results_["param_%s" % parameter] = np.ma.masked_array(
+                [c.get(parameter) for c in candidates],
+                mask=[parameter not in c for c in candidates], dtype=object)
+
+        mean_scores = self.cv_results_["mean_test_%s" % self.scoring]
+        if self.scoring in SMALLER_ABS_IS_BETTER_SCORES:
+            mean_scores = -np.abs(mean_scores)
+        self.best_index_ = int(np.argmax(mean_scores))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = \
+            self.cv_results_["mean_test_%s" % self.scoring][self.best_index_]
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator) \
+                .set_params(**self.best_params_)
+            self.best_estimator_.fit(
+                X, y, **_s_kwargs(self.best_estimator_, s, "S_ON_FIT"))
+        return self
+
+    def predict(self, X, s=None):
+        """Generate predicted labels with the best estimator."""
+        check_is_fitted(self, ["best_estimator_"])
+        return self.best_estimator_.predict(
+            X, **_s_kwargs(self.best_estimator_, s, "S_ON_PREDICT"))
+
+    def predict_proba(self, X, s=None):
+        """Generate predicted probabilities with the best estimator."""
+        check_is_fitted(self, ["best_estimator_"])
+        return self.best_estimator_.predict_proba(
+            X, **_s_kwargs(self.best_estimator_, s, "S_ON_PREDICT"))
@@ -1,19 +1,88 @@
 """Post-processing estimators to make fair predictions."""
 
+import math
 import numpy as np
 
+from joblib import Parallel, delayed
 from sklearn.utils.validation import check_array, check_X_y, check_is_fitted
 from sklearn.base import (
     BaseEstimator, ClassifierMixin, MetaEstimatorMixin, clone)
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score
+from sklearn.model_selection import check_cv
 
-from ..checks import check_binary
+from ..checks import check_binary, check_sample_weight, sample_weight_kwargs
+from ..config import gen_row_chunks
+from ..groups import check_protected_groups
+from ..profiling import span
 
 DECISION_THRESHOLD = 0.5
 DEFAULT_ENSEMBLE_ESTIMATORS = [
     LogisticRegression(), DecisionTreeClassifier()]
+DEFAULT_THETAS = np.linspace(0.0, 0.5, 51)
+
+
+def _sigmoid(z):
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    exp_z = math.exp(z)
+    return exp_z / (1.0 + exp_z)
+
+
+class LinearROScorer(object):
+
+    def __init__(self, coefs, intercepts, weights, theta, demote):
+        """Initialize a low-latency scorer for a single observation.
+
+        This scorer is created by `compile_scorer` of a fitted reject-option
+        classifier whose base estimators are all logistic regressions. It
+        skips input validation and computes the predicted probability,
+        flip, and decision with scalar arithmetic, so it should only be used
+        to score one observation at a time, e.g. in an online service.
+
+        param list[list[float]] coefs: coefficients of each base estimator.
+        param list[float] intercepts: intercept of each base estimator.
+        param list[float] weights: normalized ensemble weight of each base
+            estimator.
+        param float theta: critical region threshold.
+        param bool demote: whether advantaged group observations are demoted.
+        """
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self.weights = weights
+        self.theta = theta
+        self.demote = demote
+        self._members = list(zip(coefs, intercepts, weights))
+
+    def predict_proba_one(self, x, s):
+        """Generate the predicted probability of y+ for one observation.
+
+        :param sequence[float] x: input variables of a single observation.
+        :param int s: protected class membership, where 1 = disadvantaged
+            group, 0 = advantaged group.
+        :returns: predicted probability of the desirable outcome.
+        :rtype: float
+        """
+        prob = 0.0
+        for coef, intercept, weight in self._members:
+            z = intercept
+            for c, x_i in zip(coef, x):
+                z += c * x_i
+            prob += weight * _sigmoid(z)
+        if abs(prob - 0.5) < self.theta and (self.demote or s == 1):
+            prob = 1.0 - prob
+        return prob
+
+    def predict_one(self, x, s):
+        """Generate the predicted label for one observation.
+
+        :param sequence[float] x: input variables of a single observation.
+        :param int s: protected class membership.
+        :returns: 1 if the desirable outcome is predicted, 0 otherwise.
+        :rtype: int
+        """
+        return int(self.predict_proba_one(x, s) > DECISION_THRESHOLD)
 
 
 class SingleROClassifier(
@@ -21,6 +90,7 @@ class SingleROClassifier(
 
     S_ON_FIT = False
     S_ON_PREDICT = True
+    FITTED_ATTRIBUTES = ["estimator_"]
 
     def __init__(self, estimator=LogisticRegression(), theta=0.1, demote=True):
         """Initialize Single Reject-Option Classifier.
@@ -48,12 +118,19 @@ class SingleROClassifier(
         self.theta = theta
         self.demote = demote
 
-    def fit(self, X, y):
-        """Fit model."""
+    def fit(self, X, y, sample_weight=None):
+        """Fit model.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like y: shape (n, ) binary target variable.
+        :param array-like|None sample_weight: shape (n, ) sample weights
+            passed to the estimator's `fit`.
+        """
         X, y = check_X_y(X, y)
         y = check_binary(y)
+        sample_weight = check_sample_weight(sample_weight, y)
         self.estimator_ = clone(self.estimator)
-        self.estimator_.fit(X, y)
+        self.estimator_.fit(X, y, **sample_weight_kwargs(sample_weight))
         return self
 
     def predict(self, X, s):
@@ -63,39 +140,99 @@ class SingleROClassifier(
 
     def predict_proba(self, X, s):
         """Generate predicted probabilities."""
-        pred_prob = self._raw_predict_proba(X, s)[:, 1]
-        return self._flip_predictions(pred_prob, s)
+        X, s = self._check_predict_input(X, s)
+        return self._flip_predictions(self.estimator_.predict_proba(X), s)
 
     def _raw_predict_proba(self, X, s):
-        X = check_array(X)
-        s = check_binary(np.array(s).astype(int))
-        check_is_fitted(self, ["estimator_"])
+        X, s = self._check_predict_input(X, s)
         return self.estimator_.predict_proba(X)
 
+    def _check_predict_input(self, X, s):
+        X = check_array(X)
+        s = check_protected_groups(s)
+        check_is_fitted(self, self.FITTED_ATTRIBUTES)
+        return X, s
+
     def _flip_predictions(self, pred_prob, s):
-        """Flip predictions based on protected class membership.
+        """Flip predictions in place based on protected class membership.
 
-        :param np.array[float] pred_prob: predicted probabilities
-        :param np.array[int] s: protected class membership, where
+        :param np.array[float] pred_prob: shape (n, 2) predicted
+            probabilities, which is modified in place.
+        :param ProtectedGroups s: protected class membership, where
             1 = disadvantaged group, 0 = advantaged group.
+        :returns: flipped predicted probabilities, i.e. `pred_prob`.
         """
-        flip_candidates = np.ones_like(pred_prob).astype(bool) \
-            if self.demote else s == 1
-
+        positive_prob = pred_prob[:, 1]
         # find index where predictions are below theta threshold
-        under_theta_index = np.where(
-            (np.abs(pred_prob - 0.5) < self.theta) & flip_candidates)
+        under_theta = np.abs(positive_prob - 0.5) < self.theta
+        if not self.demote:
+            under_theta &= s.mask(1)
         # flip the probability
-        pred_prob[under_theta_index] = 1 - pred_prob[under_theta_index]
-        pred_prob = pred_prob.reshape(-1, 1)
-        return np.concatenate([1 - pred_prob, pred_prob], axis=1)
+        positive_prob[under_theta] = 1 - positive_prob[under_theta]
+        np.subtract(1, positive_prob, out=pred_prob[:, 0])
+        return pred_prob
+
+    def _weighted_estimators(self):
+        return [(self.estimator_, 1.0)]
+
+    def compile_scorer(self):
+        """Compile the fitted model into a low-latency single-record scorer.
+
+        Only supported when the base estimator(s) are logistic regressions.
+
+        :returns: scorer with `predict_one` and `predict_proba_one` methods.
+        :rtype: LinearROScorer
+        """
+        check_is_fitted(self, self.FITTED_ATTRIBUTES)
+        weighted_estimators = self._weighted_estimators()
+        total_weight = float(sum(w for _, w in weighted_estimators))
+        coefs, intercepts, weights = [], [], []
+        for estimator, weight in weighted_estimators:
+            if not isinstance(estimator, LogisticRegression):
+                raise ValueError(
+                    "compile_scorer only supports LogisticRegression base "
+                    "estimators, found %s" % estimator)
+            coefs.append([float(c) for c in estimator.coef_.ravel()])
+            intercepts.append(float(estimator.intercept_[0]))
+            weights.append(weight / total_weight)
+        return LinearROScorer(
+            coefs, intercepts, weights, float(self.theta), bool(self.demote))
+
+
+def _fit_ensemble_member(
+        estimator, X, y, weighted_prediction, sample_weight=None):
+    """Fit a clone of an ensemble member and compute its prediction weight.
+
+    The training accuracy is computed in the same worker that fit the
+    estimator so that the training data doesn't need another pass in the
+    parent process.
+    """
+    with span("MultipleROClassifier.member_fit", X,
+              estimator=type(estimator).__name__):
+        estimator = clone(estimator).fit(
+            X, y, **sample_weight_kwargs(sample_weight))
+    if not weighted_prediction:
+        # uniform weights
+        return estimator, 1.0
+    with span("MultipleROClassifier.member_weight", X,
+              estimator=type(estimator).__name__):
+        weight = accuracy_score(
+            y, estimator.predict(X), sample_weight=sample_weight)
+    return estimator, weight
+
+
+def _predict_positive_proba(estimator, X):
+    return estimator.predict_proba(X)[:, 1]
 
 
 class MultipleROClassifier(SingleROClassifier):
 
+    FITTED_ATTRIBUTES = ["estimators_", "pred_weights_"]
+
     def __init__(
             self, estimators=DEFAULT_ENSEMBLE_ESTIMATORS,
-            theta=0.1, demote=True, weighted_prediction=True):
+            theta=0.1, demote=True, weighted_prediction=True, n_jobs=None,
+            batch_size=None):
         """Initialize Multiple Reject-Option Classifier.
 
         param list|tuple[BaseEstimator] estimators: A list or tuple of
@@ -109,6 +246,14 @@ class MultipleROClassifier(SingleROClassifier):
         param bool weighted_prediction: if True, then uses accuracy score as
             weights to compute ensembled predicted probability. If False,
             ensembled probability is the mean of probabilities.
+        param int|None n_jobs: number of jobs to fit the ensemble members in
+            parallel. None means 1, -1 means using all processors. Large
+            training data is shared with the workers as a read-only
+            memory-mapped array. At predict time, member predictions are
+            computed in a thread pool of the same size.
+        param int|None batch_size: score X in chunks of `batch_size` rows at
+            predict time to bound memory usage. By default, the batch size
+            is derived from the `working_memory` configuration.
         """
         # TODO: assert that all estimators have a predict_proba method.
         # TODO: add support for customizing the performance function used
@@ -116,34 +261,276 @@ class MultipleROClassifier(SingleROClassifier):
         # Currently this class only supports accuracy.
         super(MultipleROClassifier, self).__init__()
         self.estimators = estimators
+        self.theta = theta
         self.demote = demote
         self.weighted_prediction = weighted_prediction
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
+
+    def fit(self, X, y, sample_weight=None):
+        """Fit model.
 
-    def fit(self, X, y):
-        """Fit model."""
+        :param array-like X: shape (n, p) input data.
+        :param array-like y: shape (n, ) binary target variable.
+        :param array-like|None sample_weight: shape (n, ) sample weights
+            passed to the `fit` of every estimator, and used to weight
+            their training accuracy.
+        """
         X, y = check_X_y(X, y)
         y = check_binary(y)
-        self.estimators_ = []
-        self.pred_weights_ = []
-        for estimator in self.estimators:
-            e = clone(estimator)
-            self.estimators_.append(e.fit(X, y))
-            # uniform weights if weighted_prediction is False
-            self.pred_weights_.append(
-                accuracy_score(y, e.predict(X)) if self.weighted_prediction
-                else 1.0)
-        self.pred_weights_ = np.array(self.pred_weights_)
+        sample_weight = check_sample_weight(sample_weight, y)
+        fitted = Parallel(n_jobs=self.n_jobs, mmap_mode="r")(
+            delayed(_fit_ensemble_member)(
+                estimator, X, y, self.weighted_prediction, sample_weight)
+            for estimator in self.estimators)
+        self.estimators_ = [e for e, _ in fitted]
+        self.pred_weights_ = np.array([w for _, w in fitted])
         return self
 
+    def predict_proba(self, X, s):
+        """Generate predicted probabilities.
+
+        Ensembled probabilities are accumulated into a single preallocated
+        output array, one batch of `batch_size` rows at a time.
+        """
+        X, s = self._check_predict_input(X, s)
+        pred_prob = np.empty((X.shape[0], 2))
+        with self._member_parallel() as parallel:
+            for batch in self._batches(X):
+                self._accumulate_predict_proba(
+                    X[batch], pred_prob[batch], parallel)
+                self._flip_predictions(pred_prob[batch], s[batch])
+        return pred_prob
+
     def _raw_predict_proba(self, X, s):
-        X = check_array(X)
-        s = check_binary(np.array(s).astype(int))
-        check_is_fitted(self, ["estimators_", "pred_weights_"])
+        X, s = self._check_predict_input(X, s)
+        pred_prob = np.empty((X.shape[0], 2))
+        with self._member_parallel() as parallel:
+            for batch in self._batches(X):
+                self._accumulate_predict_proba(
+                    X[batch], pred_prob[batch], parallel)
+        return pred_prob
+
+    def _weighted_estimators(self):
+        return list(zip(self.estimators_, self.pred_weights_))
+
+    def _batches(self, X):
+        # every member allocates a copy of the batch and its predicted
+        # probabilities, possibly at the same time in the thread pool.
+        row_bytes = len(self.estimators_) * (8 * X.shape[1] + 24)
+        return gen_row_chunks(
+            X.shape[0], row_bytes, chunk_n_rows=self.batch_size)
+
+    def _member_parallel(self):
+        return Parallel(n_jobs=self.n_jobs, prefer="threads")
+
+    def _accumulate_predict_proba(self, X, pred_prob, parallel):
+        """Accumulate the ensembled predicted probabilities into `pred_prob`.
+
+        :param np.array X: input data.
+        :param np.array[float] pred_prob: shape (n, 2) output buffer.
+        :param Parallel parallel: thread pool to compute member predictions.
+        """
+        if self.n_jobs in [None, 1]:
+            member_probs = (
+                _predict_positive_proba(e, X) for e in self.estimators_)
+        else:
+            member_probs = parallel(
+                delayed(_predict_positive_proba)(e, X)
+                for e in self.estimators_)
         # use uniform weights if pred_weights_ is False otherwise use
-        # performance scores learned during
-        pred_probs = np.concatenate([
-            e.predict_proba(X)[:, 1].reshape(-1, 1) * w for e, w in
-            zip(self.estimators_, self.pred_weights_)
-        ], axis=1).sum(axis=1) / self.pred_weights_.sum()
-        pred_probs = pred_probs.reshape(-1, 1)
-        return np.concatenate([1 - pred_probs, pred_probs], axis=1)
+        # performance scores learned during fit
+        positive_prob = pred_prob[:, 1]
+        positive_prob.fill(0)
+        for member_prob, weight in zip(member_probs, self.pred_weights_):
+            member_prob *= weight
+            positive_prob += member_prob
+        positive_prob /= self.pred_weights_.sum()
+        np.subtract(1, positive_prob, out=pred_prob[:, 0])
+        return pred_prob
+
+
+def _theta_sweep(pred_prob, y, s, thetas, demote, sample_weight=None):
+    """Score every critical region threshold in a single vectorized pass.
+
+    Flipping is monotonic in theta: an observation whose distance to the
+    decision boundary is `d` is flipped for every theta > d. Sorting the
+    distances once and accumulating the change in correct predictions and
+    positive predictions per group therefore gives the score of every theta
+    with a single `searchsorted`.
+
+    :param np.array[float] pred_prob: raw predicted probabilities of y+.
+    :param np.array[int] y: true binary target labels.
+    :param np.array[int] s: binary protected class labels.
+    :param np.array[float] thetas: critical region thresholds to score.
+    :param bool demote: whether advantaged group observations are flipped.
+    :param np.array[float]|None sample_weight: if specified, weights of the
+        observations in the accuracy and mean difference.
+    :returns: accuracy and mean difference of the flipped predictions, each
+        of shape (n_thetas, ).
+    :rtype: tuple[np.array]
+    """
+    weight = np.ones(len(y)) if sample_weight is None else sample_weight
+    pred = (pred_prob > DECISION_THRESHOLD).astype(int)
+    flipped_pred = ((1 - pred_prob) > DECISION_THRESHOLD).astype(int)
+    flip_candidates = np.ones_like(s, dtype=bool) if demote else s == 1
+    pred_delta = np.where(flip_candidates, flipped_pred - pred, 0) * weight
+    correct_delta = np.where(
+        flip_candidates,
+        (flipped_pred == y).astype(int) - (pred == y).astype(int), 0) * \
+        weight
+
+    order = np.argsort(np.abs(pred_prob - 0.5), kind="mergesort")
+    sorted_distance = np.abs(pred_prob - 0.5)[order]
+    # number of observations strictly within each critical region
+    n_flipped = np.searchsorted(sorted_distance, thetas, side="left")
+
+    def _cumulative(delta):
+        return np.concatenate([[0], np.cumsum(delta[order])])[n_flipped]
+
+    n0 = float(weight[s == 0].sum())
+    n1 = float(weight[s == 1].sum())
+    weighted_pred = pred * weight
+    n_correct = weight[pred == y].sum() + _cumulative(correct_delta)
+    positive_s0 = weighted_pred[s == 0].sum() + \
+        _cumulative(pred_delta * (s == 0))
+    positive_s1 = weighted_pred[s == 1].sum() + \
+        _cumulative(pred_delta * (s == 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_difference = positive_s0 / n0 - positive_s1 / n1
+    return n_correct / float(weight.sum()), mean_difference
+
+
+def _pareto_frontier(accuracy, abs_mean_difference):
+    """Get indices of candidates not dominated in accuracy and fairness."""
+    order = np.lexsort((-accuracy, abs_mean_difference))
+    frontier, best_accuracy = [], -np.inf
+    for i in order:
+        if accuracy[i] > best_accuracy:
+            frontier.append(i)
+            best_accuracy = accuracy[i]
+    return np.array(frontier, dtype=int)
+
+
+class ROCThetaSearch(BaseEstimator, ClassifierMixin, MetaEstimatorMixin):
+
+    S_ON_FIT = True
+    S_ON_PREDICT = True
+
+    def __init__(self, estimator=SingleROClassifier(), thetas=None,
+                 demote=(True, False), cv=3, max_abs_mean_difference=None,
+                 refit=True):
+        """Initialize critical region threshold search for ROC classifiers.
+
+        Since `theta` and `demote` only affect reject-option classifiers at
+        predict time, the base estimator(s) are fit only once per fold and
+        their raw predicted probabilities are cached. All (theta, demote)
+        candidates are then scored in a vectorized sweep over the sorted
+        distances to the decision boundary.
+
+        :param SingleROClassifier|MultipleROClassifier estimator: the
+            reject-option classifier to tune.
+        :param array-like[float]|None thetas: critical region thresholds to
+            evaluate. By default, 51 evenly spaced values in [0, 0.5].
+        :param tuple[bool] demote: `demote` values to evaluate.
+        :param int|cross-validation generator cv: determines the
+            cross-validation splitting strategy, same as in sklearn.
+        :param float|None max_abs_mean_difference: if specified, the best
+            candidate is the most accurate one with a mean absolute mean
+            difference of at most this value. Otherwise, the best candidate
+            is the one with the lowest mean absolute mean difference, with
+            ties broken by accuracy.
+        :param bool refit: if True, refit the estimator with the best
+            parameters on the whole dataset.
+        """
+        self.estimator = estimator
+        self.thetas = thetas
+        self.demote = demote
+        self.cv = cv
+        self.max_abs_mean_difference = max_abs_mean_difference
+        self.refit = refit
+
+    def fit(self, X, y, s, sample_weight=None):
+        """Fit base estimator(s) once per fold and score all candidates.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like y: shape (n, ) binary target variable.
+        :param array-like|ProtectedGroups s: shape (n, ) binary protected
+            class variable.
+        :param array-like|None sample_weight: shape (n, ) sample weights
+            used to fit the estimator(s) and to weight the candidate scores.
+        """
+        X, y = check_X_y(X, y)
+        y = check_binary(y)
+        s = check_protected_groups(s)
+        if len(s) != y.shape[0]:
+            raise ValueError("`s` must be the same shape as `y`")
+        sample_weight = check_sample_weight(sample_weight, y)
+        thetas = DEFAULT_THETAS if self.thetas is None else \
+            np.sort(np.asarray(self.thetas, dtype=float))
+        demotes = list(self.demote)
+        cv = check_cv(self.cv, y, classifier=True)
+
+        # shape (n_demote, n_thetas, n_splits)
+        accuracy, mean_difference = [], []
+        for train, test in cv.split(X, y):
+            train_weight, test_weight = (None, None) \
+                if sample_weight is None else \
+                (sample_weight[train], sample_weight[test])
+            estimator = clone(self.estimator).fit(
+                X[train], y[train], **sample_weight_kwargs(train_weight))
+            s_test = s[test]
+            pred_prob = estimator._raw_predict_proba(X[test], s_test)[:, 1]
+            split_scores = [
+                _theta_sweep(
+                    pred_prob, y[test], s_test.codes, thetas, d, test_weight)
+                for d in demotes]
+            accuracy.append([a for a, _ in split_scores])
+            mean_difference.append([md for _, md in split_scores])
+        accuracy = np.moveaxis(np.array(accuracy), 0, -1)
+        mean_difference = np.moveaxis(np.array(mean_difference), 0, -1)
+
+        n_thetas = len(thetas)
+        self.cv_results_ = {
+            "param_theta": np.tile(thetas, len(demotes)),
+            "param_demote": np.repeat(demotes, n_thetas),
+            "mean_accuracy": accuracy.mean(axis=-1).ravel(),
+            "std_accuracy": accuracy.std(axis=-1).ravel(),
+            "mean_mean_difference": mean_difference.mean(axis=-1).ravel(),
+            "std_mean_difference": mean_difference.std(axis=-1).ravel(),
+        }
+        abs_md = np.abs(self.cv_results_["mean_mean_difference"])
+        mean_accuracy = self.cv_results_["mean_accuracy"]
+        self.frontier_ = _pareto_frontier(mean_accuracy, abs_md)
+        self.best_index_ = self._select_best(mean_accuracy, abs_md)
+        self.best_params_ = {
+            "theta": self.cv_results_["param_theta"][self.best_index_],
+            "demote": bool(
+                self.cv_results_["param_demote"][self.best_index_]),
+        }
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator) \
+                .set_params(**self.best_params_) \
+                .fit(X, y, **sample_weight_kwargs(sample_weight))
+        return self
+
+    def _select_best(self, accuracy, abs_mean_difference):
+        if self.max_abs_mean_difference is None:
+            return np.lexsort((-accuracy, abs_mean_difference))[0]
+        within_bound = abs_mean_difference <= self.max_abs_mean_difference
+        if not within_bound.any():
+            raise ValueError(
+                "no candidate has an absolute mean difference of at most %s" %
+                self.max_abs_mean_difference)
+        return np.where(
+            within_bound, accuracy, -np.inf).argmax()
+
+    def predict(self, X, s):
+        """Generate predicted labels with the best estimator."""
+        check_is_fitted(self, ["best_estimator_"])
+        return self.best_estimator_.predict(X, s)
+
+    def predict_proba(self, X, s):
+        """Generate predicted probabilities with the best estimator."""
+        check_is_fitted(self, ["best_estimator_"])
+        return self.best_estimator_.predict_proba(X, s)
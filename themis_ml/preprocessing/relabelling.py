@@ -7,25 +7,47 @@ from sklearn.base import BaseEstimator, TransformerMixin, MetaEstimatorMixin
 from sklearn.utils.validation import check_array, check_X_y, check_is_fitted
 from sklearn.linear_model import LogisticRegression
 
-from ..checks import check_binary
+from ..checks import check_binary, check_sample_weight, sample_weight_kwargs
+from ..config import gen_row_chunks
+from ..groups import check_protected_groups
+from ..profiling import span
 
 
-def _n_relabels(y, s):
+def _n_relabels(y, groups, sample_weight=None):
     """Compute the number of promotions/demotions that need to occur.
 
-    :param np.array y: target labels
-    :param np.array s: protected class labels
+    :param np.array y: binary target labels
+    :param ProtectedGroups groups: protected class groups
+    :param np.array|None sample_weight: if specified, frequency weights of
+        the observations, in which case the number of promotions/demotions
+        is a total weight.
     :returns: number of promotions/demotions to occur.
     :rtype: int
     """
-    total = float(len(s))
-    s1 = s.sum()
-    s0 = total - s1
-    s1_positive = ((s == 1) & (y == 1)).sum()
-    s0_positive = ((s == 0) & (y == 1)).sum()
+    if sample_weight is None:
+        total = float(len(groups))
+        s0, s1 = groups.counts
+        s0_positive, s1_positive = np.bincount(
+            groups.codes, weights=y, minlength=2)
+    else:
+        total = float(sample_weight.sum())
+        s0, s1 = np.bincount(
+            groups.codes, weights=sample_weight, minlength=2)
+        s0_positive, s1_positive = np.bincount(
+            groups.codes, weights=y * sample_weight, minlength=2)
     return int(math.ceil(((s1 * s0_positive) - (s0 * s1_positive)) / total))
 
 
+def _isclose_all(X, X_fit):
+    """Check that all elements of X and X_fit are close, in row chunks."""
+    if X.shape != X_fit.shape:
+        return False
+    # np.isclose allocates several float and boolean temporaries per element
+    return all(
+        np.isclose(X[chunk], X_fit[chunk]).all()
+        for chunk in gen_row_chunks(X.shape[0], row_bytes=48 * X.shape[1]))
+
+
 def _relabel(y, s, r, promote_ranks, demote_ranks):
     if ((s and not y and r in promote_ranks) or
             (not s and y and r in demote_ranks)):
@@ -33,13 +55,34 @@ def _relabel(y, s, r, promote_ranks, demote_ranks):
     return y
 
 
-def _relabel_targets(y, s, ranks, n_relabels):
+def _lowest_weighted_ranks(ranks, sample_weight, total_weight):
+    """Get the lowest ranks whose observations make up `total_weight`.
+
+    An observation is selected if the total weight of lower-ranked
+    observations is below `total_weight`, so that a deduplicated observation
+    is relabelled whenever its duplicates would be.
+    """
+    order = np.argsort(ranks, kind="mergesort")
+    preceding_weight = np.cumsum(sample_weight[order]) - sample_weight[order]
+    return ranks[order[preceding_weight < total_weight]]
+
+
+def _relabel_targets(y, groups, ranks, n_relabels, sample_weight=None):
     """Compute relabelled targets based on predicted ranks."""
-    demote_ranks = set(sorted(ranks[(s == 0) & (y == 1)])[:n_relabels])
-    promote_ranks = set(sorted(ranks[(s == 1) & (y == 0)])[-n_relabels:])
+    demote = groups.mask(0) & (y == 1)
+    promote = groups.mask(1) & (y == 0)
+    if sample_weight is None:
+        demote_ranks = set(sorted(ranks[demote])[:n_relabels])
+        promote_ranks = set(sorted(ranks[promote])[-n_relabels:])
+    else:
+        demote_ranks = set(_lowest_weighted_ranks(
+            ranks[demote], sample_weight[demote], n_relabels))
+        # the highest ranks are the lowest negated ranks
+        promote_ranks = set(-_lowest_weighted_ranks(
+            -ranks[promote], sample_weight[promote], n_relabels))
     return np.array([
         _relabel(_y, _s, _r, promote_ranks, demote_ranks)
-        for _y, _s, _r in zip(y, s, ranks)])
+        for _y, _s, _r in zip(y, groups.codes, ranks)])
 
 
 class Relabeller(BaseEstimator, TransformerMixin, MetaEstimatorMixin):
@@ -66,18 +109,35 @@ class Relabeller(BaseEstimator, TransformerMixin, MetaEstimatorMixin):
         """
         self.ranker = ranker
 
-    def fit(self, X, y=None, s=None):
-        """Fit relabeller."""
+    def fit(self, X, y=None, s=None, sample_weight=None):
+        """Fit relabeller.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like y: shape (n, ) binary target variable.
+        :param array-like|ProtectedGroups s: shape (n, ) binary protected
+            class variable.
+        :param array-like|None sample_weight: shape (n, ) frequency weights,
+            e.g. the counts of deduplicated rows. The ranker is fit with the
+            weights, and the number of promotions/demotions is a total
+            weight: the lowest or highest ranked observations are relabelled
+            until their total weight reaches it.
+        """
         X, y = check_X_y(X, y)
         y = check_binary(y)
-        s = check_binary(np.array(s).astype(int))
-        if s.shape[0] != y.shape[0]:
+        groups = check_protected_groups(s)
+        if len(groups) != y.shape[0]:
             raise ValueError("`s` must be the same shape as `y`")
-        self.n_relabels_ = _n_relabels(y, s)
-        self.ranks_ = self.ranker.fit(X, y).predict_proba(X)[:, 1]
+        sample_weight = check_sample_weight(sample_weight, y)
+        self.n_relabels_ = _n_relabels(y, groups, sample_weight)
+        with span("Relabeller.ranker_fit", X):
+            self.ranks_ = self.ranker.fit(
+                X, y, **sample_weight_kwargs(sample_weight)
+            ).predict_proba(X)[:, 1]
         self.X_ = X
         self.y_ = y
-        self.s_ = s
+        self.s_ = groups.codes
+        self.groups_ = groups
+        self.sample_weight_ = sample_weight
         return self
 
     def transform(self, X):
@@ -85,8 +145,11 @@ class Relabeller(BaseEstimator, TransformerMixin, MetaEstimatorMixin):
         check_is_fitted(self, ["n_relabels_", "ranks_"])
         X = check_array(X)
         # Input X should be equal to the input to `fit`
-        if not np.isclose(X, self.X_).all():
-            raise ValueError(
-                "`transform` input X must be equal to input X to `fit`")
-        return _relabel_targets(
-            self.y_, self.s_, self.ranks_, self.n_relabels_)
+        with span("Relabeller.check_input", X):
+            if not _isclose_all(X, self.X_):
+                raise ValueError(
+                    "`transform` input X must be equal to input X to `fit`")
+        with span("Relabeller.relabel_targets", self.y_):
+            return _relabel_targets(
+                self.y_, self.groups_, self.ranks_, self.n_relabels_,
+                self.sample_weight_)
@@ -0,0 +1,211 @@
+"""Opt-in profiling hooks for the internal stages of fit and predict.
+
+Internal stages of the estimators, e.g. the ranker fit of the `Relabeller` or
+the per-column residual fits of the `LinearACFClassifier`, are wrapped in
+named spans. When a profiler callback is set, every finished span is passed
+to the callback:
+
+    >>> from themis_ml import profiling
+    >>> with profiling.profile() as spans:
+    ...     Relabeller().fit(X, y, s)
+    >>> [(span.name, span.n_rows, span.duration) for span in spans]
+
+When no profiler is set, `span` returns a shared no-op context manager, so a
+disabled hook costs a single function call per stage.
+
+If `tracemalloc` is available and tracing, spans also record the peak memory
+allocated during the stage. Spans are only recorded in the process that set the
+profiler, so stages that run in joblib worker processes aren't recorded.
+"""
+
+import threading
+
+from contextlib import contextmanager
+from timeit import default_timer
+
+_profiler = None
+_local = threading.local()
+_NOT_IMPORTED = object()
+_tracemalloc_module = _NOT_IMPORTED
+
+
+def _tracemalloc():
+    """Get the tracemalloc module, or None if it isn't available.
+
+    tracemalloc isn't available on Python 2, where memory is never traced.
+    It's imported on first use rather than with this module, to keep the
+    package import light, and the result is cached.
+    """
+    global _tracemalloc_module
+    if _tracemalloc_module is _NOT_IMPORTED:
+        try:
+            import tracemalloc
+        except ImportError:
+            tracemalloc = None
+        _tracemalloc_module = tracemalloc
+    return _tracemalloc_module
+
+
+def _span_stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def _data_size(data):
+    """Get the number of rows and size in bytes of array-like data."""
+    if data is None:
+        return None, None
+    shape = getattr(data, "shape", None)
+    n_rows = shape[0] if shape else len(data)
+    return n_rows, getattr(data, "nbytes", None)
+
+
+class Span(object):
+    """Timed stage of a fit or predict call.
+
+    :ivar str name: stage name, e.g. "Relabeller.ranker_fit".
+    :ivar int|None n_rows: number of rows of the stage's input data.
+    :ivar int|None n_bytes: size of the stage's input data in bytes.
+    :ivar dict attributes: stage-specific attributes, e.g. the column index
+        of a residual fit.
+    :ivar float start: start time in seconds, from `timeit.default_timer`.
+    :ivar float duration: wall time in seconds.
+    :ivar int|None allocated_bytes: peak memory allocated during the stage,
+        in bytes, if tracemalloc is tracing. Otherwise None.
+    :ivar Span|None parent: enclosing span in the same thread.
+    """
+
+    __slots__ = [
+        "name", "n_rows", "n_bytes", "attributes", "start", "duration",
+        "allocated_bytes", "parent", "_start_memory", "_peak_memory"]
+
+    def __init__(self, name, data=None, attributes=None):
+        self.name = name
+        self.n_rows, self.n_bytes = _data_size(data)
+        self.attributes = attributes or {}
+        self.start = None
+        self.duration = None
+        self.allocated_bytes = None
+        self.parent = None
+        self._start_memory = None
+        self._peak_memory = None
+
+    def __repr__(self):
+        return "Span(name=%r, n_rows=%r, n_bytes=%r, duration=%r)" % (
+            self.name, self.n_rows, self.n_bytes, self.duration)
+
+    def __enter__(self):
+        stack = _span_stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self._enter_memory()
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = default_timer() - self.start
+        self._exit_memory()
+        _span_stack().pop()
+        profiler = _profiler
+        if profiler is not None:
+            profiler(self)
+        return False
+
+    def _enter_memory(self):
+        tracemalloc = _tracemalloc()
+        if tracemalloc is None or not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if getattr(tracemalloc, "reset_peak", None) is not None:
+            # the traced peak is global, so hand it over to the parent span
+            # before resetting it for this span.
+            if self.parent is not None and \
+                    self.parent._peak_memory is not None:
+                self.parent._peak_memory = max(
+                    self.parent._peak_memory, peak)
+            tracemalloc.reset_peak()
+        self._start_memory = self._peak_memory = current
+
+    def _exit_memory(self):
+        tracemalloc = _tracemalloc()
+        if self._start_memory is None or tracemalloc is None or \
+                not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if getattr(tracemalloc, "reset_peak", None) is None:
+            # without reset_peak, only the net allocation is known
+            self.allocated_bytes = current - self._start_memory
+            return
+        self._peak_memory = max(self._peak_memory, peak)
+        self.allocated_bytes = self._peak_memory - self._start_memory
+        if self.parent is not None and self.parent._peak_memory is not None:
+            self.parent._peak_memory = max(
+                self.parent._peak_memory, self._peak_memory)
+        tracemalloc.reset_peak()
+
+
+class _NullSpan(object):
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, data=None, **attributes):
+    """Create a span for an internal stage.
+
+    :param str name: stage name.
+    :param array-like|None data: input data of the stage, used to record its
+        number of rows and size in bytes.
+    :param attributes: stage-specific attributes.
+    :returns: Span if a profiler is set, otherwise a no-op context manager.
+    """
+    if _profiler is None:
+        return _NULL_SPAN
+    return Span(name, data, attributes)
+
+
+def set_profiler(callback):
+    """Set the profiler callback, which is called with every finished Span.
+
+    :param callable|None callback: profiler callback. None disables
+        profiling.
+    :returns: the previous profiler callback.
+    :rtype: callable|None
+    """
+    global _profiler
+    previous, _profiler = _profiler, callback
+    return previous
+
+
+def get_profiler():
+    """Get the current profiler callback, None if profiling is disabled."""
+    return _profiler
+
+
+@contextmanager
+def profile(callback=None):
+    """Enable profiling within a context.
+
+    :param callable|None callback: profiler callback. If None, finished spans
+        are collected in a list.
+    :yields: the list of collected spans if callback is None, otherwise
+        None.
+    """
+    spans = None
+    if callback is None:
+        spans = []
+        callback = spans.append
+    previous = set_profiler(callback)
+    try:
+        yield spans
+    finally:
+        set_profiler(previous)
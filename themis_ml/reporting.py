@@ -0,0 +1,172 @@
+"""Fairness audit reports over many models and protected attributes."""
+
+import numpy as np
+
+from collections import OrderedDict
+from joblib import Parallel, delayed
+
+from .checks import check_binary, check_sample_weight
+from .groups import check_protected_groups
+from .metrics import (
+    ConfusionTable, _binary_moments, _mean_difference_from_moments,
+    _normalized_mean_difference_from_moments)
+
+METRICS = [
+    "mean_difference",
+    "normalized_mean_difference",
+    "abs_mean_difference_delta",
+    "abs_normalized_mean_difference_delta",
+    "equal_opportunity_difference",
+    "false_positive_rate_difference",
+    "equalized_odds_difference",
+    "predictive_parity_difference",
+    "disparate_impact_ratio",
+]
+
+COLUMNS = [
+    "model", "attribute", "metric", "value", "lower_ci", "upper_ci",
+    "n_advantaged", "n_disadvantaged",
+]
+
+
+def _check_binary_array(x, name):
+    try:
+        return check_binary(np.asarray(x).astype(int)).astype(np.uint8)
+    except ValueError:
+        raise ValueError("%s must be a binary variable" % name)
+
+
+def _check_protected_array(s, name):
+    try:
+        return check_protected_groups(s).codes.astype(np.uint8)
+    except ValueError:
+        raise ValueError("%s must be a binary variable" % name)
+
+
+def _score_attribute(y, preds, attribute, s, sample_weight=None):
+    """Score all models on one protected attribute.
+
+    The group and true label codes, and the true label statistics, are
+    computed once and shared by all models, so every model only needs a
+    single `np.bincount` over its predictions.
+
+    :returns: report rows, see `COLUMNS`.
+    :rtype: list[tuple]
+    """
+    n_groups = np.bincount(s, weights=sample_weight, minlength=2) \
+        .astype(float)
+    y_positives = np.bincount(
+        s, weights=y if sample_weight is None else y * sample_weight,
+        minlength=2)
+    y_moments = _binary_moments(n_groups, y_positives)
+    y_md = _mean_difference_from_moments(y_moments)[0]
+    y_nmd = _normalized_mean_difference_from_moments(y_moments)[0]
+    codes = (s.astype(np.intp) * 2 + y) * 2
+    # group sizes are counts, or sums of weights
+    group_sizes = n_groups.astype(int).tolist() if sample_weight is None \
+        else n_groups.tolist()
+
+    rows = []
+    for model, pred in preds.items():
+        table = ConfusionTable(
+            np.bincount(codes + pred, weights=sample_weight, minlength=8)
+            .reshape(2, 2, 2).astype(float))
+        pred_moments = table.moments("pred")
+        md = _mean_difference_from_moments(pred_moments)
+        nmd = _normalized_mean_difference_from_moments(pred_moments)
+        # metric, value, lower and upper confidence interval bounds
+        scores = [
+            ("mean_difference", ) + tuple(md),
+            ("normalized_mean_difference", ) + tuple(nmd),
+            ("abs_mean_difference_delta", abs(y_md) - abs(md[0]), None,
+             None),
+            ("abs_normalized_mean_difference_delta",
+             abs(y_nmd) - abs(nmd[0]), None, None),
+            ("equal_opportunity_difference",
+             table.equal_opportunity_difference(), None, None),
+            ("false_positive_rate_difference",
+             table.false_positive_rate_difference(), None, None),
+            ("equalized_odds_difference",
+             table.equalized_odds_difference(), None, None),
+            ("predictive_parity_difference",
+             table.predictive_parity_difference(), None, None),
+            ("disparate_impact_ratio", table.disparate_impact_ratio(), None,
+             None),
+        ]
+        for metric, value, lower_ci, upper_ci in scores:
+            rows.append((
+                model, attribute, metric, value, lower_ci, upper_ci,
+                group_sizes[0], group_sizes[1]))
+    return rows
+
+
+class FairnessReport(object):
+
+    def __init__(self, y, preds, protected, n_jobs=None, sample_weight=None):
+        """Create a fairness audit of many models and protected attributes.
+
+        Computes every metric in `METRICS` with its confidence interval, if
+        any, and group counts for all model x attribute combinations. Inputs
+        are validated once, and each attribute's group codes and true label
+        statistics are computed once and shared by all models.
+
+        :param array-like y: shape (n, ) binary target variable, where 1 is
+            the desireable outcome and 0 is the undesireable outcome.
+        :param dict[str, array-like] preds: model names mapped to shape (n, )
+            binary predicted targets.
+        :param pd.DataFrame|dict[str, array-like|ProtectedGroups] protected:
+            protected attribute names mapped to shape (n, ) binary protected
+            class variables, where 0 is the advantaged group and 1 is the
+            disadvantaged group.
+        :param int|None n_jobs: number of jobs to score the attributes in
+            parallel. None means 1, -1 means using all processors.
+        :param array-like|None sample_weight: shape (n, ) non-negative
+            frequency weights, e.g. the counts of pre-aggregated rows, as in
+            `themis_ml.metrics`. Group counts are then sums of weights.
+        """
+        self.y = _check_binary_array(y, "y")
+        self.preds = OrderedDict(
+            (model, _check_binary_array(pred, "predictions of %s" % model))
+            for model, pred in preds.items())
+        self.protected = OrderedDict(
+            (attribute, _check_protected_array(s, attribute))
+            for attribute, s in protected.items())
+        for name, x in list(self.preds.items()) + list(
+                self.protected.items()):
+            if x.shape != self.y.shape:
+                raise ValueError(
+                    "%s must have the same shape as y %s, found %s" %
+                    (name, self.y.shape, x.shape))
+        self.sample_weight = check_sample_weight(sample_weight, self.y)
+        self.n_jobs = n_jobs
+        self._results = None
+
+    def compute(self):
+        """Compute the report, unless it's already computed.
+
+        :returns: self
+        """
+        if self._results is None:
+            attribute_rows = Parallel(n_jobs=self.n_jobs, mmap_mode="r")(
+                delayed(_score_attribute)(
+                    self.y, self.preds, attribute, s, self.sample_weight)
+                for attribute, s in self.protected.items())
+            self._results = [row for rows in attribute_rows for row in rows]
+        return self
+
+    @property
+    def results(self):
+        """Report rows, each a tuple of the values in `COLUMNS`."""
+        return self.compute()._results
+
+    def to_frame(self):
+        """Export the report to a DataFrame.
+
+        :returns: DataFrame with one row per model, attribute and metric, and
+            columns `COLUMNS`. Metrics without a confidence interval have
+            missing lower_ci and upper_ci.
+        :rtype: pd.DataFrame
+        """
+        import pandas as pd
+        return pd.DataFrame(self.results, columns=COLUMNS).astype(
+            {"value": float, "lower_ci": float, "upper_ci": float})
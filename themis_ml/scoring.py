@@ -0,0 +1,244 @@
+"""Export fitted fairness-aware models to dependency-light scoring artifacts.
+
+An artifact is a directory containing a `meta.json` header and one `.npy`
+file per parameter array, e.g. coefficients, group residual parameters, and
+ensemble weights. Loading an artifact only requires numpy, and the arrays
+are memory-mapped so that many scoring processes can share one copy.
+
+Supported estimators:
+
+- sklearn `LogisticRegression`
+- `SingleROClassifier` and `MultipleROClassifier` with `LogisticRegression`
+  base estimators.
+- `LinearACFClassifier` with a `LogisticRegression` target estimator.
+- `FairnessAwareMetaEstimator` wrapping any of the above.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .groups import check_protected_groups
+from .stats_utils import pearson_residuals, deviance_residuals
+
+ARTIFACT_VERSION = 1
+META_FILENAME = "meta.json"
+DECISION_THRESHOLD = 0.5
+
+# residual types of LinearACFClassifier input variables
+CONSTANT_RESIDUAL = 0
+ABSOLUTE_RESIDUAL = 1
+PEARSON_RESIDUAL = 2
+DEVIANCE_RESIDUAL = 3
+_BINARY_RESIDUAL_KINDS = {
+    "absolute": ABSOLUTE_RESIDUAL,
+    "pearson": PEARSON_RESIDUAL,
+    "deviance": DEVIANCE_RESIDUAL,
+}
+_RESIDUAL_FUNCS = {
+    PEARSON_RESIDUAL: pearson_residuals,
+    DEVIANCE_RESIDUAL: deviance_residuals,
+}
+
+
+def _sigmoid(z):
+    return 0.5 * (1 + np.tanh(0.5 * z))
+
+
+def _linear_params(estimator):
+    from sklearn.linear_model import LogisticRegression
+    if not isinstance(estimator, LogisticRegression):
+        raise ValueError(
+            "only LogisticRegression estimators can be exported, found %s"
+            % estimator)
+    return estimator.coef_.ravel().astype("float64"), \
+        float(estimator.intercept_[0])
+
+
+def _export_logistic(estimator):
+    coef, intercept = _linear_params(estimator)
+    return {"kind": "logistic"}, {
+        "coef": coef, "intercept": np.array([intercept])}
+
+
+def _export_reject_option(estimator):
+    weighted_estimators = estimator._weighted_estimators()
+    params = [_linear_params(e) for e, _ in weighted_estimators]
+    weights = np.array([w for _, w in weighted_estimators], dtype="float64")
+    meta = {
+        "kind": "reject_option",
+        "theta": float(estimator.theta),
+        "demote": bool(estimator.demote),
+    }
+    return meta, {
+        "member_coefs": np.array([c for c, _ in params]),
+        "member_intercepts": np.array([i for _, i in params]),
+        "member_weights": weights / weights.sum(),
+    }
+
+
+def _export_linear_acf(estimator):
+    # since the residual estimators only take the binary protected class as
+    # input, each one is fully described by its predictions for s0 and s1.
+    s_input = np.array([[0], [1]])
+    binary_index = set(estimator.binary_index_)
+    residual_kinds = np.zeros(estimator.n_input_variables_, dtype="int8")
+    group_expected = np.zeros((2, estimator.n_input_variables_))
+    for i, residual_estimator in enumerate(estimator.residual_estimators_):
+        if residual_estimator is None:
+            residual_kinds[i] = CONSTANT_RESIDUAL
+        elif i in binary_index:
+            residual_kinds[i] = _BINARY_RESIDUAL_KINDS[
+                estimator.binary_residual_type]
+            group_expected[:, i] = residual_estimator.predict_proba(
+                s_input)[:, 1]
+        else:
+            residual_kinds[i] = ABSOLUTE_RESIDUAL
+            group_expected[:, i] = residual_estimator.predict(s_input)
+    coef, intercept = _linear_params(estimator.target_estimator_)
+    return {"kind": "linear_acf"}, {
+        "residual_kinds": residual_kinds,
+        "group_expected": group_expected,
+        "coef": coef,
+        "intercept": np.array([intercept]),
+    }
+
+
+def _export_params(estimator):
+    from .meta_estimators import FairnessAwareMetaEstimator
+    from .linear_model import LinearACFClassifier
+    from .postprocessing.reject_option_classification import (
+        SingleROClassifier)
+
+    if isinstance(estimator, FairnessAwareMetaEstimator):
+        # the relabeller only affects training, so only the estimator needs
+        # to be exported.
+        return _export_params(estimator.estimator_)
+    if isinstance(estimator, SingleROClassifier):
+        return _export_reject_option(estimator)
+    if isinstance(estimator, LinearACFClassifier):
+        return _export_linear_acf(estimator)
+    return _export_logistic(estimator)
+
+
+def export_scorer(estimator, path):
+    """Export a fitted estimator to a numpy-only scoring artifact.
+
+    :param BaseEstimator estimator: fitted estimator to export.
+    :param str path: directory to write the artifact to. It's created if it
+        doesn't exist.
+    :returns: path to the artifact.
+    :rtype: str
+    """
+    meta, arrays = _export_params(estimator)
+    meta["artifact_version"] = ARTIFACT_VERSION
+    meta["arrays"] = sorted(arrays)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, "%s.npy" % name), array)
+    with open(os.path.join(path, META_FILENAME), "w") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_scorer(path, mmap_mode="r"):
+    """Load a scoring artifact created with `export_scorer`.
+
+    :param str path: artifact directory.
+    :param str|None mmap_mode: memory-map mode passed to `numpy.load`. By
+        default, arrays are memory-mapped read-only so that they can be
+        shared across processes. If None, arrays are read into memory.
+    :returns: scorer with `predict` and `predict_proba` methods.
+    :rtype: ArtifactScorer
+    """
+    with open(os.path.join(path, META_FILENAME)) as f:
+        meta = json.load(f)
+    if meta["artifact_version"] != ARTIFACT_VERSION:
+        raise ValueError(
+            "unsupported artifact version %s, expected %s" %
+            (meta["artifact_version"], ARTIFACT_VERSION))
+    arrays = {
+        name: np.load(
+            os.path.join(path, "%s.npy" % name), mmap_mode=mmap_mode)
+        for name in meta["arrays"]}
+    return ArtifactScorer(meta, arrays)
+
+
+class ArtifactScorer(object):
+
+    def __init__(self, meta, arrays):
+        """Score observations with an exported fairness-aware model.
+
+        :param dict meta: artifact header.
+        :param dict[str, np.array] arrays: artifact parameter arrays.
+        """
+        self.meta = meta
+        self.arrays = arrays
+        self.kind = meta["kind"]
+
+    def predict_proba(self, X, s=None):
+        """Generate predicted probabilities.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like|ProtectedGroups|None s: shape (n, ) binary
+            protected class. Needed for reject-option and linear ACF models.
+        :returns: shape (n, 2) predicted probabilities.
+        :rtype: np.array[float]
+        """
+        positive_prob = self._positive_proba(np.asarray(X, dtype="float64"), s)
+        return np.column_stack([1 - positive_prob, positive_prob])
+
+    def predict(self, X, s=None):
+        """Generate predicted labels.
+
+        :param array-like X: shape (n, p) input data.
+        :param array-like|ProtectedGroups|None s: shape (n, ) binary
+            protected class.
+        :returns: shape (n, ) predicted labels.
+        :rtype: np.array[int]
+        """
+        X = np.asarray(X, dtype="float64")
+        if self.kind == "reject_option":
+            return (self._positive_proba(X, s) > DECISION_THRESHOLD) \
+                .astype(int)
+        return (self._decision_function(X, s) > 0).astype(int)
+
+    def _check_s(self, s):
+        if s is None:
+            raise ValueError(
+                "Provide `s` arg when scoring a %s artifact" % self.kind)
+        # same validation as the estimators' `predict`, which only needs
+        # numpy
+        return check_protected_groups(s).codes
+
+    def _decision_function(self, X, s):
+        if self.kind == "linear_acf":
+            X = self._linear_acf_residuals(X, self._check_s(s))
+        return X.dot(self.arrays["coef"]) + self.arrays["intercept"][0]
+
+    def _positive_proba(self, X, s):
+        if self.kind != "reject_option":
+            return _sigmoid(self._decision_function(X, s))
+        s = self._check_s(s)
+        decision = X.dot(self.arrays["member_coefs"].T) + \
+            self.arrays["member_intercepts"]
+        positive_prob = _sigmoid(decision).dot(self.arrays["member_weights"])
+        flip = np.abs(positive_prob - 0.5) < self.meta["theta"]
+        if not self.meta["demote"]:
+            flip &= s == 1
+        positive_prob[flip] = 1 - positive_prob[flip]
+        return positive_prob
+
+    def _linear_acf_residuals(self, X, s):
+        residual_kinds = self.arrays["residual_kinds"]
+        expected = self.arrays["group_expected"][s]
+        residuals = np.zeros_like(X)
+        for i, kind in enumerate(residual_kinds):
+            if kind == ABSOLUTE_RESIDUAL:
+                residuals[:, i] = X[:, i] - expected[:, i]
+            elif kind in _RESIDUAL_FUNCS:
+                residuals[:, i] = _RESIDUAL_FUNCS[kind](
+                    X[:, i], expected[:, i])
+        return residuals
@@ -1,25 +1,192 @@
 """Utility functions for computing useful statistics."""
 
+import math
+
 import numpy as np
 
+from .config import gen_row_chunks
+
+BACKENDS = ["auto", "numpy", "numba"]
+
+# temporary arrays allocated per element: two float workspaces of the numpy
+# kernels, or casts of y and pred for the numba kernels, and a boolean mask
+_KERNEL_TEMPORARIES = 4
+
+_numba_kernels = None
+
+
+def _pearson_residual(y, p, eps):
+    p = min(max(p, eps), 1 - eps)
+    return (y - p) / math.sqrt(p * (1 - p))
+
+
+def _deviance_residual(y, p, eps):
+    p = min(max(p, eps), 1 - eps)
+    d = math.sqrt(-2 * (y * math.log(p) + (1 - y) * math.log1p(-p)))
+    return d if y != 0 else -d
+
+
+def _pearson_residuals_numpy(y, pred, eps, out, t1, t2):
+    p = np.clip(pred, eps, 1 - eps, out=t1)
+    np.subtract(y, p, out=out)
+    np.subtract(1, p, out=t2)
+    t2 *= p
+    np.sqrt(t2, out=t2)
+    out /= t2
+    return out
+
+
+def _deviance_residuals_numpy(y, pred, eps, out, t1, t2):
+    p = np.clip(pred, eps, 1 - eps, out=t1)
+    # (1 - y) * log(1 - p), using `out` as a workspace
+    np.negative(p, out=t2)
+    np.log1p(t2, out=t2)
+    np.subtract(1, y, out=out)
+    t2 *= out
+    # y * log(p)
+    np.log(p, out=t1)
+    t1 *= y
+    t1 += t2
+    np.multiply(t1, -2, out=out)
+    np.sqrt(out, out=out)
+    np.negative(out, out=out, where=(y == 0))
+    return out
+
+
+def _get_numba_kernels():
+    """Compile the residual kernels into numba ufuncs on first use.
+
+    :returns: residual names mapped to numba ufuncs, or None if numba isn't
+        installed.
+    :rtype: dict[str, numba.np.ufunc.dufunc.DUFunc]|None
+    """
+    global _numba_kernels
+    if _numba_kernels is None:
+        try:
+            import numba
+        except ImportError:
+            _numba_kernels = {}
+        else:
+            signatures = [
+                "float32(float32, float32, float32)",
+                "float64(float64, float64, float64)"]
+            _numba_kernels = {
+                name: numba.vectorize(signatures, cache=True)(func)
+                for name, func in [
+                    ("pearson", _pearson_residual),
+                    ("deviance", _deviance_residual)]}
+    return _numba_kernels or None
+
+
+def _get_kernel(name, backend):
+    """Get a residual kernel `kernel(y, pred, eps, out, t1, t2)`."""
+    if backend not in BACKENDS:
+        raise ValueError(
+            "backend must be one of %s, got %s" % (BACKENDS, backend))
+    numba_kernels = _get_numba_kernels() if backend != "numpy" else None
+    if numba_kernels is None:
+        if backend == "numba":
+            raise ValueError("backend 'numba' requires numba to be installed")
+        return {
+            "pearson": _pearson_residuals_numpy,
+            "deviance": _deviance_residuals_numpy,
+        }[name]
+    ufunc = numba_kernels[name]
+
+    def kernel(y, pred, eps, out, t1, t2):
+        # the fused ufunc doesn't need the workspaces
+        return ufunc(
+            y.astype(out.dtype, copy=False),
+            pred.astype(out.dtype, copy=False), eps, out=out)
+
+    return kernel
+
+
+def _residual_blocks(x):
+    """Generate indices of blocks of x that fit in the working memory.
+
+    Blocks are row chunks, except for 2-D Fortran-ordered arrays, which are
+    processed one column at a time so that every block is contiguous.
+    """
+    itemsize = max(x.dtype.itemsize, 4)
+    if x.ndim == 0:
+        yield Ellipsis
+    elif x.ndim == 2 and x.flags.f_contiguous and not x.flags.c_contiguous:
+        for j in range(x.shape[1]):
+            for chunk in gen_row_chunks(
+                    x.shape[0], _KERNEL_TEMPORARIES * itemsize):
+                yield chunk, j
+    else:
+        row_size = x[:1].size
+        for chunk in gen_row_chunks(
+                x.shape[0], _KERNEL_TEMPORARIES * itemsize * row_size):
+            yield chunk
+
+
+def _residuals(name, y, pred, out, eps, backend):
+    """Compute residuals block by block with reused workspaces.
+
+    The output dtype is the dtype of `out` if specified, float32 if `pred`
+    is float32, and float64 otherwise.
+    """
+    y, pred = np.asarray(y), np.asarray(pred)
+    if y.shape != pred.shape:
+        raise ValueError(
+            "y and pred must have the same shape, found %s and %s" %
+            (y.shape, pred.shape))
+    if out is None:
+        dtype = np.float32 if pred.dtype == np.float32 else np.float64
+        out = np.empty(pred.shape, dtype=dtype)
+    elif out.shape != pred.shape:
+        raise ValueError(
+            "out must have shape %s, found %s" % (pred.shape, out.shape))
+    eps = np.finfo(out.dtype).eps if eps is None else eps
+    eps = out.dtype.type(eps)
+    kernel = _get_kernel(name, backend)
+
+    workspace = None
+    for block in _residual_blocks(pred):
+        block_out = out[block]
+        size = max(block_out.size, 1)
+        if workspace is None or workspace.shape[1] < size:
+            workspace = np.empty((2, size), dtype=out.dtype)
+        t1, t2 = [w[:block_out.size].reshape(block_out.shape)
+                  for w in workspace]
+        kernel(y[block], pred[block], eps, block_out, t1, t2)
+    return out
+
 
-def pearson_residuals(y, pred):
+def pearson_residuals(y, pred, out=None, eps=None, backend="auto"):
     """Compute Pearson residuals.
 
+    r = (y - p) / sqrt(p * (1 - p))
+
+    Predicted probabilities are clipped to [eps, 1 - eps], so residuals are
+    finite when p is 0 or 1.
+
     Reference:
     https://web.as.uky.edu/statistics/users/pbreheny/760/S11/notes/4-12.pdf
 
     :param array-like[int] y: target labels. 1 is positive label, 0 is negative
         label
-    :param array-like[float] pred: predicted labels.
-    :returns: pearson residual.
+    :param array-like[float] pred: predicted labels, of the same shape as y.
+        2-D arrays are processed in blocks of rows, or column by column if
+        they're Fortran-ordered.
+    :param np.array[float]|None out: if specified, array of the same shape as
+        pred where the residuals are written.
+    :param float|None eps: clipping threshold of predicted probabilities. By
+        default, the machine epsilon of the output dtype.
+    :param str backend: "numpy", "numba" for fused JIT-compiled kernels, or
+        "auto" to use numba if it's installed. Kernels are compiled on first
+        use.
+    :returns: pearson residual, float32 if pred is float32 and float64
+        otherwise, or `out` if specified.
     :rtype: array-like[float]
     """
-    y, pred = np.array(y), np.array(pred)
-    return (y - pred) / np.sqrt(pred * (1 - pred))
+    return _residuals("pearson", y, pred, out, eps, backend)
 
 
-def deviance_residuals(y, pred):
+def deviance_residuals(y, pred, out=None, eps=None, backend="auto"):
     """Compute Deviance residuals.
 
     Reference:
@@ -27,16 +194,24 @@ def deviance_residuals(y, pred):
 
     Formula:
     d = sign * sqrt(-2 * {y * log(p) + (1 - y) * log(1 - p)})
-    - where sign is -1 if y = 1 and 1 if y = 0
+    - where sign is 1 if y = 1 and -1 if y = 0
     - y is the true label
-    - p is the predicted probability
+    - p is the predicted probability, clipped to [eps, 1 - eps]
 
     :param array-like[int] y: target labels. 1 is positive label, 0 is negative
         label
-    :param array-like[float] pred: predicted labels.
-    :returns: deviance residual.
+    :param array-like[float] pred: predicted labels, of the same shape as y.
+        2-D arrays are processed in blocks of rows, or column by column if
+        they're Fortran-ordered.
+    :param np.array[float]|None out: if specified, array of the same shape as
+        pred where the residuals are written.
+    :param float|None eps: clipping threshold of predicted probabilities. By
+        default, the machine epsilon of the output dtype.
+    :param str backend: "numpy", "numba" for fused JIT-compiled kernels, or
+        "auto" to use numba if it's installed. Kernels are compiled on first
+        use.
+    :returns: deviance residual, float32 if pred is float32 and float64
+        otherwise, or `out` if specified.
     :rtype: array-like[float]
     """
-    y, pred = np.array(y), np.array(pred)
-    sign = np.array([1 if y_i else -1 for y_i in y])
-    return sign * np.sqrt(-2 * (y * np.log(pred) + (1 - y) * np.log(1 - pred)))
+    return _residuals("deviance", y, pred, out, eps, backend)